@@ -3,8 +3,14 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.gzip import GZipMiddleware
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
 from tortoise.contrib.fastapi import register_tortoise
-from logger import setup_logger
+from logger import setup_logger, action_log_sink
 from app.routes import register_routes
+from app.database.config import tortoise_config
+from app.database.managers.reference_cache import reference_cache
+from app.s3.s3_manager import s3_manager
+from app.handlers.image_handlers import image_pool
+from app.handlers.metrics_handlers import MetricsMiddleware
+from app.handlers.upload_handlers import UploadLimitMiddleware
 from config import Settings
 
 
@@ -21,16 +27,47 @@ def create_app() -> FastAPI:
         # Разрешает все заголовки, включая `ngrok-skip-browser-warning`
         allow_headers=["*"],
     )
+    # Размер загрузки — до разбора формы: большое тело не принимается целиком
+    app.add_middleware(UploadLimitMiddleware, max_size=Settings.MAX_SCREENSHOT_SIZE)
+    # Последним — внешний слой: в метрики попадает всё время запроса, включая gzip
+    app.add_middleware(MetricsMiddleware)
     app.state.settings = Settings()
-   # Конфигурация Tortoise ORM
+
+    # Shutdown-хуки выполняются в порядке регистрации:
+    # буфер логов дописываем до того, как Tortoise закроет соединения
+    @app.on_event("shutdown")
+    async def flush_action_logs():
+        await action_log_sink.stop()
+
+   # Конфигурация Tortoise ORM (пул соединений — app/database/config.py)
     register_tortoise(
         app,
-        db_url=Settings.DATABASE_URL,
-        modules={"models": ["app.database.models"]},
+        config=tortoise_config(),
         # generate_schemas=True,
         add_exception_handlers=True,
     )
 
+    @app.on_event("startup")
+    async def load_reference_cache():
+        # Справочники в память воркера (после инициализации Tortoise)
+        await reference_cache.load()
+
+    @app.on_event("startup")
+    async def start_action_logs():
+        # Фоновая запись логов действий — в каждом воркере свой буфер
+        await action_log_sink.start()
+
+    @app.on_event("startup")
+    async def open_s3_client():
+        await s3_manager.start()
+        # Пул процессов создаётся в воркере, а не в мастере gunicorn
+        image_pool.start()
+
+    @app.on_event("shutdown")
+    async def close_s3_client():
+        image_pool.stop()
+        await s3_manager.close()
+
     setup_logger()
     # Регистрация маршрутов
     register_routes(app)
@@ -1,17 +1,82 @@
-import os
-from dotenv import load_dotenv
+from tortoise import connections
+from tortoise.backends.base.config_generator import expand_db_url
+from app.database.routing import REPLICA_CONNECTION
+from config import Settings
 
-load_dotenv()
 
-DATABASE_URL = os.getenv("DATABASE_URL")
+# 📌 Единая конфигурация Tortoise: приложение, CLI-задания и aerich
 
-TORTOISE_ORM = {
-    "connections": {"default": DATABASE_URL},
-    "apps": {
-        "models": {
-            "models": ["app.database.models", "aerich.models"],
-            "default_connection": "default",
+MODELS = ["app.database.models"]
+# Движок asyncpg с учётом ожидания соединений из пула (см. app/database/pool.py)
+POOLED_ENGINE = "app.database.pool"
+
+
+def pool_size(workers: int | None = None) -> tuple[int, int]:
+    """
+    Размер пула asyncpg на один процесс: (minsize, maxsize).
+    Без явного DB_POOL_MAX_SIZE бюджет DB_MAX_CONNECTIONS делится между воркерами gunicorn.
+    """
+    workers = max(1, workers or Settings.WEB_CONCURRENCY)
+    maxsize = Settings.DB_POOL_MAX_SIZE or max(1, Settings.DB_MAX_CONNECTIONS // workers)
+    return min(Settings.DB_POOL_MIN_SIZE, maxsize), maxsize
+
+
+def connection_config(db_url: str, workers: int | None = None):
+    """
+    Параметры соединения по URL. Для PostgreSQL (asyncpg) добавляются размер пула,
+    время жизни соединений, кэш подготовленных запросов и таймауты;
+    остальные движки (SQLite в разработке) подключаются по URL как есть.
+    Параметры из query-строки URL важнее настроек.
+    """
+    expanded = expand_db_url(db_url)
+    if expanded["engine"] != "tortoise.backends.asyncpg":
+        return db_url
+    minsize, maxsize = pool_size(workers)
+    credentials = {
+        "minsize": minsize,
+        "maxsize": maxsize,
+        "max_queries": Settings.DB_POOL_MAX_QUERIES,
+        "max_inactive_connection_lifetime": Settings.DB_POOL_MAX_INACTIVE_LIFETIME,
+        "statement_cache_size": Settings.DB_STATEMENT_CACHE_SIZE,
+        "command_timeout": Settings.DB_COMMAND_TIMEOUT,
+        "timeout": Settings.DB_CONNECT_TIMEOUT,
+        **expanded["credentials"],
+    }
+    return {"engine": POOLED_ENGINE, "credentials": credentials}
+
+
+def tortoise_config(with_aerich: bool = False, workers: int | None = None) -> dict:
+    """
+    Конфигурация для register_tortoise / Tortoise.init.
+    aerich.models нужен только самому aerich (таблица истории миграций).
+    """
+    config = {
+        "connections": {"default": connection_config(Settings.DATABASE_URL, workers)},
+        "apps": {
+            "models": {
+                "models": MODELS + (["aerich.models"] if with_aerich else []),
+                "default_connection": "default",
+            },
         },
-    },
-    "default_connection": "default",  # <-- Добавь сюда
-}
+    }
+    # Реплика для чтения: только маршруты с read_from_replica (app/database/routing.py)
+    if Settings.DATABASE_REPLICA_URL and not with_aerich:
+        config["connections"][REPLICA_CONNECTION] = connection_config(
+            Settings.DATABASE_REPLICA_URL, workers)
+        config["routers"] = ["app.database.routing.ReplicaRouter"]
+    return config
+
+
+# Для aerich: aerich init -t app.database.config.TORTOISE_ORM
+TORTOISE_ORM = tortoise_config(with_aerich=True)
+
+
+def pool_stats() -> list[dict]:
+    """
+    Состояние пулов соединений текущего процесса (только движок app.database.pool).
+    """
+    return [
+        client.pool_stats()
+        for client in connections.all()
+        if hasattr(client, "pool_stats")
+    ]
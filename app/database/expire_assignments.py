@@ -0,0 +1,30 @@
+import argparse
+import asyncio
+from tortoise import Tortoise
+from app.database.managers.task_manager import expire_assignments
+from app.database.config import tortoise_config
+
+
+# 📌 Просрочка несданных назначений и возврат мест (для cron):
+#    python -m app.database.expire_assignments [--ttl-hours 72]
+
+
+async def main(ttl_hours: int | None, batch_size: int) -> int:
+    await Tortoise.init(config=tortoise_config())
+    total = 0
+    try:
+        while expired := await expire_assignments(ttl_hours, batch_size):
+            total += expired
+    finally:
+        await Tortoise.close_connections()
+    print(f"expired={total}")
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Просрочка несданных назначений")
+    parser.add_argument("--ttl-hours", type=int, default=None,
+                        help="срок сдачи назначения в часах")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+    raise SystemExit(asyncio.run(main(args.ttl_hours, args.batch_size)))
@@ -1,12 +1,34 @@
 from fastapi import Query, HTTPException
 from tortoise.exceptions import DoesNotExist
 from app.database.models import User
+from app.database.managers.user_cache import UserSnapshot, user_cache
+from app.database.routing import primary_db
 
 
-async def get_user_by_telegram_id(telegram_id: int = Query(...)) -> User:
+async def get_user_by_telegram_id(telegram_id: int = Query(...)) -> UserSnapshot:
+    """
+    Снимок пользователя из LRU-кэша; при промахе — один запрос в БД.
+    """
+    snapshot = user_cache.get(telegram_id)
+    if snapshot:
+        return snapshot
+    # Только что зарегистрированный пользователь может ещё не доехать до реплики
+    user = await User.get_or_none(telegram_id=telegram_id, using_db=primary_db())
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+    snapshot = UserSnapshot.from_user(user)
+    user_cache.put(snapshot)
+    return snapshot
+
+
+async def get_fresh_user_by_telegram_id(telegram_id: int = Query(...)) -> User:
+    """
+    Пользователь напрямую из БД, в обход кэша (актуальный баланс, запись).
+    """
     user = await User.get_or_none(telegram_id=telegram_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
+    user_cache.put(UserSnapshot.from_user(user))
     return user
 
 # async def get_user_by_telegram_id(telegram_id: int):
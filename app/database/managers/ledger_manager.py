@@ -0,0 +1,316 @@
+from datetime import timedelta
+from decimal import Decimal
+from typing import Optional
+from uuid import UUID, uuid4
+from loguru import logger
+from pypika_tortoise import Table, functions as fn
+from pypika_tortoise.terms import ValueWrapper
+from tortoise.exceptions import DoesNotExist, IntegrityError
+from tortoise.expressions import F
+from tortoise.functions import Sum
+from tortoise import timezone
+from tortoise.transactions import in_transaction
+from app.database.models import LedgerCheckpoint, LedgerWatermark, Transaction, User
+from app.database.managers.user_cache import UserSnapshot, user_cache
+from config import Settings
+
+
+# 📌 Журнал проводок: баланс и транзакция меняются в одной транзакции БД
+
+# Знак проводки для баланса
+ENTRY_SIGNS = {"credit": 1, "debit": -1, "withdraw": -1}
+WATERMARK_NAME = "transactions"
+
+
+class InsufficientFundsError(Exception):
+    pass
+
+
+class IdempotencyKeyReusedError(Exception):
+    pass
+
+
+async def post_entry(user_id: UUID, amount: Decimal, transaction_type: str,
+                     task_id: Optional[UUID] = None,
+                     idempotency_key: Optional[str] = None) -> tuple[Transaction, bool]:
+    """
+    Проводит начисление/списание: создаёт Transaction и меняет User.balance
+    атомарным UPDATE balance = balance ± amount в одной транзакции.
+    Списание проходит только при достаточном балансе (условие в том же UPDATE).
+
+    Повтор с тем же idempotency_key не проводит операцию второй раз,
+    а возвращает уже существующую транзакцию.
+    Возвращает (транзакция, была ли проводка создана сейчас).
+    """
+    amount = Decimal(amount)
+    if amount <= 0:
+        raise ValueError("amount must be positive")
+    sign = ENTRY_SIGNS[transaction_type]
+
+    try:
+        async with in_transaction("default") as conn:
+            transaction = await Transaction.create(
+                user_id=user_id,
+                amount=amount,
+                transaction_type=transaction_type,
+                task_id=task_id,
+                idempotency_key=idempotency_key,
+                using_db=conn,
+            )
+            query = User.filter(user_id=user_id)
+            if sign > 0:
+                updated = await query.using_db(conn).update(balance=F("balance") + amount)
+            else:
+                updated = await query.filter(balance__gte=amount).using_db(conn).update(
+                    balance=F("balance") - amount)
+            if not updated:
+                if not await User.filter(user_id=user_id).using_db(conn).exists():
+                    raise DoesNotExist(f"User {user_id} not found")
+                raise InsufficientFundsError(user_id)
+            user = await User.get(user_id=user_id).using_db(conn)
+    except IntegrityError:
+        # Конкурентный или повторный запрос с тем же ключом уже провёл операцию
+        if idempotency_key is None:
+            raise
+        existing = await Transaction.get_or_none(idempotency_key=idempotency_key)
+        if existing is None:
+            raise
+        if (existing.user_id != user_id or existing.amount != amount
+                or existing.transaction_type != transaction_type):
+            raise IdempotencyKeyReusedError(idempotency_key)
+        return existing, False
+
+    user_cache.put(UserSnapshot.from_user(user))
+    logger.info("💰 Проводка {} {} {} (user {}, баланс {})",
+                transaction.transaction_id, transaction_type, amount, user_id, user.balance)
+    return transaction, True
+
+
+async def post_credits(entries: list[dict], using_db) -> list[dict]:
+    """
+    Пакетное начисление внутри уже открытой транзакции вызывающего.
+    entries — словари user_id, amount, task_id, idempotency_key.
+
+    Проводки вставляются одним bulk_create с пропуском конфликтов: проводка,
+    чей idempotency_key уже есть в журнале, не вставляется и баланс не меняет
+    (остальная пачка проходит). Балансы — по одному UPDATE на каждую различную
+    сумму (награды обычно одинаковые), а не на пользователя.
+    Возвращает проведённые записи; кэш пользователей вызывающий инвалидирует после коммита.
+    """
+    if not entries:
+        return []
+    transactions = [
+        Transaction(
+            transaction_id=uuid4(),
+            user_id=entry["user_id"],
+            amount=entry["amount"],
+            transaction_type="credit",
+            task_id=entry.get("task_id"),
+            idempotency_key=entry.get("idempotency_key"),
+        )
+        for entry in entries
+    ]
+    await Transaction.bulk_create(transactions, ignore_conflicts=True, using_db=using_db)
+    # Вставленные строки узнаём по своим transaction_id
+    inserted = set(await Transaction.filter(
+        transaction_id__in=[t.transaction_id for t in transactions]
+    ).using_db(using_db).values_list("transaction_id", flat=True))
+    posted = [entry for entry, transaction in zip(entries, transactions)
+              if transaction.transaction_id in inserted]
+    skipped = len(entries) - len(posted)
+    if skipped:
+        logger.warning("♻️ Пропущено начислений с уже проведённым ключом: {}", skipped)
+
+    totals: dict[UUID, Decimal] = {}
+    for entry in posted:
+        totals[entry["user_id"]] = totals.get(entry["user_id"], Decimal(0)) + Decimal(entry["amount"])
+    by_amount: dict[Decimal, list[UUID]] = {}
+    for user_id, total in totals.items():
+        by_amount.setdefault(total, []).append(user_id)
+    for total, user_ids in by_amount.items():
+        await User.filter(user_id__in=user_ids).using_db(using_db).update(
+            balance=F("balance") + total)
+    return posted
+
+
+async def _signed_totals(query) -> dict[UUID, Decimal]:
+    """
+    Сумма проводок по пользователям: credit минус debit/withdraw, один GROUP BY.
+    """
+    rows = await query.annotate(total=Sum("amount")).group_by(
+        "user_id", "transaction_type").values("user_id", "transaction_type", "total")
+    totals: dict[UUID, Decimal] = {}
+    for row in rows:
+        total = Decimal(str(row["total"] or 0)) * ENTRY_SIGNS[row["transaction_type"]]
+        totals[row["user_id"]] = totals.get(row["user_id"], Decimal(0)) + total
+    return totals
+
+
+# 📌 Инкрементальная сверка баланса с журналом
+
+
+def _to_db(model, field_name: str, value):
+    return model._meta.fields_map[field_name].to_db_value(value, model)
+
+
+async def _ledger_rows(conn, watermark, full: bool, lower=None) -> dict[UUID, dict]:
+    """
+    Баланс, чекпоинт и свежие (created_at >= watermark) проводки пользователей —
+    одним SELECT: users LEFT JOIN ledger_checkpoints LEFT JOIN (GROUP BY по журналу).
+    Один оператор видит один снимок БД, поэтому баланс и журнал согласованы.
+    full=False — только пользователи с проводками в окне [lower, watermark)
+    (подзапросом, а не списком id: число параметров не растёт с окном).
+    """
+    users = Table(User._meta.db_table)
+    checkpoints = Table(LedgerCheckpoint._meta.db_table)
+    transactions = Table(Transaction._meta.db_table)
+
+    pending = conn.query_class.from_(transactions).select(
+        transactions.user_id, transactions.transaction_type, fn.Sum(transactions.amount).as_("total"),
+    ).where(
+        transactions.created_at >= ValueWrapper(_to_db(Transaction, "created_at", watermark))
+    ).groupby(transactions.user_id, transactions.transaction_type)
+    query = conn.query_class.from_(users).select(
+        users.user_id, users.telegram_id, users.balance, checkpoints.ledger_total,
+        pending.transaction_type, pending.total,
+    ).left_join(checkpoints).on(checkpoints.user_id == users.user_id) \
+        .left_join(pending).on(pending.user_id == users.user_id)
+    if not full:
+        window = conn.query_class.from_(transactions).select(transactions.user_id).where(
+            transactions.created_at < ValueWrapper(_to_db(Transaction, "created_at", watermark)))
+        if lower is not None:
+            window = window.where(
+                transactions.created_at >= ValueWrapper(_to_db(Transaction, "created_at", lower)))
+        query = query.where(users.user_id.isin(window))
+
+    sql, params = query.get_parameterized_sql()
+    ledger: dict[UUID, dict] = {}
+    for row in await conn.execute_query_dict(sql, params):
+        user_id = User._meta.fields_map["user_id"].to_python_value(row["user_id"])
+        entry = ledger.setdefault(user_id, {
+            "telegram_id": row["telegram_id"],
+            "balance": Decimal(str(row["balance"])),
+            "ledger": Decimal(str(row["ledger_total"] or 0)),
+        })
+        if row["transaction_type"] is not None:
+            entry["ledger"] += Decimal(str(row["total"] or 0)) * ENTRY_SIGNS[row["transaction_type"]]
+    return ledger
+
+
+async def _recount_checkpoints(conn, watermark, user_ids: list[UUID]) -> dict[UUID, Decimal]:
+    """
+    Пересчитывает чекпоинты пользователей с расхождением по всему их журналу.
+
+    Проводка, закоммиченная позже, чем через lag после своего created_at, оказывается
+    ниже уже сдвинутого watermark и в чекпоинт не попадает. Строки пользователей
+    блокируются (FOR UPDATE — как UPDATE баланса в post_entry), поэтому баланс
+    и журнал читаются без параллельных проводок. Возвращает журнальный баланс.
+    """
+    users = await User.filter(user_id__in=user_ids).select_for_update() \
+        .order_by("user_id").only("user_id", "balance").using_db(conn)
+    before = await _signed_totals(Transaction.filter(
+        user_id__in=user_ids, created_at__lt=watermark).using_db(conn))
+    after = await _signed_totals(Transaction.filter(
+        user_id__in=user_ids, created_at__gte=watermark).using_db(conn))
+    checkpoints = {
+        checkpoint.user_id: checkpoint
+        for checkpoint in await LedgerCheckpoint.filter(user_id__in=user_ids).using_db(conn)
+    }
+    expected = {}
+    for user in users:
+        total = before.get(user.user_id, Decimal(0))
+        checkpoint = checkpoints.get(user.user_id)
+        if checkpoint is None:
+            await LedgerCheckpoint.create(user_id=user.user_id, ledger_total=total, using_db=conn)
+        elif Decimal(str(checkpoint.ledger_total)) != total:
+            logger.warning("♻️ Чекпоинт пользователя {} пересчитан: {} → {}",
+                           user.user_id, checkpoint.ledger_total, total)
+            await LedgerCheckpoint.filter(user_id=user.user_id).using_db(conn).update(
+                ledger_total=total, updated_at=timezone.now())
+        expected[user.user_id] = (Decimal(str(user.balance)), total + after.get(user.user_id, Decimal(0)))
+    return expected
+
+
+async def reconcile_ledger(full: bool = False, lag: Optional[int] = None) -> dict:
+    """
+    Досчитывает в ledger_checkpoints проводки в окне [watermark, now - lag)
+    и сравнивает User.balance с ledger_total + более свежие проводки.
+
+    По умолчанию проверяются только пользователи с новыми проводками;
+    full=True проверяет всех (без перечитывания всего журнала).
+    Отставание lag оставляет время дописаться транзакциям, открытым до запуска.
+    Сравнение — один SELECT (один снимок БД); расхождение перепроверяется
+    пересчётом журнала пользователя под блокировкой, что заодно подбирает проводки,
+    закоммиченные позже lag. Всё — в одной транзакции под блокировкой watermark.
+    """
+    lag = Settings.LEDGER_RECONCILE_LAG if lag is None else lag
+    upper = timezone.now() - timedelta(seconds=lag)
+
+    async with in_transaction("default") as conn:
+        # Блокировка строки watermark — параллельный запуск дождётся окончания
+        state = await LedgerWatermark.filter(name=WATERMARK_NAME).select_for_update() \
+            .using_db(conn).first()
+        lower = state.watermark if state else None
+        # Чекпоинты учитывают всё до watermark (он может быть впереди upper,
+        # если прошлый запуск был с меньшим lag) — свежие проводки считаются от него
+        watermark = upper if lower is None or lower < upper else lower
+        if watermark == lower:
+            deltas = {}
+        else:
+            query = Transaction.filter(created_at__lt=upper)
+            if lower is not None:
+                query = query.filter(created_at__gte=lower)
+            deltas = await _signed_totals(query.using_db(conn))
+
+        checkpoints = {
+            checkpoint.user_id: checkpoint
+            for checkpoint in await LedgerCheckpoint.filter(
+                user_id__in=list(deltas)).using_db(conn)
+        } if deltas else {}
+        changed, created = [], []
+        for user_id, delta in deltas.items():
+            checkpoint = checkpoints.get(user_id)
+            if checkpoint is None:
+                created.append(LedgerCheckpoint(user_id=user_id, ledger_total=delta))
+            else:
+                checkpoint.ledger_total += delta
+                checkpoint.updated_at = timezone.now()
+                changed.append(checkpoint)
+        if created:
+            await LedgerCheckpoint.bulk_create(created, using_db=conn)
+        if changed:
+            await LedgerCheckpoint.bulk_update(
+                changed, fields=["ledger_total", "updated_at"], using_db=conn)
+
+        if state is None:
+            await LedgerWatermark.create(name=WATERMARK_NAME, watermark=watermark, using_db=conn)
+        elif watermark != lower:
+            state.watermark = watermark
+            await state.save(using_db=conn, update_fields=["watermark"])
+
+        ledger = await _ledger_rows(conn, watermark, full, lower) if full or deltas else {}
+        suspects = [user_id for user_id, entry in ledger.items() if entry["balance"] != entry["ledger"]]
+        recounted = await _recount_checkpoints(conn, watermark, suspects) if suspects else {}
+
+    mismatches = [
+        {
+            "user_id": user_id,
+            "telegram_id": ledger[user_id]["telegram_id"],
+            "balance": balance,
+            "ledger": expected,
+        }
+        for user_id, (balance, expected) in recounted.items()
+        if balance != expected
+    ]
+    checked = len(ledger)
+
+    for mismatch in mismatches:
+        logger.warning("⚠️ Баланс не сходится с журналом: {}", mismatch)
+    logger.info("🧾 Сверка до {}: новых проводок у {} польз., проверено {}, расхождений {}",
+                watermark.isoformat(), len(deltas), checked, len(mismatches))
+    return {
+        "watermark": watermark,
+        "users_with_entries": len(deltas),
+        "checked": checked,
+        "mismatches": mismatches,
+    }
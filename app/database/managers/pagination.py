@@ -0,0 +1,29 @@
+import base64
+import binascii
+import json
+from datetime import datetime
+from fastapi import HTTPException
+
+
+# 📌 Непрозрачный курсор для keyset-пагинации по (created_at, id)
+
+
+def encode_cursor(created_at: datetime, row_id) -> str:
+    """
+    Упаковывает позицию последней строки страницы в base64-курсор.
+    """
+    payload = json.dumps(
+        {"c": created_at.isoformat(), "id": str(row_id)}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, str]:
+    """
+    Распаковывает курсор. При битом курсоре — 400.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        return datetime.fromisoformat(payload["c"]), str(payload["id"])
+    except (ValueError, KeyError, TypeError, binascii.Error) as e:
+        raise HTTPException(status_code=400, detail="Invalid cursor") from e
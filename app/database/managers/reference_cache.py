@@ -0,0 +1,128 @@
+import asyncio
+import hashlib
+import time
+from loguru import logger
+from app.database.models import TaskPlatform, TaskStatus, TaskType, UserRole
+from config import Settings
+
+
+# 📌 Кэш справочников (платформы, статусы, типы заданий, роли) на воркер
+
+
+class ReferenceCache:
+    """
+    Держит справочные таблицы в памяти процесса.
+    Загружается при старте, перечитывается по TTL или после invalidate().
+    Отсутствующие ключи запоминаются на короткий miss_ttl.
+    """
+
+    tables = {
+        "platforms": (TaskPlatform, "platform_id", ("platform_id", "platform_name")),
+        "statuses": (TaskStatus, "status_id", ("status_id", "status_name")),
+        "task_types": (TaskType, "task_type_id", ("task_type_id", "task_type_name")),
+        "roles": (UserRole, "role_id", ("role_id", "role_name")),
+    }
+
+    # Предел числа запомненных отсутствующих ключей (ключи приходят от клиентов)
+    max_missing = 10_000
+
+    def __init__(self, ttl: int, miss_ttl: int):
+        self.ttl = ttl
+        self.miss_ttl = miss_ttl
+        self.hits = 0
+        self.misses = 0
+        self._data: dict[str, dict[str, dict]] = {}
+        # Хеш содержимого справочника — одинаков на всех воркерах при одинаковых данных
+        self._versions: dict[str, str] = {}
+        # (справочник, ключ) -> monotonic-время, до которого ключ считается отсутствующим
+        self._missing: dict[tuple[str, str], float] = {}
+        self._loaded_at = 0.0
+        self._lock = asyncio.Lock()
+
+    def _is_fresh(self) -> bool:
+        return bool(self._data) and time.monotonic() - self._loaded_at < self.ttl
+
+    async def load(self):
+        """
+        Перечитывает все справочники из БД.
+        """
+        data = {}
+        for name, (model, pk, fields) in self.tables.items():
+            rows = await model.all().values(*fields)
+            data[name] = {str(row[pk]): row for row in rows}
+        self._data = data
+        self._versions = {name: self._hash(table) for name, table in data.items()}
+        self._missing = {}
+        self._loaded_at = time.monotonic()
+        logger.info(
+            f"📚 Справочники загружены: { {k: len(v) for k, v in data.items()} }")
+
+    def invalidate(self):
+        """
+        Сбрасывает кэш — следующий запрос перечитает справочники.
+        """
+        self._loaded_at = 0.0
+        self._missing = {}
+
+    async def _table(self, name: str) -> dict[str, dict]:
+        if self._is_fresh():
+            self.hits += 1
+            return self._data[name]
+        self.misses += 1
+        async with self._lock:
+            if not self._is_fresh():
+                await self.load()
+        return self._data[name]
+
+    @staticmethod
+    def _hash(table: dict[str, dict]) -> str:
+        content = repr(sorted((key, sorted(row.items())) for key, row in table.items()))
+        return hashlib.blake2b(content.encode("utf-8"), digest_size=16).hexdigest()
+
+    async def all(self, name: str) -> list[dict]:
+        return list((await self._table(name)).values())
+
+    async def version(self, name: str) -> str:
+        """
+        Версия справочника для ETag (меняется вместе с содержимым).
+        """
+        await self._table(name)
+        return self._versions[name]
+
+    async def get(self, name: str, key) -> dict | None:
+        """
+        Возвращает запись справочника по ключу.
+        Если записи нет в кэше — идём в БД (она могла появиться после загрузки);
+        отсутствие ключа запоминается на miss_ttl, повторы неизвестного ключа в БД не ходят.
+        """
+        table = await self._table(name)
+        row = table.get(str(key))
+        if row is not None:
+            return row
+        now = time.monotonic()
+        if self._missing.get((name, str(key)), 0.0) > now:
+            self.hits += 1
+            return None
+        self.misses += 1
+        model, pk, fields = self.tables[name]
+        row = await model.filter(**{pk: key}).first().values(*fields)
+        if row:
+            table[str(row[pk])] = row
+            self._versions[name] = self._hash(table)
+        else:
+            if len(self._missing) >= self.max_missing:
+                self._missing = {k: until for k, until in self._missing.items() if until > now}
+                if len(self._missing) >= self.max_missing:
+                    self._missing.clear()
+            self._missing[(name, str(key))] = now + self.miss_ttl
+        return row
+
+    def stats(self) -> dict:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "age": round(time.monotonic() - self._loaded_at, 1) if self._data else None,
+        }
+
+
+reference_cache = ReferenceCache(ttl=Settings.REFERENCE_CACHE_TTL, miss_ttl=Settings.REFERENCE_CACHE_MISS_TTL)
@@ -0,0 +1,164 @@
+from datetime import timedelta
+from decimal import Decimal
+from typing import Optional
+from uuid import UUID
+from loguru import logger
+from tortoise import timezone
+from tortoise.expressions import Q
+from tortoise.transactions import in_transaction
+from app.database.models import Task, TaskAssignment, TaskVerification, User
+from app.database.managers.ledger_manager import post_credits
+from app.database.managers.task_manager import release_task_slots
+from app.database.managers.user_cache import user_cache
+
+
+# 📌 Пакетная проверка: N решений — одна транзакция и несколько запросов
+
+
+async def review_verifications(reviewer_id: UUID,
+                               decisions: dict[UUID, tuple[str, Optional[str]]]) -> dict:
+    """
+    Применяет решения проверяющего: verification_id -> (approved | rejected, комментарий).
+
+    В одной транзакции:
+    - блокирует ещё не проверенные (pending) верификации, остальные пропускает
+      (в том числе арендованные другим проверяющим, пока аренда не истекла);
+    - обновляет их одним bulk_update;
+    - блокирует их назначения и по заблокированным статусам переводит их
+      в completed / rejected двумя UPDATE, возвращая места отклонённых в задания;
+    - начисляет награду за одобренные назначения пакетом через журнал проводок
+      (проводка с уже существующим ключом assignment:<id> пропускается).
+    Количество запросов не зависит от размера пачки.
+    """
+    now = timezone.now()
+    async with in_transaction("default") as conn:
+        # Порядок по ключу — параллельные пачки берут блокировки в одном порядке
+        verifications = await TaskVerification.filter(
+            verification_id__in=list(decisions), status="pending"
+        ).filter(
+            Q(reviewer_id=None) | Q(reviewer_id=reviewer_id) | Q(lease_expires_at__lt=now)
+        ).select_for_update().order_by("verification_id").using_db(conn)
+
+        # Назначения тоже под FOR UPDATE и в порядке ключа: статусы ниже — после
+        # блокировки, параллельная пачка по тому же назначению ждёт коммита этой
+        assignment_ids = sorted({v.task_assignment_id for v in verifications})
+        assignments = {
+            assignment.assignment_id: assignment
+            for assignment in await TaskAssignment.filter(assignment_id__in=assignment_ids)
+            .select_for_update().order_by("assignment_id")
+            .only("assignment_id", "user_id", "task_id", "status").using_db(conn)
+        } if assignment_ids else {}
+
+        completed, rejected = set(), set()
+        for verification in verifications:
+            status, details = decisions[verification.verification_id]
+            verification.status = status
+            verification.check_date = now
+            if details is not None:
+                verification.details = details
+            if status == "approved":
+                completed.add(verification.task_assignment_id)
+            else:
+                rejected.add(verification.task_assignment_id)
+        # Одно одобрение на назначение важнее отклонения соседней попытки
+        rejected -= completed
+
+        if verifications:
+            await TaskVerification.bulk_update(
+                verifications, fields=["status", "check_date", "details"], using_db=conn)
+
+        # Награда — только за назначения, которые до блокировки ещё не были выполнены
+        credited = [
+            assignments[assignment_id] for assignment_id in completed
+            if assignments[assignment_id].status != "completed"
+        ]
+        if completed:
+            await TaskAssignment.filter(assignment_id__in=list(completed)) \
+                .using_db(conn).update(status="completed")
+        if rejected:
+            await TaskAssignment.filter(assignment_id__in=list(rejected), status__not="completed") \
+                .using_db(conn).update(status="rejected")
+            # Отклонённое назначение освобождает место в задании (один раз)
+            released: dict[UUID, int] = {}
+            for assignment_id in rejected:
+                assignment = assignments[assignment_id]
+                if assignment.status not in ("completed", "rejected", "expired"):
+                    released[assignment.task_id] = released.get(assignment.task_id, 0) + 1
+            await release_task_slots(released, using_db=conn)
+
+        if credited:
+            rewards = dict(await Task.filter(task_id__in={a.task_id for a in credited})
+                           .using_db(conn).values_list("task_id", "reward"))
+            credited = await post_credits([
+                {
+                    "user_id": assignment.user_id,
+                    "amount": Decimal(str(rewards[assignment.task_id])),
+                    "task_id": assignment.task_id,
+                    "idempotency_key": f"assignment:{assignment.assignment_id}",
+                }
+                for assignment in credited
+            ], using_db=conn)
+
+    if credited:
+        for telegram_id in await User.filter(
+                user_id__in={entry["user_id"] for entry in credited}).values_list("telegram_id", flat=True):
+            user_cache.invalidate(telegram_id)
+
+    reviewed = {v.verification_id for v in verifications}
+    result = {
+        "approved": sum(1 for v in verifications if v.status == "approved"),
+        "rejected": sum(1 for v in verifications if v.status == "rejected"),
+        "credited": len(credited),
+        "skipped": [verification_id for verification_id in decisions
+                    if verification_id not in reviewed],
+    }
+    logger.info("✅ Проверено верификаций: {} одобрено, {} отклонено, {} начислений, {} пропущено",
+                result["approved"], result["rejected"], result["credited"], len(result["skipped"]))
+    return result
+
+
+# 📌 Очередь проверки: аренда следующих N верификаций без конкуренции
+
+
+async def claim_verifications(reviewer_id: UUID, limit: int, lease_seconds: int):
+    """
+    Выдаёт проверяющему следующие pending-верификации в порядке поступления.
+
+    Строки выбираются SELECT ... FOR UPDATE SKIP LOCKED: параллельные проверяющие
+    не ждут друг друга и не получают одни и те же строки. Выбранные помечаются
+    арендой до now + lease_seconds; после истечения аренды строка снова в очереди.
+    Незавершённые аренды этого же проверяющего выдаются повторно.
+    Возвращает (строки с назначением и заданием, срок аренды).
+    """
+    now = timezone.now()
+    lease_expires_at = now + timedelta(seconds=lease_seconds)
+    async with in_transaction("default") as conn:
+        claimed = [v.verification_id for v in await TaskVerification.filter(status="pending").filter(
+            Q(lease_expires_at=None) | Q(lease_expires_at__lt=now) | Q(reviewer_id=reviewer_id)
+        ).select_for_update(skip_locked=True).order_by("created_at", "verification_id")
+            .limit(limit).only("verification_id").using_db(conn)]
+        if claimed:
+            await TaskVerification.filter(verification_id__in=claimed).using_db(conn).update(
+                reviewer_id=reviewer_id, lease_expires_at=lease_expires_at)
+
+    if not claimed:
+        return [], lease_expires_at
+
+    rows = await TaskVerification.filter(verification_id__in=claimed) \
+        .order_by("created_at", "verification_id").values(
+            "verification_id",
+            "s3_name",
+            "processed_at",
+            "details",
+            "created_at",
+            assignment_id="task_assignment_id",
+            submitted_at="task_assignment__submitted_at",
+            executor_telegram_id="task_assignment__user__telegram_id",
+            task_id="task_assignment__task_id",
+            task_name="task_assignment__task__task_name",
+            description="task_assignment__task__description",
+            reward="task_assignment__task__reward",
+            platform_id="task_assignment__task__platform_id",
+        )
+    logger.info("📥 Проверяющему {} выдано верификаций: {}", reviewer_id, len(rows))
+    return rows, lease_expires_at
@@ -0,0 +1,377 @@
+from datetime import datetime, timedelta
+from typing import Optional
+from uuid import UUID, uuid4
+from fastapi import HTTPException
+from pypika_tortoise import Order, Table, functions as fn
+from tortoise import timezone
+from tortoise.expressions import F, Q
+from tortoise.functions import Count, Sum
+from tortoise.transactions import in_transaction
+from pypika_tortoise.terms import Criterion, ValueWrapper
+from app.database.managers.pagination import encode_cursor, decode_cursor
+from app.database.models import Task, TaskAssignment, TaskVerification, UserAccount
+from config import Settings
+
+
+# 📌 Лента доступных заданий: anti-join + keyset-пагинация
+
+
+class NotExists(Criterion):
+    """
+    NOT EXISTS (подзапрос) — в PostgreSQL планируется как Anti Join.
+    """
+
+    def __init__(self, subquery, alias: Optional[str] = None) -> None:
+        super().__init__(alias)
+        self.subquery = subquery
+
+    def nodes_(self):
+        yield self
+        yield from self.subquery.nodes_()
+
+    def get_sql(self, ctx) -> str:
+        return f"NOT EXISTS {self.subquery.get_sql(ctx.copy(subquery=True))}"
+
+
+def _to_db(model, field_name: str, value):
+    return model._meta.fields_map[field_name].to_db_value(value, model)
+
+
+async def get_task_feed(user_id: UUID, cursor: Optional[str] = None, limit: int = 20):
+    """
+    Возвращает страницу активных заданий, которые пользователь ещё не принял.
+
+    Исключение уже принятых делается одним NOT EXISTS по task_assignments,
+    порядок — (created_at, task_id) по убыванию, курсор — последняя строка страницы.
+    """
+    # Через роутер: в маршрутах на реплике лента читается с неё
+    db = Task._choose_db()
+    tasks = Table(Task._meta.db_table)
+    assignments = Table(TaskAssignment._meta.db_table).as_("ta")
+
+    taken = (
+        db.query_class.from_(assignments)
+        .select(assignments.task_id)
+        .where(assignments.task_id == tasks.task_id)
+        .where(assignments.user_id == ValueWrapper(_to_db(TaskAssignment, "user_id", user_id)))
+    )
+
+    query = (
+        db.query_class.from_(tasks)
+        .select(*Task._meta.db_fields)
+        .where(tasks.status_id == ValueWrapper("active"))
+        .where(NotExists(taken))
+    )
+
+    if cursor:
+        created_at, task_id = decode_cursor(cursor)
+        created_at = _to_db(Task, "created_at", created_at)
+        task_id = _to_db(Task, "task_id", task_id)
+        query = query.where(
+            (tasks.created_at < created_at)
+            | ((tasks.created_at == created_at) & (tasks.task_id < task_id))
+        )
+
+    query = (
+        query.orderby(tasks.created_at, order=Order.desc)
+        .orderby(tasks.task_id, order=Order.desc)
+        .limit(limit + 1)
+    )
+
+    sql, params = query.get_parameterized_sql()
+    rows = await db.execute_query_dict(sql, params)
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    for row in rows:
+        for name in ("task_id", "creator_id", "platform_id", "created_at", "reward"):
+            row[name] = Task._meta.fields_map[name].to_python_value(row[name])
+
+    next_cursor = None
+    if has_more:
+        last = rows[-1]
+        next_cursor = encode_cursor(last["created_at"], last["task_id"])
+
+    return rows, next_cursor, has_more
+
+
+# 📌 Версия ленты для ETag: без выборки самих заданий
+
+
+async def get_task_feed_version(user_id: UUID) -> tuple:
+    """
+    Меняется при любом изменении ленты пользователя: появление, изменение или уход
+    активного задания (число и MAX(updated_at) по индексу status, updated_at)
+    и принятие задания пользователем. Один запрос из трёх подзапросов по индексам.
+    """
+    db = Task._choose_db()
+    tasks = Table(Task._meta.db_table)
+    assignments = Table(TaskAssignment._meta.db_table)
+    active = db.query_class.from_(tasks).where(tasks.status_id == ValueWrapper("active"))
+    query = db.query_class.select(
+        active.select(fn.Count("*")).as_("active"),
+        active.select(fn.Max(tasks.updated_at)).as_("updated_at"),
+        db.query_class.from_(assignments).select(fn.Count("*")).where(
+            assignments.user_id == ValueWrapper(_to_db(TaskAssignment, "user_id", user_id))
+        ).as_("accepted"),
+    )
+    sql, params = query.get_parameterized_sql()
+    row = (await db.execute_query_dict(sql, params))[0]
+    return row["active"], str(row["updated_at"]), row["accepted"]
+
+
+# 📌 Мои задания: один JOIN task_assignments + tasks, keyset-пагинация
+
+
+async def get_my_assignments(user_id: UUID, statuses: Optional[list[str]] = None,
+                             cursor: Optional[str] = None, limit: int = 20):
+    """
+    Страница назначений пользователя вместе с полями задания — одним запросом.
+    Порядок — (created_at, assignment_id) по убыванию.
+    """
+    query = TaskAssignment.filter(user_id=user_id)
+    if statuses:
+        query = query.filter(status__in=statuses)
+    if cursor:
+        created_at, assignment_id = decode_cursor(cursor)
+        query = query.filter(
+            Q(created_at__lt=created_at)
+            | Q(created_at=created_at, assignment_id__lt=assignment_id)
+        )
+
+    rows = await query.order_by("-created_at", "-assignment_id").limit(limit + 1).values(
+        "assignment_id",
+        "task_id",
+        "created_at",
+        assignment_status="status",
+        description="task__description",
+        reward="task__reward",
+        status_id="task__status_id",
+    )
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    next_cursor = None
+    if has_more:
+        last = rows[-1]
+        next_cursor = encode_cursor(last["created_at"], last["assignment_id"])
+    return rows, next_cursor, has_more
+
+
+# 📌 Выполненные задания: страница + итог, посчитанный в БД
+
+
+async def get_completed_tasks(user_id: UUID, date_from: Optional[datetime] = None,
+                              date_to: Optional[datetime] = None,
+                              cursor: Optional[str] = None, limit: int = 20):
+    """
+    Страница выполненных заданий пользователя (поля задания через JOIN).
+    Период date_from / date_to и порядок — по дате сдачи работы (submitted_at),
+    а не по дате принятия задания.
+    Итог (количество, сумма наград) считается агрегатом только для первой страницы.
+    """
+    query = TaskAssignment.filter(user_id=user_id, status="completed")
+    if date_from:
+        query = query.filter(submitted_at__gte=date_from)
+    if date_to:
+        query = query.filter(submitted_at__lt=date_to)
+
+    summary = None
+    if not cursor:
+        # GROUP BY user_id — одна строка: фильтр уже по одному пользователю
+        totals = await query.annotate(
+            count=Count("assignment_id"), total_reward=Sum("task__reward")
+        ).group_by("user_id").values("count", "total_reward")
+        summary = totals[0] if totals else {"count": 0, "total_reward": 0}
+    else:
+        submitted_at, assignment_id = decode_cursor(cursor)
+        query = query.filter(
+            Q(submitted_at__lt=submitted_at)
+            | Q(submitted_at=submitted_at, assignment_id__lt=assignment_id)
+        )
+
+    rows = await query.order_by("-submitted_at", "-assignment_id").limit(limit + 1).values(
+        "assignment_id",
+        "submitted_at",
+        "task_id",
+        creator_id="task__creator_id",
+        platform_id="task__platform_id",
+        task_type_id="task__task_type_id",
+        description="task__description",
+        reward="task__reward",
+        verification_type="task__verification_type",
+        status_id="task__status_id",
+    )
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    next_cursor = None
+    if has_more:
+        last = rows[-1]
+        next_cursor = encode_cursor(last["submitted_at"], last["assignment_id"])
+    return rows, next_cursor, has_more, summary
+
+
+# 📌 Места в задании: резерв условным UPDATE, освобождение пачкой
+
+# Статус задания, набравшего max_assignments исполнителей
+TASK_FULL_STATUS = "full"
+
+
+async def reserve_task_slot(task_id: UUID, using_db) -> bool:
+    """
+    Занимает место одним условным UPDATE: счётчик растёт, только если задание активно
+    и лимит не достигнут. Конкурирующие запросы ждут блокировку строки задания,
+    а не таблицы; последний занявший место переводит задание в full.
+    """
+    reserved = await Task.filter(task_id=task_id, status_id="active").filter(
+        Q(max_assignments=None) | Q(assignments_count__lt=F("max_assignments"))
+    ).using_db(using_db).update(assignments_count=F("assignments_count") + 1)
+    if reserved:
+        await Task.filter(
+            task_id=task_id, status_id="active", assignments_count__gte=F("max_assignments")
+        ).using_db(using_db).update(status_id=TASK_FULL_STATUS, updated_at=timezone.now())
+    return bool(reserved)
+
+
+async def release_task_slots(task_counts: dict[UUID, int], using_db):
+    """
+    Возвращает места (task_id -> сколько) внутри транзакции вызывающего:
+    по одному UPDATE на каждое различное количество, затем заполненные
+    задания, где снова есть место, возвращаются в active.
+    """
+    if not task_counts:
+        return
+    by_count: dict[int, list[UUID]] = {}
+    for task_id, count in task_counts.items():
+        by_count.setdefault(count, []).append(task_id)
+    for count, task_ids in by_count.items():
+        await Task.filter(task_id__in=task_ids).using_db(using_db).update(
+            assignments_count=F("assignments_count") - count)
+    await Task.filter(task_id__in=list(task_counts), status_id=TASK_FULL_STATUS).filter(
+        Q(max_assignments=None) | Q(assignments_count__lt=F("max_assignments"))
+    ).using_db(using_db).update(status_id="active", updated_at=timezone.now())
+
+
+async def expire_assignments(ttl_hours: Optional[int] = None, batch_size: int = 1000) -> int:
+    """
+    Переводит в expired назначения, не сданные за ttl_hours, и освобождает их места.
+    Пачка выбирается FOR UPDATE SKIP LOCKED — параллельные запуски не пересекаются.
+    Возвращает число просроченных назначений в пачке (0 — больше нечего обрабатывать).
+    """
+    ttl_hours = Settings.ASSIGNMENT_TTL_HOURS if ttl_hours is None else ttl_hours
+    cutoff = timezone.now() - timedelta(hours=ttl_hours)
+    async with in_transaction("default") as conn:
+        expired = await TaskAssignment.filter(status="in_progress", created_at__lt=cutoff) \
+            .select_for_update(skip_locked=True).limit(batch_size) \
+            .only("assignment_id", "task_id").using_db(conn)
+        if not expired:
+            return 0
+        await TaskAssignment.filter(
+            assignment_id__in=[a.assignment_id for a in expired]
+        ).using_db(conn).update(status="expired")
+        task_counts: dict[UUID, int] = {}
+        for assignment in expired:
+            task_counts[assignment.task_id] = task_counts.get(assignment.task_id, 0) + 1
+        await release_task_slots(task_counts, using_db=conn)
+    return len(expired)
+
+
+# Статусы назначения, из которых его можно сдать на проверку
+SUBMITTABLE_STATUSES = ("in_progress", "rejected", "expired")
+
+
+async def submit_assignment(assignment: TaskAssignment, s3_name: str, details: Optional[str] = None,
+                            content_hash: Optional[str] = None):
+    """
+    Переводит назначение в pending_review и создаёт верификацию в одной транзакции.
+    Статус перечитывается под FOR UPDATE: просрочка, проверка или повторная сдача
+    не проходят между проверкой и записью. Сдать можно только in_progress,
+    rejected или expired, иначе 409.
+    Отклонённое или просроченное назначение уже вернуло место в задание —
+    перед повторной сдачей место занимается снова (409, если мест нет).
+    """
+    async with in_transaction("default") as conn:
+        locked = await TaskAssignment.filter(assignment_id=assignment.assignment_id) \
+            .select_for_update().using_db(conn).first()
+        if locked is None:
+            raise HTTPException(status_code=404, detail="Task not found or already submitted")
+        if locked.status not in SUBMITTABLE_STATUSES:
+            raise HTTPException(status_code=409, detail=f"Assignment is {locked.status}")
+        if locked.status in ("rejected", "expired"):
+            if not await reserve_task_slot(locked.task_id, using_db=conn):
+                raise HTTPException(status_code=409, detail="Task is full")
+        assignment = locked
+        assignment.status = "pending_review"
+        assignment.submitted_at = timezone.now()
+        await assignment.save(update_fields=["status", "submitted_at"], using_db=conn)
+        await TaskVerification.create(
+            task_assignment=assignment,
+            status="pending",
+            details=details,
+            s3_name=s3_name,
+            content_hash=content_hash,
+            using_db=conn,
+        )
+
+
+# 📌 Принятие задания: одна транзакция, INSERT ... ON CONFLICT DO NOTHING
+
+
+async def _accept_error(user_id: UUID, task_id: UUID, account_id: UUID, conn) -> HTTPException:
+    # Только на пути ошибки: уточняем, что именно не сошлось
+    task_status = await Task.filter(task_id=task_id).using_db(conn) \
+        .first().values_list("status_id", flat=True)
+    if task_status == TASK_FULL_STATUS:
+        return HTTPException(status_code=409, detail="Task is full")
+    if task_status != "active":
+        return HTTPException(status_code=404, detail="Task not found or unavailable")
+    if not await UserAccount.filter(account_id=account_id, user_id=user_id).using_db(conn).exists():
+        return HTTPException(status_code=404, detail="Account not found")
+    return HTTPException(status_code=400, detail="Account platform does not match the task")
+
+
+async def accept_task_assignment(user_id: UUID, task_id: UUID, account_id: UUID,
+                                 idempotency_key: Optional[str] = None) -> tuple[UUID, bool]:
+    """
+    Создаёт назначение, если задание активно, а аккаунт принадлежит пользователю
+    и относится к платформе задания (одна проверка через JOIN).
+
+    Дубли исключает уникальный (user, task): вставка идёт с ON CONFLICT DO NOTHING,
+    затем читается существующая строка. Повтор запроса с тем же idempotency_key
+    возвращает уже созданное назначение, без ключа — 400.
+    Место в задании резервируется только для новой строки; если мест нет —
+    409, и транзакция откатывает вставку.
+    Возвращает (assignment_id, создано ли сейчас).
+    """
+    async with in_transaction("default") as conn:
+        allowed = await UserAccount.filter(
+            account_id=account_id,
+            user_id=user_id,
+            platform__tasks__task_id=task_id,
+            platform__tasks__status_id="active",
+        ).using_db(conn).exists()
+        if not allowed:
+            raise await _accept_error(user_id, task_id, account_id, conn)
+
+        assignment_id = uuid4()
+        await TaskAssignment.bulk_create([TaskAssignment(
+            assignment_id=assignment_id,
+            user_id=user_id,
+            task_id=task_id,
+            assigned_profile_id=account_id,
+            status="in_progress",
+            idempotency_key=idempotency_key,
+        )], ignore_conflicts=True, using_db=conn)
+
+        existing = await TaskAssignment.filter(user_id=user_id, task_id=task_id) \
+            .using_db(conn).first().values("assignment_id", "idempotency_key")
+
+        if existing["assignment_id"] == assignment_id:
+            if not await reserve_task_slot(task_id, using_db=conn):
+                raise HTTPException(status_code=409, detail="Task is full")
+            return assignment_id, True
+
+    if idempotency_key is not None and existing["idempotency_key"] == idempotency_key:
+        return existing["assignment_id"], False
+    raise HTTPException(status_code=400, detail="You already accepted this task")
@@ -0,0 +1,60 @@
+from datetime import datetime
+from decimal import Decimal
+from typing import Optional
+from uuid import UUID
+from tortoise.expressions import Q
+from tortoise.functions import Count, Sum
+from app.database.managers.pagination import encode_cursor, decode_cursor
+from app.database.models import Transaction
+
+
+# 📌 История начислений: keyset-пагинация и итоги по типам одним GROUP BY
+
+
+async def get_transaction_history(user_id: UUID, transaction_types: Optional[list[str]] = None,
+                                  date_from: Optional[datetime] = None,
+                                  date_to: Optional[datetime] = None,
+                                  cursor: Optional[str] = None, limit: int = 20):
+    """
+    Страница транзакций пользователя, порядок — (created_at, transaction_id) по убыванию.
+    Для первой страницы дополнительно возвращает итог по тем же фильтрам.
+    """
+    query = Transaction.filter(user_id=user_id)
+    if transaction_types:
+        query = query.filter(transaction_type__in=transaction_types)
+    if date_from:
+        query = query.filter(created_at__gte=date_from)
+    if date_to:
+        query = query.filter(created_at__lt=date_to)
+
+    summary = None
+    if not cursor:
+        totals = await query.annotate(
+            count=Count("transaction_id"), total=Sum("amount")
+        ).group_by("transaction_type").values("transaction_type", "count", "total")
+        by_type = {
+            row["transaction_type"]: {"count": row["count"], "total": Decimal(str(row["total"] or 0))}
+            for row in totals
+        }
+        summary = {
+            "total_earned": by_type.get("credit", {}).get("total", Decimal(0)),
+            "by_type": by_type,
+        }
+    else:
+        created_at, transaction_id = decode_cursor(cursor)
+        query = query.filter(
+            Q(created_at__lt=created_at)
+            | Q(created_at=created_at, transaction_id__lt=transaction_id)
+        )
+
+    rows = await query.order_by("-created_at", "-transaction_id").limit(limit + 1).values(
+        "transaction_id", "user_id", "amount", "transaction_type", "task_id", "created_at",
+    )
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    next_cursor = None
+    if has_more:
+        last = rows[-1]
+        next_cursor = encode_cursor(last["created_at"], last["transaction_id"])
+    return rows, next_cursor, has_more, summary
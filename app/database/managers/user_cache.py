@@ -0,0 +1,74 @@
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from decimal import Decimal
+from typing import Optional
+from uuid import UUID
+from config import Settings
+
+
+# 📌 LRU-кэш с TTL: telegram_id -> лёгкий снимок пользователя
+
+
+@dataclass(frozen=True, slots=True)
+class UserSnapshot:
+    user_id: UUID
+    telegram_id: int
+    username: Optional[str]
+    role_id: str
+    balance: Decimal
+
+    @classmethod
+    def from_user(cls, user) -> "UserSnapshot":
+        return cls(
+            user_id=user.user_id,
+            telegram_id=user.telegram_id,
+            username=user.username,
+            role_id=user.role_id,
+            balance=user.balance,
+        )
+
+
+class UserCache:
+    """
+    Ограниченный по размеру кэш пользователей на воркер.
+    Инвалидация локальная, поэтому между воркерами расхождение ограничено TTL.
+    """
+
+    def __init__(self, maxsize: int, ttl: int):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._items: OrderedDict[int, tuple[float, UserSnapshot]] = OrderedDict()
+
+    def get(self, telegram_id: int) -> Optional[UserSnapshot]:
+        item = self._items.get(telegram_id)
+        if item is None or item[0] < time.monotonic():
+            self.misses += 1
+            if item is not None:
+                del self._items[telegram_id]
+            return None
+        self._items.move_to_end(telegram_id)
+        self.hits += 1
+        return item[1]
+
+    def put(self, snapshot: UserSnapshot):
+        self._items[snapshot.telegram_id] = (
+            time.monotonic() + self.ttl, snapshot)
+        self._items.move_to_end(snapshot.telegram_id)
+        while len(self._items) > self.maxsize:
+            self._items.popitem(last=False)
+
+    def invalidate(self, telegram_id: int):
+        self._items.pop(telegram_id, None)
+
+    def clear(self):
+        self._items.clear()
+
+    def stats(self) -> dict:
+        return {"size": len(self._items), "hits": self.hits, "misses": self.misses}
+
+
+user_cache = UserCache(maxsize=Settings.USER_CACHE_SIZE,
+                       ttl=Settings.USER_CACHE_TTL)
@@ -54,6 +54,7 @@ class User(Model):
 class UserAccount(Model):
     class Meta:
         table = "user_accounts"
+        indexes = (("user",),)
 
     account_id = fields.UUIDField(pk=True, default=uuid.uuid4)
     user = fields.ForeignKeyField("models.User", related_name="accounts")
@@ -113,6 +114,8 @@ class TaskStatus(Model):
 class Task(Model):
     class Meta:
         table = "tasks"
+        # Лента: активные задания по created_at; версия ленты для ETag — по updated_at
+        indexes = (("status", "created_at", "task_id"), ("status", "updated_at"))
 
     task_id = fields.UUIDField(pk=True, default=uuid.uuid4)
     task_name = fields.CharField(max_length=255)
@@ -126,7 +129,12 @@ class Task(Model):
     verification_type = fields.CharField(
         max_length=50, choices=["auto", "manual", "screenshot"])
     created_at = fields.DatetimeField(auto_now_add=True)
+    # Изменение видимых полей задания (save() и смена статуса); счётчик мест его не трогает
+    updated_at = fields.DatetimeField(auto_now=True)
     status = fields.ForeignKeyField("models.TaskStatus", related_name="tasks")
+    # Лимит исполнителей (None — без лимита) и число занятых мест
+    max_assignments = fields.IntField(null=True)
+    assignments_count = fields.IntField(default=0)
 
 # Полученные задания (исполнитель взял задание)
 
@@ -134,6 +142,10 @@ class Task(Model):
 class TaskAssignment(Model):
     class Meta:
         table = "task_assignments"
+        # Одно назначение на пару (пользователь, задание)
+        unique_together = (("user", "task"),)
+        # Мои задания по статусу и дате; выполненные по дате сдачи; просрочка in_progress
+        indexes = (("user", "status", "created_at"), ("user", "status", "submitted_at"), ("status", "created_at"))
 
     assignment_id = fields.UUIDField(pk=True, default=uuid.uuid4)
     user = fields.ForeignKeyField("models.User", related_name="tasks")
@@ -142,7 +154,10 @@ class TaskAssignment(Model):
         "models.UserAccount", related_name="assigned_tasks")
     submitted_at = fields.DatetimeField(null=True)
     status = fields.CharField(max_length=50, choices=[
-                              "in_progress", "pending_review", "completed", "rejected"], default="in_progress")
+                              "in_progress", "pending_review", "completed", "rejected", "expired"], default="in_progress")
+    # Idempotency-Key запроса на принятие: повтор отличается от дубля
+    idempotency_key = fields.CharField(max_length=128, null=True)
+    created_at = fields.DatetimeField(auto_now_add=True)
 
 
 # Проверки заданий
@@ -151,6 +166,8 @@ class TaskAssignment(Model):
 class TaskVerification(Model):
     class Meta:
         table = "task_verifications"
+        # Очередь проверки: pending в порядке поступления
+        indexes = (("status", "created_at"), ("task_assignment",))
 
     verification_id = fields.UUIDField(pk=True, default=uuid.uuid4)
     task_assignment = fields.ForeignKeyField(
@@ -160,6 +177,15 @@ class TaskVerification(Model):
                               "pending", "approved", "rejected"], default="pending")
     details = fields.TextField(null=True)
     s3_name = fields.CharField(max_length=255)
+    # SHA-256 скриншота: один и тот же файл в разных назначениях
+    content_hash = fields.CharField(max_length=64, null=True, index=True)
+    # Сжатая копия и превью скриншота выложены в S3
+    processed_at = fields.DatetimeField(null=True)
+    # Аренда в очереди проверки: кто взял и до какого момента
+    reviewer = fields.ForeignKeyField(
+        "models.User", related_name="claimed_verifications", null=True)
+    lease_expires_at = fields.DatetimeField(null=True)
+    created_at = fields.DatetimeField(auto_now_add=True)
 
 # Начисления пользователям
 
@@ -167,6 +193,8 @@ class TaskVerification(Model):
 class Transaction(Model):
     class Meta:
         table = "transactions"
+        # История пользователя по дате
+        indexes = (("user", "created_at", "transaction_id"),)
 
     transaction_id = fields.UUIDField(pk=True, default=uuid.uuid4)
     user = fields.ForeignKeyField("models.User", related_name="transactions")
@@ -175,10 +203,37 @@ class Transaction(Model):
         max_length=50, choices=["credit", "debit", "withdraw"])
     task = fields.ForeignKeyField(
         "models.Task", related_name="transactions", null=True)
-    created_at = fields.DatetimeField(auto_now_add=True)
+    # Ключ идемпотентности: повтор той же операции не создаёт вторую проводку
+    idempotency_key = fields.CharField(max_length=128, unique=True, null=True)
+    created_at = fields.DatetimeField(auto_now_add=True, index=True)
+
+# Сверка баланса с журналом транзакций
+
+
+class LedgerCheckpoint(Model):
+    class Meta:
+        table = "ledger_checkpoints"
+
+    user = fields.OneToOneField(
+        "models.User", related_name="ledger_checkpoint", pk=True)
+    # Сумма проводок пользователя до watermark (credit минус debit/withdraw)
+    ledger_total = fields.DecimalField(max_digits=12, decimal_places=2, default=0)
+    updated_at = fields.DatetimeField(auto_now=True)
+
+
+class LedgerWatermark(Model):
+    class Meta:
+        table = "ledger_watermarks"
+
+    name = fields.CharField(pk=True, max_length=50)
+    # Проводки с created_at < watermark уже учтены в ledger_checkpoints
+    watermark = fields.DatetimeField()
 
 
 class UserActionLog(Model):
+    class Meta:
+        indexes = (("user", "timestamp"),)
+
     log_id = fields.UUIDField(pk=True, default=uuid.uuid4)
     user = fields.ForeignKeyField("models.User", related_name="logs")
     # Например: "создал задание", "изменил статус"
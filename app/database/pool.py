@@ -0,0 +1,128 @@
+import asyncio
+import functools
+import time
+from dataclasses import dataclass
+from tortoise.backends.asyncpg.client import AsyncpgDBClient, TransactionWrapper
+from tortoise.backends.base.client import NestedTransactionContext, TransactionContextPooled
+from app.handlers.metrics_handlers import record_db_query
+
+
+# 📌 Движок asyncpg со статистикой пула и временем запросов: engine "app.database.pool" в конфиге Tortoise
+
+_QUERY_METHODS = ("execute_insert", "execute_many", "execute_query", "execute_query_dict", "execute_script")
+
+
+def _timed(cls, name: str):
+    @functools.wraps(getattr(cls, name))
+    async def wrapper(self, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            # Метод родителя ищется при вызове: подмены в базовом классе (tests/test_query_plans.py) видны
+            return await getattr(super(cls, self), name)(*args, **kwargs)
+        finally:
+            record_db_query(time.perf_counter() - started)
+    return wrapper
+
+
+def _time_queries(cls):
+    """
+    Оборачивает методы выполнения SQL класса клиента замером времени (хук метрик).
+    """
+    for name in _QUERY_METHODS:
+        setattr(cls, name, _timed(cls, name))
+    return cls
+
+
+@dataclass(slots=True)
+class PoolWaitStats:
+    acquired: int = 0
+    waiting: int = 0
+    timeouts: int = 0
+    wait_total: float = 0.0
+    wait_max: float = 0.0
+
+
+class _TimedPool:
+    """
+    Обёртка над asyncpg.Pool: замеряет ожидание в acquire(), остальное проксирует.
+    Tortoise берёт соединения только через `await pool.acquire()` (и в транзакциях тоже).
+    """
+
+    __slots__ = ("pool", "stats")
+
+    def __init__(self, pool, stats: PoolWaitStats):
+        self.pool = pool
+        self.stats = stats
+
+    def __getattr__(self, name):
+        return getattr(self.pool, name)
+
+    async def acquire(self, *, timeout=None):
+        stats = self.stats
+        stats.waiting += 1
+        started = time.perf_counter()
+        try:
+            connection = await self.pool.acquire(timeout=timeout)
+        except asyncio.TimeoutError:
+            stats.timeouts += 1
+            raise
+        finally:
+            stats.waiting -= 1
+        waited = time.perf_counter() - started
+        stats.acquired += 1
+        stats.wait_total += waited
+        stats.wait_max = max(stats.wait_max, waited)
+        return connection
+
+
+@_time_queries
+class _TimedTransactionWrapper(TransactionWrapper):
+    # Запросы внутри транзакций идут через обёртку, а не через клиент пула
+
+    def _in_transaction(self):
+        return NestedTransactionContext(_TimedTransactionWrapper(self))
+
+
+@_time_queries
+class PooledAsyncpgClient(AsyncpgDBClient):
+    def __init__(self, *args, **kwargs):
+        self.pool_wait = PoolWaitStats()
+        super().__init__(*args, **kwargs)
+
+    def _in_transaction(self):
+        return TransactionContextPooled(_TimedTransactionWrapper(self), self._pool_init_lock)
+
+    @property
+    def _pool(self):
+        return self._timed_pool
+
+    @_pool.setter
+    def _pool(self, pool):
+        self._timed_pool = _TimedPool(pool, self.pool_wait) if pool is not None else None
+
+    def pool_stats(self) -> dict:
+        """
+        in_use / idle — соединения пула сейчас, waiting — задачи в очереди за соединением,
+        wait_* — время получения соединения с момента старта процесса.
+        """
+        pool = self._timed_pool.pool if self._timed_pool else None
+        size = pool.get_size() if pool else 0
+        idle = pool.get_idle_size() if pool else 0
+        stats = self.pool_wait
+        return {
+            "connection": self.connection_name,
+            "min_size": self.pool_minsize,
+            "max_size": self.pool_maxsize,
+            "size": size,
+            "in_use": size - idle,
+            "idle": idle,
+            "waiting": stats.waiting,
+            "acquired": stats.acquired,
+            "timeouts": stats.timeouts,
+            "wait_avg_ms": round(stats.wait_total / stats.acquired * 1000, 3) if stats.acquired else 0.0,
+            "wait_max_ms": round(stats.wait_max * 1000, 3),
+        }
+
+
+# Имя атрибута модуля задано Tortoise (движок ищет client_class), переименовать нельзя
+client_class = PooledAsyncpgClient  # pylint: disable=invalid-name
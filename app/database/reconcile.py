@@ -0,0 +1,34 @@
+import argparse
+import asyncio
+from tortoise import Tortoise
+from app.database.managers.ledger_manager import reconcile_ledger
+from app.database.config import tortoise_config
+
+
+# 📌 Сверка баланса с журналом транзакций (для cron):
+#    python -m app.database.reconcile [--full] [--lag 60]
+
+
+async def main(full: bool, lag: int | None) -> int:
+    await Tortoise.init(config=tortoise_config())
+    try:
+        result = await reconcile_ledger(full=full, lag=lag)
+    finally:
+        await Tortoise.close_connections()
+    for mismatch in result["mismatches"]:
+        print(f"{mismatch['user_id']} (tg {mismatch['telegram_id']}): "
+              f"balance={mismatch['balance']} ledger={mismatch['ledger']}")
+    print(f"watermark={result['watermark'].isoformat()} "
+          f"users_with_entries={result['users_with_entries']} "
+          f"checked={result['checked']} mismatches={len(result['mismatches'])}")
+    return 1 if result["mismatches"] else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Сверка User.balance с транзакциями")
+    parser.add_argument("--full", action="store_true",
+                        help="проверить всех пользователей, а не только с новыми проводками")
+    parser.add_argument("--lag", type=int, default=None,
+                        help="не учитывать проводки моложе N секунд")
+    args = parser.parse_args()
+    raise SystemExit(asyncio.run(main(args.full, args.lag)))
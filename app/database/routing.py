@@ -0,0 +1,43 @@
+from contextvars import ContextVar
+from tortoise import connections
+
+
+# 📌 Чтение с реплики: только в маршрутах с зависимостью read_from_replica
+
+REPLICA_CONNECTION = "replica"
+
+_replica_reads: ContextVar[bool] = ContextVar("replica_reads", default=False)
+
+
+class ReplicaRouter:
+    """
+    Роутер Tortoise (подключается, если задан DATABASE_REPLICA_URL).
+    Чтения в запросе, помеченном read_from_replica, идут на реплику;
+    записи и все остальные запросы — на основную БД.
+    Запросы с явным using_db (транзакции) роутер не видит.
+    """
+
+    def db_for_read(self, model):
+        return REPLICA_CONNECTION if _replica_reads.get() else None
+
+    def db_for_write(self, model):
+        return None
+
+
+async def read_from_replica():
+    """
+    Зависимость для GET-маршрутов, которым допустимо отставание реплики.
+    """
+    token = _replica_reads.set(True)
+    try:
+        yield
+    finally:
+        _replica_reads.reset(token)
+
+
+def primary_db():
+    """
+    Основная БД (внутри транзакции — её соединение): для чтений, которые
+    должны видеть только что сделанные записи даже в маршрутах на реплике.
+    """
+    return connections.get("default")
@@ -1,7 +1,17 @@
 import hashlib
 import hmac
 import json
-from fastapi import HTTPException
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Optional
+from urllib.parse import parse_qsl
+from uuid import UUID
+from fastapi import Depends, HTTPException, Query
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+from jose import JWTError, jwt
+from app.database.managers.db_manager import get_user_by_telegram_id
 from config import Settings
 
 
@@ -10,62 +20,163 @@ from config import Settings
 setting = Settings()
 TELEGRAM_BOT_TOKEN = setting.TELEGRAM_BOT_TOKEN
 JWT_SECRET = setting.JWT_SECRET
+if not JWT_SECRET:
+    # Без секрета токены подписывались бы общеизвестным значением — не стартуем
+    raise RuntimeError("JWT_SECRET is not set")
+ALGORITHM = setting.ALGORITHM
+ACCESS_TOKEN_EXPIRE_MINUTES = setting.ACCESS_TOKEN_EXPIRE_MINUTES
+TELEGRAM_AUTH_MAX_AGE = setting.TELEGRAM_AUTH_MAX_AGE
+TELEGRAM_AUTH_CACHE_SIZE = setting.TELEGRAM_AUTH_CACHE_SIZE
+
+# hash -> (data_check_string, срок годности); уже проверенные init data
+_verified_hashes: OrderedDict[str, tuple[str, float]] = OrderedDict()
+
+
+@lru_cache(maxsize=1)
+def _telegram_secret_key() -> bytes:
+    # Ключ зависит только от токена бота — считаем один раз на процесс
+    return hmac.new(b"WebAppData", TELEGRAM_BOT_TOKEN.encode("utf-8"), hashlib.sha256).digest()
+
+
+def _build_data_check_string(fields: dict) -> str:
+    """
+    Все поля, кроме hash, отсортированные по ключу, в виде key=value через перевод строки.
+    """
+    if isinstance(fields.get("user"), dict):
+        # Telegram подписывает JSON без пробелов, без \u-экранирования и с экранированным "/"
+        fields["user"] = json.dumps(
+            fields["user"], separators=(',', ':'), ensure_ascii=False).replace("/", "\\/")
+    return "\n".join(f"{k}={v}" for k, v in sorted(fields.items()))
+
+
+def _remember_verified(telegram_hash: str, data_check_string: str, expires_at: float):
+    _verified_hashes[telegram_hash] = (data_check_string, expires_at)
+    while len(_verified_hashes) > TELEGRAM_AUTH_CACHE_SIZE:
+        _verified_hashes.popitem(last=False)
+
+
+def clear_verified_cache():
+    """
+    Сбрасывает кэш проверенных init data (бенчмарки, тесты).
+    """
+    _verified_hashes.clear()
 
 
 def verify_telegram_auth(telegram_data: dict):
     """
     Проверяет подлинность данных, полученных от Telegram Mini App.
+    Принимает разобранные поля или сырую строку в ключе init_data.
     """
+    if isinstance(telegram_data.get("init_data"), str):
+        telegram_data = dict(parse_qsl(
+            telegram_data["init_data"], keep_blank_values=True))
 
     if "auth_date" not in telegram_data or "hash" not in telegram_data:
         raise HTTPException(
             status_code=400, detail="🚨 Отсутствуют обязательные параметры")
 
-    # 1️⃣ Сохраняем hash и убираем его из данных
-    telegram_hash = telegram_data["hash"].strip().lower()
-    del telegram_data["hash"]
+    fields = {k: v for k, v in telegram_data.items() if k != "hash"}
+    telegram_hash = str(telegram_data["hash"]).strip().lower()
+
+    # Окно свежести auth_date
+    try:
+        auth_date = int(fields["auth_date"])
+    except (TypeError, ValueError) as e:
+        raise HTTPException(status_code=400, detail="Invalid auth_date") from e
+    now = time.time()
+    if now - auth_date > TELEGRAM_AUTH_MAX_AGE or auth_date - now > 60:
+        raise HTTPException(status_code=403, detail="Telegram auth data expired")
 
-    # 2️⃣ Убираем **chat_instance, chat_type, signature** (их не должно быть!)
-    excluded_keys = {"chat_instance", "chat_type", "signature"}
-    filtered_data = {k: v for k, v in telegram_data.items()
-                     if k not in excluded_keys}
+    data_check_string = _build_data_check_string(fields)
 
-    # 3️⃣ **Сериализуем `user` как JSON БЕЗ URL-кодирования**
-    if "user" in filtered_data and isinstance(filtered_data["user"], dict):
-        filtered_data["user"] = json.dumps(
-            # 🔥 Должен быть чистый JSON!
-            filtered_data["user"], separators=(',', ':'))
+    # Повторное открытие Mini App с теми же данными — без пересчёта HMAC
+    cached = _verified_hashes.get(telegram_hash)
+    if cached and cached[1] > now and cached[0] == data_check_string:
+        _verified_hashes.move_to_end(telegram_hash)
+        return fields
 
-    # 4️⃣ Создаём `data_check_string`
-    sorted_items = sorted(filtered_data.items(),
-                          key=lambda x: x[0])  # Сортируем
-    data_check_string = "\n".join(f"{k}={v}" for k, v in sorted_items)
+    calculated_hash = hmac.new(_telegram_secret_key(), data_check_string.encode(
+        "utf-8"), hashlib.sha256).hexdigest()
+    if not hmac.compare_digest(calculated_hash, telegram_hash):
+        raise HTTPException(status_code=403, detail="Invalid Telegram auth data")
 
-    # 🔥 Отладка:
-    print(f"📌 Data-check-string: {repr(data_check_string)}")
+    _remember_verified(telegram_hash, data_check_string,
+                       auth_date + TELEGRAM_AUTH_MAX_AGE)
+    return fields
 
-    # 5️⃣ ❗️❗️ **ГЕНЕРИРУЕМ СЕКРЕТНЫЙ КЛЮЧ ПРАВИЛЬНО!!!**
-    secret_key = hmac.new("WebAppData".encode(
-        "utf-8"), TELEGRAM_BOT_TOKEN.encode("utf-8"), hashlib.sha256).digest()
-    print(f"🔑 SECRET KEY (исправленный): {secret_key.hex()}")
 
-    # 6️⃣ Генерируем HMAC-SHA-256 хеш от `data_check_string`
-    calculated_hash = hmac.new(secret_key, data_check_string.encode(
-        "utf-8"), hashlib.sha256).hexdigest()
+# 📌 Сессионные токены: подписанный JWT с user_id, telegram_id и ролью
+
+bearer_scheme = HTTPBearer(auto_error=False)
+
 
-    # 7️⃣ Сравниваем хэши
-    print(f"📌 Telegram hash: {telegram_hash}")
-    print(f"📌 Calculated hash: {calculated_hash}")
-
-    # if not hmac.compare_digest(calculated_hash, telegram_hash):
-    #     return JSONResponse(
-    #         content={
-    #             "error": "❌ Неверная подпись (hash mismatch)",
-    #             "telegram_hash": telegram_hash,
-    #             "calculated_hash": calculated_hash,
-    #             "data_check_string": data_check_string
-    #         },
-    #         status_code=403
-    #     )
-
-    return filtered_data
+@dataclass(frozen=True, slots=True)
+class SessionUser:
+    user_id: UUID
+    telegram_id: int
+    role_id: str
+
+
+def create_access_token(user) -> tuple[str, int]:
+    """
+    Выпускает короткоживущий токен для пользователя. Возвращает (токен, срок в секундах).
+    """
+    expires_in = ACCESS_TOKEN_EXPIRE_MINUTES * 60
+    now = int(time.time())
+    payload = {
+        "sub": str(user.user_id),
+        "tg": user.telegram_id,
+        "role": user.role_id,
+        "iat": now,
+        "exp": now + expires_in,
+    }
+    return jwt.encode(payload, JWT_SECRET, algorithm=ALGORITHM), expires_in
+
+
+def decode_access_token(token: str) -> SessionUser:
+    """
+    Проверяет подпись и срок действия токена, без обращения к БД.
+    """
+    try:
+        payload = jwt.decode(token, JWT_SECRET, algorithms=[ALGORITHM])
+        return SessionUser(
+            user_id=UUID(payload["sub"]),
+            telegram_id=int(payload["tg"]),
+            role_id=payload["role"],
+        )
+    except (JWTError, KeyError, ValueError, TypeError) as e:
+        raise HTTPException(status_code=401, detail="Invalid or expired token",
+                            headers={"WWW-Authenticate": "Bearer"}) from e
+
+
+async def get_session_user(
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(bearer_scheme),
+    telegram_id: Optional[int] = Query(None),
+) -> SessionUser:
+    """
+    Текущий пользователь: из Bearer-токена (без БД),
+    иначе — по telegram_id через кэш пользователей (старые клиенты).
+    """
+    if credentials:
+        return decode_access_token(credentials.credentials)
+    if telegram_id is None:
+        raise HTTPException(status_code=401, detail="Not authenticated",
+                            headers={"WWW-Authenticate": "Bearer"})
+    user = await get_user_by_telegram_id(telegram_id)
+    return SessionUser(user_id=user.user_id, telegram_id=user.telegram_id, role_id=user.role_id)
+
+
+async def get_manager_user(
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(bearer_scheme),
+) -> SessionUser:
+    """
+    Проверяющий (роль manager). Роль берётся только из подписанного токена:
+    telegram_id в query не подтверждает личность и для проверки не принимается.
+    """
+    if not credentials:
+        raise HTTPException(status_code=401, detail="Not authenticated",
+                            headers={"WWW-Authenticate": "Bearer"})
+    user = decode_access_token(credentials.credentials)
+    if user.role_id != "manager":
+        raise HTTPException(status_code=403, detail="Manager role required")
+    return user
@@ -0,0 +1,45 @@
+import hashlib
+from typing import Optional
+from fastapi import Request, Response
+
+
+# 📌 Условные GET: ETag из дешёвой версии данных, 304 до основного запроса и сериализации
+
+# Ответ один и тот же для gzip и без него — ETag слабый
+# no-cache: клиент хранит ответ, но перед использованием всегда спрашивает сервер
+PRIVATE_CACHE_CONTROL = "private, no-cache"
+PUBLIC_CACHE_CONTROL = "public, no-cache"
+
+
+def make_etag(*parts) -> str:
+    """
+    Слабый ETag из частей версии (счётчики, даты изменения, ключи запроса).
+    """
+    digest = hashlib.blake2b(repr(parts).encode("utf-8"), digest_size=16).hexdigest()
+    return f'W/"{digest}"'
+
+
+def _matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # Сравнение слабое: W/"x" и "x" совпадают
+    opaque = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == opaque for tag in if_none_match.split(","))
+
+
+def conditional_response(request: Request, response: Response, etag: str,
+                         cache_control: str = PRIVATE_CACHE_CONTROL) -> Optional[Response]:
+    """
+    Ставит ETag и Cache-Control на ответ маршрута.
+    Если клиент прислал совпадающий If-None-Match — возвращает готовый 304,
+    и маршрут отдаёт его, не выполняя основной запрос.
+    """
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    if cache_control == PRIVATE_CACHE_CONTROL:
+        headers["Vary"] = "Authorization"
+    if _matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
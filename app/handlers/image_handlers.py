@@ -0,0 +1,118 @@
+import asyncio
+import hashlib
+import io
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from loguru import logger
+from PIL import Image, ImageOps
+from tortoise import timezone
+from app.database.models import TaskVerification
+from app.s3.s3_manager import s3_manager
+from config import Settings
+
+
+# 📌 Нормализация скриншотов и превью — в пуле процессов, вне event loop
+
+settings = Settings()
+
+
+def preview_key(s3_name: str) -> str:
+    return f"{s3_name.rsplit('.', 1)[0]}.view.webp"
+
+
+def thumbnail_key(s3_name: str) -> str:
+    return f"{s3_name.rsplit('.', 1)[0]}.thumb.webp"
+
+
+def _encode(image: Image.Image, max_dimension: int, quality: int) -> bytes:
+    image = image.copy()
+    image.thumbnail((max_dimension, max_dimension), Image.Resampling.LANCZOS)
+    buffer = io.BytesIO()
+    # Пересохранение без exif/icc — метаданные не переносятся
+    image.save(buffer, format="WEBP", quality=quality, method=4)
+    return buffer.getvalue()
+
+
+def normalize_image(path: str, max_dimension: int, thumb_size: int, quality: int) -> tuple[bytes, bytes, str]:
+    """
+    Читает оригинал из временного файла, декодирует, поворачивает по EXIF, срезает метаданные,
+    возвращает (сжатую копию, превью, SHA-256 оригинала). Выполняется в дочернем процессе.
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        while chunk := file.read(settings.S3_MULTIPART_CHUNK_SIZE):
+            digest.update(chunk)
+    with Image.open(path) as image:
+        image = ImageOps.exif_transpose(image)
+        image = image.convert("RGBA" if "A" in image.getbands() else "RGB")
+        return (
+            _encode(image, max_dimension, quality),
+            _encode(image, thumb_size, quality),
+            digest.hexdigest(),
+        )
+
+
+class ImagePool:
+    """
+    Пул процессов для Pillow: создаётся в воркере при старте (или лениво при первой
+    задаче), закрывается при остановке без ожидания — не блокирует event loop.
+    """
+
+    def __init__(self, workers: int):
+        self.workers = workers
+        self._executor: ProcessPoolExecutor | None = None
+
+    def start(self):
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.workers)
+
+    def stop(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    async def run(self, func, *args):
+        self.start()
+        return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+
+
+image_pool = ImagePool(settings.IMAGE_WORKERS)
+
+
+async def _mark_processed(s3_name: str):
+    await TaskVerification.filter(s3_name=s3_name, processed_at=None).update(processed_at=timezone.now())
+
+
+async def process_screenshot(s3_name: str):
+    """
+    Скачивает оригинал во временный файл, сжимает его в пуле процессов и кладёт
+    сжатую копию и превью рядом с оригиналом, дописывает хеш в верификацию
+    и отмечает её обработанной (processed_at).
+    Если превью уже есть (тот же файл в другом назначении), только отмечает.
+    Ошибки только логируются.
+    """
+    try:
+        if await s3_manager.head_object(thumbnail_key(s3_name)) is not None:
+            await _mark_processed(s3_name)
+            return
+        # Оригинал не держим в памяти API-воркера: поток в файл, файл читает дочерний процесс
+        fd, path = tempfile.mkstemp(suffix=os.path.splitext(s3_name)[1])
+        os.close(fd)
+        try:
+            size = await s3_manager.download_to_file(s3_name, path)
+            view, thumb, content_hash = await image_pool.run(
+                normalize_image, path,
+                settings.IMAGE_MAX_DIMENSION, settings.IMAGE_THUMB_SIZE, settings.IMAGE_QUALITY,
+            )
+        finally:
+            os.unlink(path)
+        await s3_manager.upload_to_key(preview_key(s3_name), view, "image/webp")
+        await s3_manager.upload_to_key(thumbnail_key(s3_name), thumb, "image/webp")
+        # Для прямой загрузки хеш до этого момента неизвестен
+        await TaskVerification.filter(s3_name=s3_name, content_hash=None).update(content_hash=content_hash)
+        await _mark_processed(s3_name)
+        logger.info("🖼 Скриншот обработан: {} ({} → {} / {} байт)",
+                    s3_name, size, len(view), len(thumb))
+    except Exception as e:
+        logger.exception("❌ Ошибка обработки скриншота {}: {}", s3_name, e)
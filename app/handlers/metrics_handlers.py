@@ -0,0 +1,179 @@
+import os
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Optional
+from prometheus_client import (
+    REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest, multiprocess,
+)
+
+
+# 📌 Метрики Prometheus: HTTP-маршруты, запросы к БД на HTTP-запрос, операции S3
+# Под gunicorn каждый воркер пишет значения в файлы PROMETHEUS_MULTIPROC_DIR
+# (gunicorn.conf.py), /metrics суммирует их по всем воркерам
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+HTTP_REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds", "Время обработки HTTP-запроса",
+    ["method", "route"], buckets=LATENCY_BUCKETS)
+HTTP_REQUESTS = Counter(
+    "http_requests", "HTTP-запросы по кодам ответа", ["method", "route", "status"])
+HTTP_IN_FLIGHT = Gauge(
+    "http_requests_in_flight", "HTTP-запросы в обработке", multiprocess_mode="livesum")
+DB_QUERIES_PER_REQUEST = Histogram(
+    "http_request_db_queries", "Запросов к БД за HTTP-запрос",
+    ["route"], buckets=(0, 1, 2, 3, 5, 8, 13, 21, 34, 55))
+DB_SECONDS_PER_REQUEST = Histogram(
+    "http_request_db_seconds", "Суммарное время запросов к БД за HTTP-запрос",
+    ["route"], buckets=LATENCY_BUCKETS)
+S3_OPERATION_SECONDS = Histogram(
+    "s3_operation_duration_seconds", "Время операции S3 (с повторами)",
+    ["operation", "status"], buckets=LATENCY_BUCKETS + (30,))
+
+# Путь без маршрута (404) — одна метка, чтобы сканеры не плодили ряды
+UNMATCHED_ROUTE = "unmatched"
+
+
+@dataclass(slots=True)
+class _DbUsage:
+    queries: int = 0
+    seconds: float = 0.0
+
+
+_db_usage: ContextVar[Optional[_DbUsage]] = ContextVar("db_usage", default=None)
+
+# Дочерние метрики по (метод, маршрут, код): labels() с блокировкой — не на каждый запрос.
+# Маршрутов и кодов конечное число, кэш не растёт
+_route_children: dict[tuple[str, str, int], tuple] = {}
+
+
+def _route_metrics(method: str, route: str, status: int) -> tuple:
+    key = (method, route, status)
+    children = _route_children.get(key)
+    if children is None:
+        children = _route_children[key] = (
+            HTTP_REQUEST_SECONDS.labels(method, route),
+            HTTP_REQUESTS.labels(method, route, str(status)),
+            DB_QUERIES_PER_REQUEST.labels(route),
+            DB_SECONDS_PER_REQUEST.labels(route),
+        )
+    return children
+
+
+def record_db_query(seconds: float):
+    """
+    Хук движка БД (app/database/pool.py): запрос засчитывается текущему HTTP-запросу.
+    Вне HTTP-запроса (CLI-задания) ничего не делает.
+    """
+    usage = _db_usage.get()
+    if usage is not None:
+        usage.queries += 1
+        usage.seconds += seconds
+
+
+class MetricsMiddleware:
+    """
+    ASGI-middleware (без BaseHTTPMiddleware и лишних задач): время, код ответа
+    и запросы к БД по шаблону маршрута FastAPI (/tasks/{task_id}), а не по пути.
+    Замер заканчивается на последнем куске тела ответа (more_body=False):
+    BackgroundTasks выполняются после него и в метрики запроса не попадают.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        finished = False
+        usage = _DbUsage()
+        started = time.perf_counter()
+
+        def finish():
+            nonlocal finished
+            if finished:
+                return
+            finished = True
+            elapsed = time.perf_counter() - started
+            HTTP_IN_FLIGHT.dec()
+            # Роутер FastAPI кладёт найденный маршрут в scope
+            route = scope.get("route")
+            latency, requests, db_queries, db_seconds = _route_metrics(
+                scope["method"], route.path if route is not None else UNMATCHED_ROUTE, status)
+            latency.observe(elapsed)
+            requests.inc()
+            db_queries.observe(usage.queries)
+            db_seconds.observe(usage.seconds)
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+            if message["type"] == "http.response.body" and not message.get("more_body", False):
+                # Запросы фоновых задач после этого уже не засчитываются
+                finish()
+
+        token = _db_usage.set(usage)
+        HTTP_IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            # Ответ не был отправлен до конца (ошибка, обрыв соединения)
+            finish()
+            _db_usage.reset(token)
+
+
+# 📌 S3: события botocore вокруг каждого вызова API (включая части multipart)
+
+
+def _s3_call_started(context, **kwargs):
+    # Ничего не возвращает: ответ обработчика before-call botocore принял бы за ответ S3
+    context["metrics_started"] = time.perf_counter()
+
+
+def _s3_call_finished(context, model, http_response=None, **kwargs):
+    started = context.pop("metrics_started", None)
+    if started is None:
+        return
+    status = str(http_response.status_code) if http_response is not None else "error"
+    S3_OPERATION_SECONDS.labels(model.name, status).observe(time.perf_counter() - started)
+
+
+def _s3_call_failed(context, **kwargs):
+    # Ошибка соединения или таймаут после всех повторов: ответа нет
+    started = context.pop("metrics_started", None)
+    if started is not None:
+        operation = kwargs["event_name"].rsplit(".", 1)[-1]
+        S3_OPERATION_SECONDS.labels(operation, "error").observe(time.perf_counter() - started)
+
+
+def instrument_s3_client(client):
+    """
+    Подписывает клиент aiobotocore на замер операций (вызывается при открытии клиента).
+    """
+    events = client.meta.events
+    events.register("before-call.s3", _s3_call_started)
+    events.register("after-call.s3", _s3_call_finished)
+    events.register("after-call-error.s3", _s3_call_failed)
+
+
+# 📌 Отдача /metrics
+
+
+def render_metrics() -> bytes:
+    """
+    Текст в формате Prometheus. Под gunicorn — сумма по файлам всех воркеров,
+    включая завершившиеся (счётчики не теряются при перезапуске воркера).
+    """
+    # Так же, как prometheus_client выбирает режим при импорте
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry)
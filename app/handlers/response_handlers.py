@@ -0,0 +1,36 @@
+from functools import lru_cache
+from typing import Any, Optional
+from fastapi import Response
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter
+from pydantic_core import to_json
+
+
+# 📌 Быстрая сериализация ответов: одна валидация pydantic и JSON из pydantic-core
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSON кодируется pydantic-core (Rust) вместо json.dumps.
+    Формат тот же, что у FastAPI по response_model: Decimal и UUID — строками,
+    datetime — ISO 8601; модели pydantic кодируются своим сериализатором.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return to_json(content)
+
+
+@lru_cache(maxsize=None)
+def _adapter(schema) -> TypeAdapter:
+    return TypeAdapter(schema)
+
+
+def model_response(schema, data: Any, response: Optional[Response] = None) -> Response:
+    """
+    Проверяет строки из БД схемой ответа один раз и сразу отдаёт JSON-байты.
+    Response, возвращённый маршрутом, FastAPI не валидирует повторно по response_model
+    (она остаётся для OpenAPI). Заголовки внедрённого response (ETag и т. п.) переносятся.
+    """
+    adapter = _adapter(schema)
+    body = adapter.dump_json(adapter.validate_python(data))
+    headers = dict(response.headers) if response is not None else None
+    return Response(body, media_type="application/json", headers=headers)
@@ -0,0 +1,47 @@
+import re
+from starlette.exceptions import HTTPException
+from starlette.responses import JSONResponse
+
+
+# 📌 Лимит тела загрузки — до разбора multipart-формы
+
+# Запас на границы multipart и текстовые поля формы сверх самого файла
+FORM_OVERHEAD = 64 * 1024
+
+
+class UploadLimitMiddleware:
+    """
+    ASGI-middleware для маршрутов загрузки файлов (POST /tasks/{task_id}/submit).
+    FastAPI разбирает форму (и спулит файл на диск) до вызова обработчика и зависимостей,
+    поэтому лимит проверяется здесь: по Content-Length — сразу 413 без чтения тела,
+    без Content-Length (chunked) — по мере чтения, разбор обрывается на превышении.
+    """
+
+    def __init__(self, app, max_size: int, path_pattern: str = r"^/tasks/[^/]+/submit$"):
+        self.app = app
+        self.max_body = max_size + FORM_OVERHEAD
+        self.path = re.compile(path_pattern)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "POST" or not self.path.match(scope["path"]):
+            await self.app(scope, receive, send)
+            return
+
+        length = dict(scope["headers"]).get(b"content-length")
+        if length is not None and length.isdigit() and int(length) > self.max_body:
+            response = JSONResponse(status_code=413, content={"error": "Screenshot is too large"})
+            await response(scope, receive, send)
+            return
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_body:
+                    raise HTTPException(status_code=413, detail="Screenshot is too large")
+            return message
+
+        await self.app(scope, limited_receive, send)
@@ -1,3 +1,4 @@
+from datetime import datetime
 from typing import Optional
 from pydantic import BaseModel, UUID4
 
@@ -7,8 +8,8 @@ class TaskAssignmentSchema(BaseModel):
     assignment_id: UUID4
     user_id: UUID4
     task_id: UUID4
-    assigned_profile_id: int  # ID аккаунта пользователя
-    submitted_at: Optional[str]
+    assigned_profile_id: UUID4  # ID аккаунта пользователя
+    submitted_at: Optional[datetime]
     status: str
 
 
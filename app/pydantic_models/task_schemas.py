@@ -1,4 +1,5 @@
 from typing import Optional
+from datetime import datetime
 from decimal import Decimal
 from pydantic import BaseModel, UUID4
 
@@ -31,6 +32,14 @@ class TaskSchema(BaseModel):
     verification_type: str
     status_id: str
 
+# Страница ленты доступных заданий
+
+
+class TaskFeedSchema(BaseModel):
+    items: list[TaskSchema]
+    next_cursor: Optional[str] = None
+    has_more: bool
+
 # Создание задания
 
 
@@ -52,8 +61,28 @@ class MyTaskSchema(BaseModel):
     assignment_id: UUID4
     task_id: UUID4
     description: str
-    reward: int
+    reward: Decimal
     status_id: str
+    assignment_status: str
+    created_at: datetime
+
+
+class CompletedSummarySchema(BaseModel):
+    count: int
+    total_reward: Decimal
+
+
+class CompletedTasksPageSchema(BaseModel):
+    items: list[TaskSchema]
+    next_cursor: Optional[str] = None
+    has_more: bool
+    summary: Optional[CompletedSummarySchema] = None
+
+
+class MyTaskPageSchema(BaseModel):
+    items: list[MyTaskSchema]
+    next_cursor: Optional[str] = None
+    has_more: bool
 
 
 class TaskUpdateSchema(BaseModel):
@@ -1,6 +1,10 @@
-from typing import Optional
+from typing import Literal, Optional
+from datetime import datetime
 from decimal import Decimal
-from pydantic import BaseModel, UUID4
+from pydantic import BaseModel, Field, UUID4
+
+
+TransactionType = Literal["credit", "debit", "withdraw"]
 
 
 class TransactionSchema(BaseModel):
@@ -9,7 +13,7 @@ class TransactionSchema(BaseModel):
     amount: Decimal
     transaction_type: str
     task_id: Optional[UUID4]
-    created_at: str
+    created_at: datetime
 
 
 class TransactionCreateSchema(BaseModel):
@@ -17,3 +21,31 @@ class TransactionCreateSchema(BaseModel):
     amount: Decimal
     transaction_type: str
     task_id: Optional[UUID4] = None
+
+
+class TransactionTypeSummarySchema(BaseModel):
+    count: int
+    total: Decimal
+
+
+class TransactionSummarySchema(BaseModel):
+    total_earned: Decimal
+    by_type: dict[str, TransactionTypeSummarySchema]
+
+
+class TransactionHistoryPageSchema(BaseModel):
+    items: list[TransactionSchema]
+    next_cursor: Optional[str] = None
+    has_more: bool
+    summary: Optional[TransactionSummarySchema] = None
+
+
+# Параметры GET /tasks/history: фильтры и страница
+
+
+class TransactionHistoryQuery(BaseModel):
+    transaction_type: Optional[list[TransactionType]] = None
+    date_from: Optional[datetime] = None
+    date_to: Optional[datetime] = None
+    cursor: Optional[str] = None
+    limit: int = Field(20, ge=1, le=100)
@@ -27,6 +27,9 @@ class UserSchema(BaseModel):
 class UserResponseSchema(BaseModel):
     user_id: UUID4
     username: str
+    access_token: str
+    token_type: str = "bearer"
+    expires_in: int
 
 
 class UserCreateSchema(BaseModel):
@@ -1,5 +1,7 @@
-from typing import Optional
-from pydantic import BaseModel, UUID4
+from datetime import datetime
+from decimal import Decimal
+from typing import Literal, Optional
+from pydantic import BaseModel, Field, UUID4
 
 
 class TaskVerificationSchema(BaseModel):
@@ -15,3 +17,74 @@ class TaskVerificationCreateSchema(BaseModel):
     status: str
     details: Optional[str] = None
     screenshot: Optional[bytes] = None
+
+
+# Прямая загрузка в S3: выдача presigned POST и подтверждение
+
+
+class UploadUrlRequest(BaseModel):
+    assignment_id: UUID4
+    content_type: str = "image/png"
+
+
+class UploadUrlSchema(BaseModel):
+    url: str
+    fields: dict[str, str]
+    key: str
+    expires_in: int
+
+
+class SubmitTaskForm(BaseModel):
+    # Поля multipart-формы POST /tasks/{task_id}/submit (скриншот — отдельным File)
+    assignment_id: UUID4
+    details: Optional[str] = None
+
+
+class ConfirmUploadRequest(BaseModel):
+    assignment_id: UUID4
+    key: str
+    details: Optional[str] = None
+
+
+# Пакетная проверка скриншотов проверяющим
+
+
+class ReviewDecision(BaseModel):
+    verification_id: UUID4
+    status: Literal["approved", "rejected"]
+    details: Optional[str] = None
+
+
+class ReviewBatchRequest(BaseModel):
+    decisions: list[ReviewDecision] = Field(..., min_length=1, max_length=5000)
+
+
+class ReviewBatchResultSchema(BaseModel):
+    approved: int
+    rejected: int
+    credited: int
+    skipped: list[UUID4]
+
+
+# Очередь проверки: арендованные проверяющим верификации
+
+
+class ReviewQueueItemSchema(BaseModel):
+    verification_id: UUID4
+    assignment_id: UUID4
+    task_id: UUID4
+    task_name: str
+    description: str
+    reward: Decimal
+    platform_id: UUID4
+    executor_telegram_id: int
+    submitted_at: Optional[datetime] = None
+    created_at: datetime
+    details: Optional[str] = None
+    screenshot_url: Optional[str] = None
+    thumbnail_url: Optional[str] = None
+
+
+class ReviewClaimSchema(BaseModel):
+    items: list[ReviewQueueItemSchema]
+    lease_expires_at: datetime
@@ -2,6 +2,8 @@ from .account_route import account_router
 from .tasks_route import tasks_router
 from .auth_route import auth_router
 from .task_status_route import task_status_router
+from .review_route import review_router
+from .system_route import system_router, metrics_router
 
 
 def register_routes(app):
@@ -9,3 +11,6 @@ def register_routes(app):
     app.include_router(tasks_router)
     app.include_router(auth_router)
     app.include_router(task_status_router)
+    app.include_router(review_router)
+    app.include_router(system_router)
+    app.include_router(metrics_router)
@@ -1,39 +1,58 @@
 import uuid
 from uuid import UUID
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
 from loguru import logger
-from app.database.managers.db_manager import get_user_by_telegram_id
-from app.database.models import User, UserAccount, TaskPlatform
+from logger import sampled
+from app.database.managers.db_manager import get_fresh_user_by_telegram_id
+from app.database.managers.user_cache import user_cache
+from app.handlers.auth_handlers import SessionUser, get_session_user
+from app.handlers.etag_handlers import PUBLIC_CACHE_CONTROL, conditional_response, make_etag
+from app.handlers.response_handlers import FastJSONResponse, model_response
+from app.database.models import User, UserAccount
+from app.database.managers.reference_cache import reference_cache
+from app.database.routing import read_from_replica
 from app.pydantic_models.user_schemas import UserSchema, UserCreateSchema
 from app.pydantic_models.account_schemas import UserAccountCreateSchema, UserAccountSchema, UserAccountUpdateSchema
 
 
 account_router = APIRouter(tags=["account"])
 
+
+def _user_schema(user: User) -> UserSchema:
+    return UserSchema(
+        user_id=user.user_id,
+        telegram_id=user.telegram_id,
+        username=user.username,
+        role=user.role_id,
+        balance=user.balance,
+        referrer=user.referrer_id,
+    )
+
 # 📌 2. Получение информации о текущем пользователе
 
 
 @account_router.get("/accounts/me", response_model=UserSchema)
-async def get_current_user(user: User = Depends(get_user_by_telegram_id)):
-    # Конвертация Tortoise ORM в Pydantic
-    return UserSchema.model_validate(user)
+async def get_current_user(user: User = Depends(get_fresh_user_by_telegram_id)):
+    # Баланс нужен актуальный — берём пользователя из БД, минуя кэш
+    return _user_schema(user)
 
 
 # 📌 3. Обновление информации о пользователе
 @account_router.patch("/me", response_model=UserSchema)
-async def update_user(data: UserCreateSchema, user: User = Depends(get_user_by_telegram_id)):
+async def update_user(data: UserCreateSchema, user: User = Depends(get_fresh_user_by_telegram_id)):
     """
     Обновление информации о пользователе (например, имени).
     """
     user.username = data.username or user.username
     await user.save()
-    return user
+    user_cache.invalidate(user.telegram_id)
+    return _user_schema(user)
 
 # 📌 Обновление задания
 
 
 @account_router.patch("/{account_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def update_task(account_id: UUID, account_data: UserAccountUpdateSchema, user: User = Depends(get_user_by_telegram_id)):
+async def update_task(account_id: UUID, account_data: UserAccountUpdateSchema, user: SessionUser = Depends(get_session_user)):
     account = await UserAccount.get_or_none(account_id=account_id)
     if not account:
         raise HTTPException(status_code=404, detail="Аккаунт не найден")
@@ -47,7 +66,7 @@ async def update_task(account_id: UUID, account_data: UserAccountUpdateSchema, u
 
 
 @account_router.delete("/{account_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_task(account_id: UUID,  user: User = Depends(get_user_by_telegram_id)):
+async def delete_task(account_id: UUID,  user: SessionUser = Depends(get_session_user)):
     account = await UserAccount.get_or_none(account_id=account_id)
     if not account:
         raise HTTPException(status_code=404, detail="Аккаунт не найден")
@@ -61,23 +80,24 @@ async def delete_task(account_id: UUID,  user: User = Depends(get_user_by_telegr
 
 
 @account_router.post("/accounts", status_code=201)
-async def add_account(account_data: UserAccountCreateSchema, user: User = Depends(get_user_by_telegram_id)):
+async def add_account(account_data: UserAccountCreateSchema, user: SessionUser = Depends(get_session_user)):
     """
     Привязка соцсети (YouTube, Twitter, Telegram и т. д.).
     """
     try:
-        logger.info(
-            f"📥 Принимаем данные для привязки аккаунта: {account_data.dict()}")
-        logger.info(f"🔍 Telegram ID пользователя: {user.telegram_id}")
+        log = sampled("add_account")
+        logger.opt(lazy=True).debug(
+            "📥 Принимаем данные для привязки аккаунта: {}", account_data.model_dump)
+        log.info("🔍 Привязка аккаунта, Telegram ID пользователя: {}", user.telegram_id)
 
         # Валидация платформы
-        platform = await TaskPlatform.get_or_none(platform_id=account_data.platform)
+        platform = await reference_cache.get("platforms", account_data.platform)
         if platform:
-            logger.info(
-                f"✅ Платформа найдена: {platform.platform_name} ({platform.platform_id})")
+            log.debug("✅ Платформа найдена: {} ({})",
+                      platform['platform_name'], platform['platform_id'])
         else:
             logger.warning(
-                f"❌ Платформа с ID {account_data.platform} не найдена!")
+                "❌ Платформа с ID {} не найдена!", account_data.platform)
             raise HTTPException(status_code=404, detail="Platform not found")
 
         # Повторная загрузка пользователя (опционально)
@@ -89,47 +109,47 @@ async def add_account(account_data: UserAccountCreateSchema, user: User = Depend
         # Создание аккаунта
         await UserAccount.create(
             account_id=uuid.uuid4(),
-            user=user,
-            platform=platform,
+            user_id=user.user_id,
+            platform_id=account_data.platform,
             account_name=account_data.account_name,
             account_platform_id=account_data.account_platform_id,
         )
 
-        logger.info(
-            f"✅ Аккаунт успешно привязан для пользователя {user.user_id}")
+        log.info("✅ Аккаунт успешно привязан для пользователя {}", user.user_id)
         return {"message": "Account successfully linked"}
 
     except HTTPException as http_err:
         raise http_err
     except Exception as e:
-        logger.exception(f"❌ Ошибка при привязке аккаунта: {e}")
+        logger.exception("❌ Ошибка при привязке аккаунта: {}", e)
         raise HTTPException(
             status_code=500, detail="Internal server error") from e
 
 
 # 📌 5. Получение всех привязанных соцсетей пользователя
-@account_router.get("/accounts", response_model=list[UserAccountSchema])
-async def get_accounts(user: User = Depends(get_user_by_telegram_id)):
+@account_router.get("/accounts", response_model=list[UserAccountSchema],
+                    dependencies=[Depends(read_from_replica)])
+async def get_accounts(user: SessionUser = Depends(get_session_user)):
     """
     Получение списка привязанных соцсетей.
     """
     accounts = await UserAccount.filter(user=user.user_id).all().values(
         "account_id",
-        "user_id",
-        "platform_id",
         "account_name",
         "account_platform_id",
+        user="user_id",
+        platform="platform_id",
     )
 
-    return [UserAccountSchema(
-        account_id=acc["account_id"],
-        user=acc["user_id"],
-        platform=acc["platform_id"],
-        account_name=acc["account_name"],
-        account_platform_id=acc["account_platform_id"],
-    ) for acc in accounts]
+    return model_response(list[UserAccountSchema], accounts)
 
 
-@account_router.get("/platforms")
-async def get_all_platforms():
-    return await TaskPlatform.all().values("platform_id", "platform_name")
+@account_router.get("/platforms", dependencies=[Depends(read_from_replica)])
+async def get_all_platforms(request: Request, response: Response):
+    # Справочник в памяти воркера: версия — хеш содержимого, одинаковый на всех воркерах
+    not_modified = conditional_response(
+        request, response, make_etag("platforms", await reference_cache.version("platforms")),
+        PUBLIC_CACHE_CONTROL)
+    if not_modified:
+        return not_modified
+    return FastJSONResponse(await reference_cache.all("platforms"), headers=dict(response.headers))
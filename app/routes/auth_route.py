@@ -1,9 +1,11 @@
 import json
 from fastapi import APIRouter, HTTPException
 from loguru import logger
+from logger import sampled
 from app.database.models import User
+from app.database.managers.user_cache import user_cache
 from app.pydantic_models.user_schemas import UserResponseSchema
-from app.handlers.auth_handlers import verify_telegram_auth
+from app.handlers.auth_handlers import verify_telegram_auth, create_access_token
 
 
 auth_router = APIRouter(prefix="/accounts", tags=["account"])
@@ -14,12 +16,13 @@ async def auth(telegram_data: dict):
     """
     Аутентификация через Telegram Mini App.
     """
-    logger.info("📌 Полученные данные от Telegram: %s", telegram_data)
+    # Сырые данные Telegram — только на DEBUG и без форматирования, если уровень выше
+    logger.opt(lazy=True).debug(
+        "📌 Полученные данные от Telegram: {}", lambda: telegram_data)
 
     try:
         # 🔹 Проверяем подпись Telegram
         user_data = verify_telegram_auth(telegram_data)
-        logger.info("📌 После верификации Telegram: %s", user_data)
 
         if not user_data:
             logger.warning("🚨 Ошибка верификации Telegram-данных!")
@@ -30,18 +33,16 @@ async def auth(telegram_data: dict):
         if isinstance(user_data["user"], str):
             user_data["user"] = json.loads(user_data["user"])
 
-        logger.info("📌 Декодированные данные пользователя: %s",
-                    user_data["user"])
-
         telegram_id = user_data["user"]["id"]
         username = user_data["user"]["username"]
 
-        logger.info("📌 Telegram ID: %s | Username: %s", telegram_id, username)
+        log = sampled("auth")
+        log.info("📌 Telegram ID: {} | Username: {}", telegram_id, username)
 
         # 🔹 Проверяем, есть ли пользователь в БД
         user = await User.get_or_none(telegram_id=telegram_id)
         if user:
-            logger.info("✅ Пользователь найден в БД: %s", user)
+            log.debug("✅ Пользователь найден в БД: {}", user.user_id)
         else:
             logger.info("🆕 Пользователь НЕ найден, создаем нового...")
             user = await User.create(
@@ -50,13 +51,21 @@ async def auth(telegram_data: dict):
                 role_id="executor",  # По умолчанию – исполнитель
                 balance=0,
             )
-            logger.info("✅ Новый пользователь создан: %s", user)
+            logger.info("✅ Новый пользователь создан: {}", user.user_id)
+            user_cache.invalidate(telegram_id)
 
-        # 🔹 Возвращаем ID пользователя
-        logger.info("📌 Возвращаем user_id: %s", user.user_id)
-        return UserResponseSchema(user_id=user.user_id, username=user.username)
+        # 🔹 Возвращаем ID пользователя и сессионный токен
+        access_token, expires_in = create_access_token(user)
+        return UserResponseSchema(
+            user_id=user.user_id,
+            username=user.username,
+            access_token=access_token,
+            expires_in=expires_in,
+        )
 
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.exception("❌ Ошибка в auth(): %s", str(e))
+        logger.exception("❌ Ошибка в auth(): {}", e)
         raise HTTPException(
             status_code=500, detail="Internal Server Error") from e
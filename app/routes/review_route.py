@@ -0,0 +1,67 @@
+import asyncio
+from fastapi import APIRouter, Depends, Query
+from loguru import logger
+from app.pydantic_models.verification_schemas import (
+    ReviewBatchRequest, ReviewBatchResultSchema, ReviewClaimSchema, ReviewQueueItemSchema,
+)
+from app.handlers.auth_handlers import SessionUser, get_manager_user
+from app.database.managers.review_manager import review_verifications, claim_verifications
+from app.handlers.image_handlers import preview_key, thumbnail_key
+from app.s3.s3_manager import s3_manager
+from config import Settings
+
+
+review_router = APIRouter(prefix="/reviews", tags=["Review"])
+settings = Settings()
+
+
+# 📌 Очередь проверки: взять следующие N верификаций в аренду
+
+
+@review_router.post("/claim", response_model=ReviewClaimSchema)
+async def claim_reviews(
+    limit: int = Query(10, ge=1, le=settings.REVIEW_CLAIM_MAX),
+    manager: SessionUser = Depends(get_manager_user),
+):
+    """
+    Выдаёт проверяющему пачку pending-верификаций, которые никто другой сейчас не проверяет.
+    Ссылки ведут на сжатую копию и превью; пока скриншот не обработан — на оригинал.
+    Ссылки живут столько же, сколько аренда.
+    """
+    rows, lease_expires_at = await claim_verifications(
+        manager.user_id, limit, settings.REVIEW_LEASE_SECONDS)
+    keys = [
+        (preview_key(row["s3_name"]), thumbnail_key(row["s3_name"])) if row["processed_at"]
+        else (row["s3_name"], row["s3_name"])
+        for row in rows
+    ]
+    urls = await asyncio.gather(*(
+        s3_manager.generate_presigned_get(key, settings.REVIEW_LEASE_SECONDS)
+        for pair in keys for key in pair
+    ))
+    return ReviewClaimSchema(
+        items=[
+            ReviewQueueItemSchema(**row, screenshot_url=urls[2 * i], thumbnail_url=urls[2 * i + 1])
+            for i, row in enumerate(rows)
+        ],
+        lease_expires_at=lease_expires_at,
+    )
+
+
+# 📌 Пакетное одобрение / отклонение скриншотов
+
+
+@review_router.post("/batch", response_model=ReviewBatchResultSchema)
+async def review_batch(data: ReviewBatchRequest, manager: SessionUser = Depends(get_manager_user)):
+    """
+    Применяет решения по верификациям одной транзакцией.
+    Уже проверенные, чужие арендованные и несуществующие верификации возвращаются в skipped.
+    """
+    decisions = {
+        decision.verification_id: (decision.status, decision.details)
+        for decision in data.decisions
+    }
+    result = await review_verifications(manager.user_id, decisions)
+    logger.info("🧾 Проверяющий {} обработал пачку из {} решений",
+                manager.telegram_id, len(decisions))
+    return ReviewBatchResultSchema(**result)
@@ -0,0 +1,55 @@
+import asyncio
+import hmac
+from typing import Optional
+from fastapi import APIRouter, Depends, Header, HTTPException, Response
+from prometheus_client import CONTENT_TYPE_LATEST
+from app.database.config import pool_stats
+from app.database.managers.reference_cache import reference_cache
+from app.database.managers.user_cache import user_cache
+from app.handlers.auth_handlers import SessionUser, get_manager_user
+from app.handlers.metrics_handlers import render_metrics
+from config import Settings
+from logger import action_log_sink
+
+
+system_router = APIRouter(prefix="/system", tags=["System"])
+metrics_router = APIRouter(tags=["System"])
+
+if Settings.LOG_MODE == "prod" and not Settings.METRICS_TOKEN:
+    # В проде /metrics без токена раскрыл бы маршруты и нагрузку — не стартуем
+    raise RuntimeError("METRICS_TOKEN is not set")
+
+
+# 📌 Состояние воркера, который обработал запрос: пул соединений с БД и кэши
+
+
+@system_router.get("/db-pool")
+async def get_db_pool_stats(manager: SessionUser = Depends(get_manager_user)):
+    """
+    Соединения пула: занятые, свободные, ожидающие задачи и время ожидания соединения.
+    Пусто, если движок БД без пула (SQLite в разработке).
+    Рядом — попадания и промахи кэшей справочников и пользователей этого воркера
+    и очередь записи логов действий: поставлено, записано, отброшено при переполнении.
+    """
+    return {
+        "pools": pool_stats(),
+        "reference_cache": reference_cache.stats(),
+        "user_cache": user_cache.stats(),
+        "action_log": action_log_sink.stats(),
+    }
+
+
+# 📌 Метрики для Prometheus (сумма по всем воркерам gunicorn)
+
+
+@metrics_router.get("/metrics", include_in_schema=False)
+async def get_metrics(authorization: Optional[str] = Header(None)):
+    """
+    Формат Prometheus. Если задан METRICS_TOKEN — только с Authorization: Bearer <токен>.
+    """
+    if Settings.METRICS_TOKEN and not hmac.compare_digest(
+            authorization or "", f"Bearer {Settings.METRICS_TOKEN}"):
+        raise HTTPException(status_code=401, detail="Not authenticated")
+    # Чтение файлов воркеров — вне event loop
+    body = await asyncio.to_thread(render_metrics)
+    return Response(body, media_type=CONTENT_TYPE_LATEST)
@@ -1,40 +1,75 @@
+import os
+from datetime import datetime
+from typing import Annotated, Literal, Optional
 from uuid import UUID
 from loguru import logger
-from fastapi import APIRouter, UploadFile, File, Form, HTTPException, Depends
+from fastapi import (
+    APIRouter, BackgroundTasks, UploadFile, File, Form, Header, HTTPException, Depends, Query, Request, Response,
+)
 from fastapi.responses import JSONResponse
-from app.pydantic_models.task_schemas import TaskSchema, AcceptTaskRequest, MyTaskSchema
-from app.pydantic_models.transaction_schemas import TransactionSchema
-from app.s3.s3_manager import AsyncS3Manager
-from app.database.managers.db_manager import get_user_by_telegram_id
-from app.database.models import Task, TaskAssignment, User, Transaction, UserAccount, TaskVerification
+from app.pydantic_models.task_schemas import (
+    TaskSchema, TaskFeedSchema, AcceptTaskRequest, MyTaskPageSchema, CompletedTasksPageSchema,
+)
+from app.pydantic_models.transaction_schemas import TransactionHistoryPageSchema, TransactionHistoryQuery
+from app.pydantic_models.verification_schemas import (
+    UploadUrlRequest, UploadUrlSchema, ConfirmUploadRequest, SubmitTaskForm,
+)
+from app.s3.s3_manager import s3_manager, UploadTooLargeError
+from app.handlers.image_handlers import process_screenshot
+from app.handlers.auth_handlers import SessionUser, get_session_user
+from app.handlers.etag_handlers import conditional_response, make_etag
+from app.handlers.response_handlers import model_response
+from app.database.managers.task_manager import (
+    get_task_feed, get_task_feed_version, get_my_assignments, get_completed_tasks, accept_task_assignment, submit_assignment,
+    SUBMITTABLE_STATUSES,
+)
+from app.database.managers.transaction_manager import get_transaction_history
+from app.database.models import Task, TaskAssignment, TaskVerification
+from app.database.routing import read_from_replica
+from config import Settings
+from logger import sampled
 
 
 tasks_router = APIRouter(prefix="/tasks", tags=["tasks"])
+settings = Settings()
+
+UPLOAD_CONTENT_TYPES = {"image/png": ".png", "image/jpeg": ".jpg", "image/webp": ".webp"}
+UPLOAD_EXTENSIONS = {".png": "image/png", ".jpg": "image/jpeg", ".jpeg": "image/jpeg", ".webp": "image/webp"}
+AssignmentStatus = Literal["in_progress", "pending_review", "completed", "rejected", "expired"]
 
 # 📌 Получить список всех доступных заданий
 
 
-@tasks_router.get("/", response_model=list[TaskSchema])
-async def get_available_tasks(telegram_id: int):
-    """ Возвращает список активных заданий, которые пользователь ещё не принял. """
+@tasks_router.get("/", response_model=TaskFeedSchema, dependencies=[Depends(read_from_replica)])
+async def get_available_tasks(
+    request: Request,
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=100),
+    user: SessionUser = Depends(get_session_user)
+):
+    """
+    Возвращает страницу активных заданий, которые пользователь ещё не принял.
+    Неизменившаяся лента отдаётся как 304 по If-None-Match без выборки заданий.
+    """
     try:
-        user = await User.get_or_none(telegram_id=telegram_id)
-        if not user:
-            raise HTTPException(status_code=404, detail="User not found")
-
-        # Получаем ID уже принятых заданий
-        taken_task_ids = await TaskAssignment.filter(user=user.user_id).values_list("task_id", flat=True)
-
-        # Ищем задания со статусом active, исключая уже принятые
-        tasks = await Task.filter(status="active").exclude(task_id__in=taken_task_ids).all().values()
-
-        return [TaskSchema(**task) for task in tasks]
+        # Версия читается до данных: изменение между ними даст лишний 200, но не ложный 304
+        version = await get_task_feed_version(user.user_id)
+        not_modified = conditional_response(
+            request, response, make_etag("feed", user.user_id, cursor, limit, *version))
+        if not_modified:
+            return not_modified
+
+        rows, next_cursor, has_more = await get_task_feed(user.user_id, cursor, limit)
+        return model_response(TaskFeedSchema, {
+            "items": rows, "next_cursor": next_cursor, "has_more": has_more,
+        }, response)
 
     except HTTPException as http_err:
-        logger.warning(f"⚠️ {http_err.detail}")
+        logger.warning("⚠️ {}", http_err.detail)
         return JSONResponse(status_code=http_err.status_code, content={"error": http_err.detail})
     except Exception as e:
-        logger.exception(f"Ошибка при получении доступных заданий: {str(e)}")
+        logger.exception("Ошибка при получении доступных заданий: {}", e)
         return JSONResponse(status_code=500, content={"error": "Internal server error"})
 
 
@@ -43,107 +78,101 @@ async def get_available_tasks(telegram_id: int):
 
 @tasks_router.post("/{task_id}/accept")
 async def accept_task(
-    task_id: str,
-    telegram_id: int,
-    data: AcceptTaskRequest
+    task_id: UUID,
+    data: AcceptTaskRequest,
+    idempotency_key: Optional[str] = Header(None, max_length=128),
+    user: SessionUser = Depends(get_session_user)
 ):
     """ Пользователь берет задание в работу. """
-    logger.info(
-        f"📌 Принятие задания {task_id} пользователем с telegram_id={telegram_id}")
+    log = sampled("accept_task")
+    log.info("📌 Принятие задания {} пользователем с telegram_id={}", task_id, user.telegram_id)
 
     try:
-        # Логируем входные данные
-        if not task_id:
-            logger.warning("❌ Ошибка: task_id не передан")
-            raise HTTPException(status_code=400, detail="Task ID is required")
-
-        if not telegram_id:
-            logger.warning("❌ Ошибка: telegram_id не передан")
-            raise HTTPException(
-                status_code=400, detail="Telegram ID is required")
-
-        # Проверяем существование пользователя
-        user = await User.get_or_none(telegram_id=telegram_id)
-        if not user:
-            logger.warning(
-                f"❌ Ошибка: Пользователь с telegram_id={telegram_id} не найден")
-            raise HTTPException(status_code=404, detail="User not found")
-
-        # Проверяем существование задания
-        task = await Task.get_or_none(task_id=task_id, status="active")
-        if not task:
-            logger.warning(
-                f"❌ Ошибка: Задание {task_id} не найдено или уже недоступно")
-            raise HTTPException(
-                status_code=404, detail="Task not found or unavailable")
+        assignment_id, created = await accept_task_assignment(
+            user.user_id, task_id, data.account_id, idempotency_key)
 
-        # Проверяем, не взял ли пользователь уже это задание
-        existing_assignment = await TaskAssignment.get_or_none(task=task_id, user=user.user_id)
-        if existing_assignment:
-            logger.warning(
-                f"❌ Ошибка: Пользователь {telegram_id} уже взял задание {task_id}")
-            raise HTTPException(
-                status_code=400, detail="You already accepted this task")
-        account = await UserAccount.get_or_none(account_id=data.account_id)
-        if not account:
-            logger.warning("❌ Аккаунт не найден")
-            raise HTTPException(status_code=404, detail="Account not found")
-        # Создаем запись о принятии задания
-        await TaskAssignment.create(user_id=user.user_id, task=task, status="in_progress", assigned_profile=account)
-
-        logger.info(
-            f"✅ Успех: Пользователь {telegram_id} принял задание {task_id}")
-        return {"message": "Task accepted"}
+        if created:
+            log.info("✅ Успех: Пользователь {} принял задание {}", user.telegram_id, task_id)
+        else:
+            log.info("♻️ Повтор принятия задания {} пользователем {}", task_id, user.telegram_id)
+        return {"message": "Task accepted", "assignment_id": str(assignment_id)}
 
     except HTTPException as http_err:
-        logger.error(
-            f"❌ HTTPException: {http_err.detail} (код {http_err.status_code})")
+        logger.warning("❌ HTTPException: {} (код {})", http_err.detail, http_err.status_code)
         return JSONResponse(status_code=http_err.status_code, content={"error": http_err.detail})
 
     except Exception as e:
-        logger.exception(f"❌ Ошибка при принятии задания: {str(e)}")
+        logger.exception("❌ Ошибка при принятии задания: {}", e)
         return JSONResponse(status_code=500, content={"error": "Internal server error"})
 
 # 📌 Сдать задание на проверку
 
 
+async def _get_own_assignment(assignment_id: UUID, task_id: UUID, user: SessionUser) -> TaskAssignment:
+    assignment = await TaskAssignment.get_or_none(
+        assignment_id=assignment_id, task_id=task_id, user_id=user.user_id)
+    if not assignment:
+        raise HTTPException(status_code=404, detail="Assignment not found")
+    return assignment
+
+
+async def _discard_upload(s3_key: str):
+    # Только что загруженный объект, на который не сослалась ни одна верификация
+    # (параллельная сдача того же файла могла успеть)
+    if not await TaskVerification.exists(s3_name=s3_key):
+        await s3_manager.delete_object(s3_key)
+
+
+def _submit_form(assignment_id: UUID = Form(...), details: str = Form(None)) -> SubmitTaskForm:
+    # Поля формы рядом с File: модель формы FastAPI вместе с файлом не разворачивает
+    return SubmitTaskForm(assignment_id=assignment_id, details=details)
+
+
 @tasks_router.post("/{task_id}/submit")
 async def submit_task(
     task_id: UUID,
-    assignment_id: UUID = Form(...),
-    details: str = Form(None),
+    background_tasks: BackgroundTasks,
+    data: SubmitTaskForm = Depends(_submit_form),
     screenshot: UploadFile = File(...),
-    user: User = Depends(get_user_by_telegram_id)
+    user: SessionUser = Depends(get_session_user)
 ):
     try:
-        logger.info(
-            f"📤 Пользователь {user.telegram_id} отправляет выполнение задания {task_id} (assignment_id={assignment_id})")
-        assignment = await TaskAssignment.get_or_none(
-            assignment_id=assignment_id
-        )
-        if not assignment:
+        sampled("submit_task").info(
+            "📤 Пользователь {} отправляет выполнение задания {} (assignment_id={})",
+            user.telegram_id, task_id, data.assignment_id)
+        # Только своё назначение по этому заданию
+        assignment = await _get_own_assignment(data.assignment_id, task_id, user)
+        # Статус — до загрузки в S3: заведомо отклонённая сдача не оставляет объект
+        if assignment.status not in SUBMITTABLE_STATUSES:
+            raise HTTPException(status_code=409, detail=f"Assignment is {assignment.status}")
+
+        # Тело сверх лимита отсекает UploadLimitMiddleware до разбора формы;
+        # здесь — точный размер самого файла (без полей формы)
+        if screenshot.size is not None and screenshot.size > settings.MAX_SCREENSHOT_SIZE:
+            raise HTTPException(status_code=413, detail="Screenshot is too large")
+
+        # Потоковая загрузка скриншота в S3 под ключом из SHA-256 содержимого;
+        # тип файла — в метаданных объекта, а не в ключе
+        content_type = screenshot.content_type
+        if content_type not in UPLOAD_CONTENT_TYPES:
+            extension = os.path.splitext(screenshot.filename or "")[1].lower()
+            content_type = UPLOAD_EXTENSIONS.get(extension, "image/png")
+        try:
+            s3_key, content_hash, uploaded = await s3_manager.upload_content_addressed(
+                screenshot, content_type, settings.MAX_SCREENSHOT_SIZE)
+        except UploadTooLargeError as e:
             raise HTTPException(
-                status_code=404, detail="Task not found or already submitted"
-            )
-
-        # Обновляем статус
-        assignment.status = "pending_review"
-        await assignment.save()
-
-        # Загрузка скриншота
-        file_bytes = await screenshot.read()
-        filename = screenshot.filename or "screenshot.png"
-
-        s3 = AsyncS3Manager()
-        s3_key = await s3.upload_bytes(file_bytes, user.telegram_id, filename)
-
-        # Создание верификации
-        await TaskVerification.create(
-            task_assignment=assignment,
-            status="pending",
-            details=details,
-            s3_name=s3_key
-        )
+                status_code=413, detail="Screenshot is too large") from e
+
+        # Статус назначения и верификация — одной транзакцией (статус перепроверяется под блокировкой)
+        try:
+            await submit_assignment(assignment, s3_key, data.details, content_hash)
+        except Exception:
+            if uploaded:
+                await _discard_upload(s3_key)
+            raise
+        # Для уже загруженного файла обработка только отметит готовые превью
+        background_tasks.add_task(process_screenshot, s3_key)
 
         return {"message": "Task submitted for review"}
 
@@ -151,77 +180,158 @@ async def submit_task(
         return JSONResponse(status_code=http_err.status_code, content={"error": http_err.detail})
 
     except Exception as e:
-        logger.exception(f"❌ Ошибка при сдаче задания: {e}")
+        logger.exception("❌ Ошибка при сдаче задания: {}", e)
         return JSONResponse(status_code=500, content={"error": f"Internal server error: {e}"})
 
 
+# 📌 Прямая загрузка скриншота в S3: шаг 1 — presigned POST
+
+
+@tasks_router.post("/{task_id}/upload-url", response_model=UploadUrlSchema)
+async def get_upload_url(
+    task_id: UUID,
+    data: UploadUrlRequest,
+    user: SessionUser = Depends(get_session_user)
+):
+    """ Выдаёт presigned POST на ключ, выбранный сервером. Файл идёт мимо API. """
+    extension = UPLOAD_CONTENT_TYPES.get(data.content_type)
+    if not extension:
+        raise HTTPException(status_code=415, detail="Unsupported content type")
+    await _get_own_assignment(data.assignment_id, task_id, user)
+
+    key = s3_manager.build_upload_key(user.telegram_id, data.assignment_id, extension)
+    expires_in = settings.S3_UPLOAD_URL_EXPIRES
+    presigned = await s3_manager.generate_presigned_post(
+        key, settings.MAX_SCREENSHOT_SIZE, data.content_type, expires_in)
+    return UploadUrlSchema(url=presigned["url"], fields=presigned["fields"], key=key, expires_in=expires_in)
+
+
+# 📌 Прямая загрузка скриншота в S3: шаг 2 — подтверждение
+
+
+@tasks_router.post("/{task_id}/confirm")
+async def confirm_upload(
+    task_id: UUID,
+    data: ConfirmUploadRequest,
+    background_tasks: BackgroundTasks,
+    user: SessionUser = Depends(get_session_user)
+):
+    """ Проверяет объект в S3 (HEAD) и создаёт верификацию. """
+    assignment = await _get_own_assignment(data.assignment_id, task_id, user)
+    if not data.key.startswith(s3_manager.upload_key_prefix(user.telegram_id, data.assignment_id)):
+        raise HTTPException(status_code=400, detail="Invalid upload key")
+
+    if await TaskVerification.exists(task_assignment_id=assignment.assignment_id, s3_name=data.key):
+        return {"message": "Task submitted for review"}
+
+    head = await s3_manager.head_object(data.key)
+    if head is None:
+        raise HTTPException(status_code=400, detail="Upload not found")
+    if head["ContentLength"] > settings.MAX_SCREENSHOT_SIZE:
+        raise HTTPException(status_code=413, detail="Screenshot is too large")
+
+    await submit_assignment(assignment, data.key, data.details)
+    background_tasks.add_task(process_screenshot, data.key)
+    sampled("confirm_upload").info(
+        "📤 Пользователь {} подтвердил загрузку для задания {}", user.telegram_id, task_id)
+    return {"message": "Task submitted for review"}
+
+
 # 📌 Получить список моих заданий
 
 
-@tasks_router.get("/my", response_model=list[MyTaskSchema])
-async def get_my_tasks(user: User = Depends(get_user_by_telegram_id)):
+@tasks_router.get("/my", response_model=MyTaskPageSchema, dependencies=[Depends(read_from_replica)])
+async def get_my_tasks(
+    status: Optional[list[AssignmentStatus]] = Query(None),
+    cursor: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=100),
+    user: SessionUser = Depends(get_session_user)
+):
     """
-    Получает список заданий пользователя.
+    Получает страницу заданий пользователя (фильтр по статусу назначения).
     """
     try:
-        assignments = await TaskAssignment.filter(user=user.user_id).prefetch_related("task__status").all()
-
-        result = []
-        for a in assignments:
-            task = await a.task  # принудительно получаем task
-            result.append(MyTaskSchema(
-                assignment_id=a.assignment_id,
-                task_id=task.task_id,
-                description=task.description,
-                reward=task.reward,
-                status_id=task.status.status_id,
-            ))
-        return result
+        rows, next_cursor, has_more = await get_my_assignments(user.user_id, status, cursor, limit)
+        return model_response(MyTaskPageSchema, {
+            "items": rows, "next_cursor": next_cursor, "has_more": has_more,
+        })
 
+    except HTTPException as http_err:
+        return JSONResponse(status_code=http_err.status_code, content={"error": http_err.detail})
     except Exception as e:
-        logger.error(
-            f"Ошибка при получении списка заданий пользователя: {str(e)}")
+        logger.error("Ошибка при получении списка заданий пользователя: {}", e)
         return JSONResponse(status_code=500, content={"error": "Internal server error"})
 
 
-@tasks_router.get("/completed", response_model=list[TaskSchema])
-async def get_my_completed_tasks(user: User = Depends(get_user_by_telegram_id)):
+@tasks_router.get("/completed", response_model=CompletedTasksPageSchema)
+async def get_my_completed_tasks(
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=100),
+    user: SessionUser = Depends(get_session_user)
+):
     """
-    Получает список заданий пользователя.
+    Получает страницу выполненных заданий пользователя; на первой странице — итог.
     """
     try:
-        assignments = await TaskAssignment.filter(user=user.user_id, status="completed").prefetch_related("task").values()
-        return [TaskSchema(**assignment.task) for assignment in assignments]
+        rows, next_cursor, has_more, summary = await get_completed_tasks(
+            user.user_id, date_from, date_to, cursor, limit)
+        return model_response(CompletedTasksPageSchema, {
+            "items": rows,
+            "next_cursor": next_cursor,
+            "has_more": has_more,
+            "summary": {
+                "count": summary["count"], "total_reward": summary["total_reward"] or 0} if summary else None,
+        })
+    except HTTPException as http_err:
+        return JSONResponse(status_code=http_err.status_code, content={"error": http_err.detail})
     except Exception as e:
-        logger.error(
-            f"Ошибка при получении списка заданий пользователя: {str(e)}")
+        logger.error("Ошибка при получении списка заданий пользователя: {}", e)
         return JSONResponse(status_code=500, content={"error": "Internal server error"})
 
 
-@tasks_router.get("/history", response_model=list[TransactionSchema])
-async def get_my_transaction_history(user: User = Depends(get_user_by_telegram_id)):
+@tasks_router.get("/history", response_model=TransactionHistoryPageSchema)
+async def get_my_transaction_history(
+    params: Annotated[TransactionHistoryQuery, Query()],
+    user: SessionUser = Depends(get_session_user)
+):
     """
-    Получает список заданий пользователя.
+    Получает страницу истории начислений; на первой странице — итоги по типам.
     """
     try:
-        transactions = await Transaction.filter(user=user.user_id).prefetch_related("task").values()
-        return [TransactionSchema(**transaction) for transaction in transactions]
+        rows, next_cursor, has_more, summary = await get_transaction_history(
+            user.user_id, params.transaction_type, params.date_from, params.date_to,
+            params.cursor, params.limit)
+        return model_response(TransactionHistoryPageSchema, {
+            "items": rows, "next_cursor": next_cursor, "has_more": has_more, "summary": summary,
+        })
+    except HTTPException as http_err:
+        return JSONResponse(status_code=http_err.status_code, content={"error": http_err.detail})
     except Exception as e:
-        logger.error(
-            f"Ошибка при получении списка заданий пользователя: {str(e)}")
+        logger.error("Ошибка при получении истории начислений: {}", e)
         return JSONResponse(status_code=500, content={"error": "Internal server error"})
 
 
-@tasks_router.get("/{task_id}", response_model=TaskSchema)
-async def get_task_by_id(task_id: str, user: User = Depends(get_user_by_telegram_id)):
-    """ Возвращает задание по ID. """
+@tasks_router.get("/{task_id}", response_model=TaskSchema, dependencies=[Depends(read_from_replica)])
+async def get_task_by_id(task_id: str, request: Request, response: Response,
+                         user: SessionUser = Depends(get_session_user)):
+    """ Возвращает задание по ID; 304, если оно не менялось с прошлого запроса. """
     try:
+        # Для проверки If-None-Match достаточно updated_at; полная строка — только при промахе
+        updated_at = await Task.filter(task_id=task_id).first().values_list("updated_at", flat=True)
+        if updated_at is None:
+            raise HTTPException(status_code=404, detail="Task not found")
+        not_modified = conditional_response(
+            request, response, make_etag("task", UUID(task_id), updated_at))
+        if not_modified:
+            return not_modified
         task = await Task.get_or_none(task_id=task_id).values()
         if not task:
             raise HTTPException(status_code=404, detail="Task not found")
-        return TaskSchema(**task)
+        return model_response(TaskSchema, task, response)
     except HTTPException as e:
         raise e
     except Exception as e:
-        logger.error(f"Ошибка при получении задания: {str(e)}")
+        logger.error("Ошибка при получении задания: {}", e)
         return JSONResponse(status_code=500, content={"error": "Internal server error"})
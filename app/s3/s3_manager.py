@@ -1,12 +1,39 @@
+import asyncio
+import hashlib
 import logging
+import uuid
+from contextlib import AsyncExitStack
 import aioboto3
+from aiobotocore.config import AioConfig
 from botocore.exceptions import ClientError
+from app.handlers.metrics_handlers import instrument_s3_client
 from config import Settings
 
 settings = Settings()
 
 
+class UploadTooLargeError(Exception):
+    pass
+
+
+def _hash_file(fileobj, chunk_size: int, max_size: int) -> str:
+    digest = hashlib.sha256()
+    size = 0
+    fileobj.seek(0)
+    while chunk := fileobj.read(chunk_size):
+        size += len(chunk)
+        if size > max_size:
+            raise UploadTooLargeError()
+        digest.update(chunk)
+    fileobj.seek(0)
+    return digest.hexdigest()
+
+
 class AsyncS3Manager:
+    """
+    Один S3-клиент на воркер: открывается при старте приложения,
+    держит пул соединений и закрывается при остановке.
+    """
     endpoint_url = settings.ENDPOINT_URL
     region_name = settings.REGION_NAME
     aws_access_key_id = settings.AWS_ACCESS_KEY_ID
@@ -14,71 +41,240 @@ class AsyncS3Manager:
     bucket_name = settings.BUCKET_NAME
     bucket_folder = "web_app"
 
-    def _get_session(self):
-        return aioboto3.Session()
+    def __init__(self):
+        self._session = aioboto3.Session()
+        self._exit_stack = None
+        self._client = None
+        self._lock = asyncio.Lock()
+
+    def _get_config(self) -> AioConfig:
+        return AioConfig(
+            max_pool_connections=settings.S3_MAX_POOL_CONNECTIONS,
+            connect_timeout=settings.S3_CONNECT_TIMEOUT,
+            read_timeout=settings.S3_READ_TIMEOUT,
+            retries={"max_attempts": 3, "mode": "standard"},
+        )
+
+    async def start(self):
+        async with self._lock:
+            if self._client is not None:
+                return
+            exit_stack = AsyncExitStack()
+            self._client = await exit_stack.enter_async_context(self._session.client(
+                "s3",
+                endpoint_url=self.endpoint_url,
+                region_name=self.region_name,
+                aws_access_key_id=self.aws_access_key_id,
+                aws_secret_access_key=self.aws_secret_access_key,
+                config=self._get_config(),
+            ))
+            instrument_s3_client(self._client)
+            self._exit_stack = exit_stack
+            logging.info("✅ S3-клиент открыт")
+
+    async def close(self):
+        async with self._lock:
+            if self._exit_stack is None:
+                return
+            await self._exit_stack.aclose()
+            self._exit_stack = None
+            self._client = None
+            logging.info("S3-клиент закрыт")
+
+    async def _get_client(self):
+        # Ленивое открытие — для скриптов, запущенных вне приложения
+        if self._client is None:
+            await self.start()
+        return self._client
 
     def _build_path(self, telegram_id: int, filename: str) -> str:
         return f"{self.bucket_folder}/{telegram_id}/{filename}"
 
+    def build_upload_key(self, telegram_id: int, assignment_id, extension: str) -> str:
+        # Ключ выбирает сервер: клиентское имя файла не используется
+        return self._build_path(telegram_id, f"{assignment_id}/{uuid.uuid4().hex}{extension}")
+
+    def upload_key_prefix(self, telegram_id: int, assignment_id) -> str:
+        return self._build_path(telegram_id, f"{assignment_id}/")
+
     async def upload_bytes(self, file_bytes: bytes, telegram_id: int, filename: str):
         key = self._build_path(telegram_id, filename)
-        session = self._get_session()
-        async with session.client(
-            "s3",
-            endpoint_url=self.endpoint_url,
-            region_name=self.region_name,
-            aws_access_key_id=self.aws_access_key_id,
-            aws_secret_access_key=self.aws_secret_access_key,
-        ) as s3:
-            try:
-                await s3.put_object(
-                    Bucket=self.bucket_name,
-                    Key=key,
-                    Body=file_bytes,
-                    ACL="private"
+        s3 = await self._get_client()
+        try:
+            await s3.put_object(
+                Bucket=self.bucket_name,
+                Key=key,
+                Body=file_bytes,
+                ACL="private"
+            )
+            logging.info("✅ Файл загружен: %s", key)
+            return key
+        except ClientError as e:
+            logging.error("Ошибка загрузки: %s", e)
+            raise
+
+    async def upload_to_key(self, key: str, body: bytes, content_type: str):
+        s3 = await self._get_client()
+        await s3.put_object(
+            Bucket=self.bucket_name,
+            Key=key,
+            Body=body,
+            ContentType=content_type,
+            ACL="private"
+        )
+        return key
+
+    async def download_to_file(self, key: str, path: str) -> int:
+        """
+        Потоково скачивает объект в локальный файл кусками S3_MULTIPART_CHUNK_SIZE.
+        В памяти одновременно не больше одного куска. Возвращает размер в байтах.
+        """
+        s3 = await self._get_client()
+        response = await s3.get_object(Bucket=self.bucket_name, Key=key)
+        size = 0
+        body = response["Body"]
+        with open(path, "wb") as out:
+            async with body:
+                async for chunk in body.iter_chunks(settings.S3_MULTIPART_CHUNK_SIZE):
+                    await asyncio.to_thread(out.write, chunk)
+                    size += len(chunk)
+        return size
+
+    def _build_content_path(self, digest: str) -> str:
+        # Контентная адресация: одинаковые байты — один ключ, как бы файл ни назывался
+        return f"{self.bucket_folder}/sha256/{digest[:2]}/{digest}"
+
+    async def upload_content_addressed(self, file, content_type: str, max_size: int) -> tuple[str, str, bool]:
+        """
+        Сохраняет UploadFile под ключом из его SHA-256; Content-Type — в метаданных объекта.
+        Хеш считается проходом по спулу в отдельном потоке; если объект с таким хешем
+        уже есть в S3 (HEAD), загрузка пропускается.
+        Возвращает (ключ, хеш, был ли файл загружен).
+        """
+        digest = await asyncio.to_thread(
+            _hash_file, file.file, settings.S3_MULTIPART_CHUNK_SIZE, max_size)
+        key = self._build_content_path(digest)
+        if await self.head_object(key) is not None:
+            logging.info("♻️ Файл уже есть, загрузка пропущена: %s", key)
+            return key, digest, False
+        await file.seek(0)
+        await self.upload_stream(file, key, max_size, content_type)
+        return key, digest, True
+
+    async def upload_stream(self, file, key: str, max_size: int, content_type: str | None = None):
+        """
+        Потоково загружает файл (любой объект с async read(n)) кусками фиксированного размера.
+        Маленькие файлы — одним put_object, большие — multipart upload.
+        В памяти одновременно не больше одного куска.
+        """
+        s3 = await self._get_client()
+        chunk_size = settings.S3_MULTIPART_CHUNK_SIZE
+        extra = {"ContentType": content_type} if content_type else {}
+
+        first = await file.read(settings.S3_MULTIPART_THRESHOLD + 1)
+        if len(first) > max_size:
+            raise UploadTooLargeError(key)
+        if len(first) <= settings.S3_MULTIPART_THRESHOLD:
+            await s3.put_object(Bucket=self.bucket_name, Key=key, Body=first, ACL="private", **extra)
+            logging.info("✅ Файл загружен: %s", key)
+            return key
+
+        upload = await s3.create_multipart_upload(
+            Bucket=self.bucket_name, Key=key, ACL="private", **extra)
+        upload_id = upload["UploadId"]
+        parts = []
+        total = 0
+        try:
+            buffer = first
+            while buffer:
+                while len(buffer) < chunk_size:
+                    more = await file.read(chunk_size - len(buffer))
+                    if not more:
+                        break
+                    buffer += more
+                chunk, buffer = buffer[:chunk_size], buffer[chunk_size:]
+                total += len(chunk)
+                if total > max_size:
+                    raise UploadTooLargeError(key)
+                part_number = len(parts) + 1
+                part = await s3.upload_part(
+                    Bucket=self.bucket_name, Key=key, UploadId=upload_id,
+                    PartNumber=part_number, Body=chunk,
                 )
-                logging.info(f"✅ Файл загружен: {key}")
-                return key
-            except ClientError as e:
-                logging.error(f"Ошибка загрузки: {e}")
-                raise
+                parts.append({"ETag": part["ETag"], "PartNumber": part_number})
+            await s3.complete_multipart_upload(
+                Bucket=self.bucket_name, Key=key, UploadId=upload_id,
+                MultipartUpload={"Parts": parts},
+            )
+            logging.info("✅ Файл загружен (%s частей): %s", len(parts), key)
+            return key
+        except BaseException:
+            await s3.abort_multipart_upload(Bucket=self.bucket_name, Key=key, UploadId=upload_id)
+            raise
 
     async def generate_presigned_url(self, telegram_id: int, filename: str, expiration=3600):
-        key = self._build_path(telegram_id, filename)
-        session = self._get_session()
-        async with session.client(
-            "s3",
-            endpoint_url=self.endpoint_url,
-            region_name=self.region_name,
-            aws_access_key_id=self.aws_access_key_id,
-            aws_secret_access_key=self.aws_secret_access_key,
-        ) as s3:
-            try:
-                return await s3.generate_presigned_url(
-                    ClientMethod='get_object',
-                    Params={"Bucket": self.bucket_name, "Key": key},
-                    ExpiresIn=expiration
-                )
-            except ClientError as e:
-                logging.error(f"Ошибка при генерации ссылки: {e}")
+        return await self.generate_presigned_get(self._build_path(telegram_id, filename), expiration)
+
+    async def generate_presigned_get(self, key: str, expiration=3600):
+        # Подпись считается локально, без запроса в S3
+        s3 = await self._get_client()
+        try:
+            return await s3.generate_presigned_url(
+                ClientMethod='get_object',
+                Params={"Bucket": self.bucket_name, "Key": key},
+                ExpiresIn=expiration
+            )
+        except ClientError as e:
+            logging.error("Ошибка при генерации ссылки: %s", e)
+            return None
+
+    async def generate_presigned_post(self, key: str, max_size: int, content_type: str, expiration=600):
+        """
+        Presigned POST на заранее выбранный сервером ключ: клиент грузит файл прямо в S3.
+        Размер и Content-Type ограничены условиями политики.
+        """
+        s3 = await self._get_client()
+        return await s3.generate_presigned_post(
+            Bucket=self.bucket_name,
+            Key=key,
+            Fields={"Content-Type": content_type},
+            Conditions=[
+                {"Content-Type": content_type},
+                ["content-length-range", 1, max_size],
+            ],
+            ExpiresIn=expiration,
+        )
+
+    async def head_object(self, key: str) -> dict | None:
+        """
+        Метаданные объекта или None, если объекта нет.
+        """
+        s3 = await self._get_client()
+        try:
+            return await s3.head_object(Bucket=self.bucket_name, Key=key)
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
                 return None
+            logging.error("Ошибка при проверке объекта: %s", e)
+            raise
+
+    async def delete_object(self, key: str):
+        s3 = await self._get_client()
+        await s3.delete_object(Bucket=self.bucket_name, Key=key)
+        logging.info("🗑 Объект удалён: %s", key)
 
     async def list_user_files(self, telegram_id: int) -> list[str]:
         prefix = f"{self.bucket_folder}/{telegram_id}/"
-        session = self._get_session()
-        async with session.client(
-            "s3",
-            endpoint_url=self.endpoint_url,
-            region_name=self.region_name,
-            aws_access_key_id=self.aws_access_key_id,
-            aws_secret_access_key=self.aws_secret_access_key,
-        ) as s3:
-            try:
-                response = await s3.list_objects_v2(
-                    Bucket=self.bucket_name,
-                    Prefix=prefix
-                )
-                return [obj["Key"] for obj in response.get("Contents", [])]
-            except ClientError as e:
-                logging.error(f"Ошибка при получении списка файлов: {e}")
-                return []
+        s3 = await self._get_client()
+        try:
+            response = await s3.list_objects_v2(
+                Bucket=self.bucket_name,
+                Prefix=prefix
+            )
+            return [obj["Key"] for obj in response.get("Contents", [])]
+        except ClientError as e:
+            logging.error("Ошибка при получении списка файлов: %s", e)
+            return []
+
+
+s3_manager = AsyncS3Manager()
@@ -0,0 +1,84 @@
+"""
+Микробенчмарк сериализации ленты заданий: стоимость на одно задание.
+
+Сравнивает прежний путь (TaskSchema(**row) в маршруте, повторная валидация
+и сериализация FastAPI по response_model, json.dumps) с model_response
+(одна валидация и JSON из pydantic-core). Тела ответов должны совпадать байт в байт.
+
+    python -m benchmarks.serialization_bench [заданий] [повторов]
+"""
+import asyncio
+import sys
+import time
+import uuid
+from datetime import datetime, timezone
+from decimal import Decimal
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_cloned_field, create_model_field
+
+from app.handlers.response_handlers import FastJSONResponse, model_response
+from app.pydantic_models.task_schemas import TaskFeedSchema, TaskSchema
+
+
+def _rows(size: int) -> list[dict]:
+    # Как строки .values() из get_task_feed: UUID, Decimal, лишние колонки таблицы
+    creator, platform = uuid.uuid4(), uuid.uuid4()
+    now = datetime.now(timezone.utc)
+    return [{
+        "task_id": uuid.uuid4(),
+        "creator_id": creator,
+        "platform_id": platform,
+        "task_type_id": "like",
+        "task_name": f"Задание {i}",
+        "description": f"Поставить лайк под видео №{i}",
+        "reward": Decimal("1.50") + i % 7,
+        "verification_type": "screenshot",
+        "status_id": "active",
+        "created_at": now,
+        "updated_at": now,
+    } for i in range(size)]
+
+
+# Поле ответа так же, как его строит APIRoute для response_model=TaskFeedSchema
+_response_field = create_cloned_field(
+    create_model_field(name="Response_feed", type_=TaskFeedSchema, mode="serialization"))
+
+
+def _fastapi_path(batch: list[dict]) -> bytes:
+    content = TaskFeedSchema(items=[TaskSchema(**row) for row in batch], next_cursor=None, has_more=False)
+    content = asyncio.run(serialize_response(field=_response_field, response_content=content))
+    return JSONResponse(content).body
+
+
+def _model_response_path(batch: list[dict]) -> bytes:
+    return model_response(TaskFeedSchema, {"items": batch, "next_cursor": None, "has_more": False}).body
+
+
+def _unvalidated_path(batch: list[dict]) -> bytes:
+    # Только кодирование (как /platforms из кэша справочников): нижняя граница
+    return FastJSONResponse({"items": batch, "next_cursor": None, "has_more": False}).body
+
+
+def _run(label: str, render, batch: list[dict], repeats: int) -> bytes:
+    body = render(batch)
+    best = float("inf")
+    for _ in range(repeats):
+        started = time.perf_counter()
+        render(batch)
+        best = min(best, time.perf_counter() - started)
+    print(f"{label:<34} {best * 1000:>9.1f} мс  {best / len(batch) * 1e6:>7.2f} мкс/задание  {len(body):,} байт")
+    return body
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    rows = _rows(count)
+    print(f"Заданий: {count}, лучший из {repeat} прогонов")
+    before = _run("FastAPI response_model + json", _fastapi_path, rows, repeat)
+    after = _run("model_response (pydantic-core)", _model_response_path, rows, repeat)
+    _run("без валидации (to_json)", _unvalidated_path, rows, repeat)
+    print("тела совпадают" if before == after else "❌ тела различаются")
+    sys.exit(0 if before == after else 1)
@@ -0,0 +1,48 @@
+"""
+Микробенчмарк проверки Telegram init data: проверок в секунду.
+
+    python -m benchmarks.telegram_auth_bench [итераций]
+"""
+import hashlib
+import hmac
+import json
+import os
+import sys
+import time
+
+# Настройки читаются при импорте app — импорт отложен до main()
+os.environ.setdefault("TELEGRAM_BOT_TOKEN", "123456:bench-token")
+os.environ.setdefault("JWT_SECRET", "bench-jwt-secret")
+
+
+def _signed_init_data() -> dict:
+    user = {"id": 42, "first_name": "Bench", "username": "bench",
+            "photo_url": "https://t.me/i/userpic/320/bench.jpg"}
+    fields = {
+        "auth_date": str(int(time.time())),
+        "query_id": "AAHdF6IQAAAAAN0XohDhrOrc",
+        "user": json.dumps(user, separators=(',', ':'), ensure_ascii=False).replace("/", "\\/"),
+    }
+    data_check_string = "\n".join(f"{k}={v}" for k, v in sorted(fields.items()))
+    secret_key = hmac.new(b"WebAppData", os.environ["TELEGRAM_BOT_TOKEN"].encode(), hashlib.sha256).digest()
+    fields["hash"] = hmac.new(secret_key, data_check_string.encode(), hashlib.sha256).hexdigest()
+    return fields
+
+
+def _run(label: str, iterations: int, clear_cache: bool):
+    from app.handlers import auth_handlers
+
+    data = _signed_init_data()
+    started = time.perf_counter()
+    for _ in range(iterations):
+        if clear_cache:
+            auth_handlers.clear_verified_cache()
+        auth_handlers.verify_telegram_auth(dict(data))
+    elapsed = time.perf_counter() - started
+    print(f"{label:<28} {iterations / elapsed:>12,.0f} проверок/с  ({elapsed / iterations * 1e6:.2f} мкс)")
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    _run("HMAC (кэш пустой)", n, clear_cache=True)
+    _run("повтор (кэш проверенных)", n, clear_cache=False)
@@ -1,4 +1,5 @@
 import os
+from multiprocessing import cpu_count
 from dotenv import load_dotenv
 
 # Загрузка переменных из .env
@@ -7,17 +8,80 @@ load_dotenv()
 
 class Settings:
     DATABASE_URL = os.getenv("DATABASE_URL", "sqlite://db.sqlite3")
-    SECRET_KEY = os.getenv("SECRET_KEY", "default_secret")
-    ACCESS_TOKEN_EXPIRE_MINUTES = os.getenv(
-        "ACCESS_TOKEN_EXPIRE_MINUTES")
-    # LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
-    LOG_LEVEL = "DEBUG"
+    # Реплика только для чтения (пусто — все запросы на основную БД)
+    DATABASE_REPLICA_URL = os.getenv("DATABASE_REPLICA_URL")
+    # Число воркеров gunicorn (gunicorn.conf.py берёт его отсюда же)
+    WEB_CONCURRENCY = int(os.getenv(
+        "WEB_CONCURRENCY", str(max(2, min(4, cpu_count() // 2)))))
+    # Пул asyncpg: бюджет соединений на инстанс (max_connections Postgres минус запас
+    # на CLI-задания и админку) делится между воркерами; DB_POOL_MAX_SIZE > 0 задаёт размер явно
+    DB_MAX_CONNECTIONS = int(os.getenv("DB_MAX_CONNECTIONS", "40"))
+    DB_POOL_MIN_SIZE = int(os.getenv("DB_POOL_MIN_SIZE", "2"))
+    DB_POOL_MAX_SIZE = int(os.getenv("DB_POOL_MAX_SIZE", "0"))
+    # Соединение закрывается после N запросов или простоя (секунды)
+    DB_POOL_MAX_QUERIES = int(os.getenv("DB_POOL_MAX_QUERIES", "50000"))
+    DB_POOL_MAX_INACTIVE_LIFETIME = float(
+        os.getenv("DB_POOL_MAX_INACTIVE_LIFETIME", "300"))
+    # Кэш подготовленных запросов на соединение (0 — за pgbouncer в transaction mode)
+    DB_STATEMENT_CACHE_SIZE = int(os.getenv("DB_STATEMENT_CACHE_SIZE", "100"))
+    # Таймауты запроса и установки соединения (секунды)
+    DB_COMMAND_TIMEOUT = float(os.getenv("DB_COMMAND_TIMEOUT", "30"))
+    DB_CONNECT_TIMEOUT = float(os.getenv("DB_CONNECT_TIMEOUT", "10"))
+    ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv(
+        "ACCESS_TOKEN_EXPIRE_MINUTES", "60"))
+    LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+    # dev — цветной текст; prod — JSON, фоновая запись и сэмплирование
+    LOG_MODE = os.getenv("LOG_MODE", "dev")
+    # Доля пишущихся частых info-строк: общая и по маршрутам ("accept_task=0.1,...")
+    LOG_SAMPLE_RATE = float(os.getenv("LOG_SAMPLE_RATE", "1.0"))
+    LOG_SAMPLE_RATES = os.getenv("LOG_SAMPLE_RATES", "")
+    # Bearer-токен для /metrics (обязателен при LOG_MODE=prod; в dev пусто — эндпоинт открыт)
+    METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
     ALGORITHM = "HS256"
     PORT = os.getenv('PORT')
     TELEGRAM_BOT_TOKEN = os.getenv('TELEGRAM_BOT_TOKEN')
+    # Ключ подписи JWT (обязателен: без него приложение не запускается)
     JWT_SECRET = os.getenv('JWT_SECRET')
     ENDPOINT_URL = os.getenv('ENDPOINT_URL')
     REGION_NAME = os.getenv('REGION_NAME')
-    AWS_ACCESS_KEY_ID = os.getenv('AWS_ACCESS_KEY_ID ')
+    AWS_ACCESS_KEY_ID = os.getenv('AWS_ACCESS_KEY_ID')
     AWS_SECRET_ACCESS_KEY = os.getenv('AWS_SECRET_ACCESS_KEY')
     BUCKET_NAME = os.getenv('BUCKET_NAME')
+    # Пул соединений и таймауты S3-клиента (на воркер)
+    S3_MAX_POOL_CONNECTIONS = int(os.getenv('S3_MAX_POOL_CONNECTIONS', "20"))
+    S3_CONNECT_TIMEOUT = float(os.getenv('S3_CONNECT_TIMEOUT', "5"))
+    S3_READ_TIMEOUT = float(os.getenv('S3_READ_TIMEOUT', "30"))
+    # Загрузка скриншотов: лимит размера, порог multipart и размер части (байты, часть >= 5 MB)
+    MAX_SCREENSHOT_SIZE = int(os.getenv('MAX_SCREENSHOT_SIZE', str(10 * 1024 * 1024)))
+    S3_MULTIPART_THRESHOLD = int(os.getenv('S3_MULTIPART_THRESHOLD', str(8 * 1024 * 1024)))
+    S3_MULTIPART_CHUNK_SIZE = int(os.getenv('S3_MULTIPART_CHUNK_SIZE', str(8 * 1024 * 1024)))
+    # Время жизни presigned POST для прямой загрузки в S3 (секунды)
+    S3_UPLOAD_URL_EXPIRES = int(os.getenv('S3_UPLOAD_URL_EXPIRES', "600"))
+    # Обработка скриншотов: процессов в пуле, макс. сторона копии и превью, качество WEBP
+    IMAGE_WORKERS = int(os.getenv('IMAGE_WORKERS', "2"))
+    IMAGE_MAX_DIMENSION = int(os.getenv('IMAGE_MAX_DIMENSION', "1600"))
+    IMAGE_THUMB_SIZE = int(os.getenv('IMAGE_THUMB_SIZE', "320"))
+    IMAGE_QUALITY = int(os.getenv('IMAGE_QUALITY', "80"))
+    # Буфер логов действий: размер очереди, размер пачки, макс. задержка записи (секунды)
+    ACTION_LOG_QUEUE_SIZE = int(os.getenv('ACTION_LOG_QUEUE_SIZE', "10000"))
+    ACTION_LOG_BATCH_SIZE = int(os.getenv('ACTION_LOG_BATCH_SIZE', "500"))
+    ACTION_LOG_FLUSH_INTERVAL = float(
+        os.getenv('ACTION_LOG_FLUSH_INTERVAL', "1.0"))
+    # Сверка баланса: проводки моложе этого окна (секунды) ждут следующего запуска
+    LEDGER_RECONCILE_LAG = int(os.getenv('LEDGER_RECONCILE_LAG', "60"))
+    # Назначения, не сданные за это время (часы), освобождают место в задании
+    ASSIGNMENT_TTL_HOURS = int(os.getenv('ASSIGNMENT_TTL_HOURS', "72"))
+    # Очередь проверки: срок аренды верификаций проверяющим (секунды) и макс. пачка
+    REVIEW_LEASE_SECONDS = int(os.getenv('REVIEW_LEASE_SECONDS', "300"))
+    REVIEW_CLAIM_MAX = int(os.getenv('REVIEW_CLAIM_MAX', "50"))
+    # Время жизни кэша справочников в секундах
+    REFERENCE_CACHE_TTL = int(os.getenv('REFERENCE_CACHE_TTL', "300"))
+    # Сколько секунд помнить, что ключа в справочнике нет (повтор не идёт в БД)
+    REFERENCE_CACHE_MISS_TTL = int(os.getenv('REFERENCE_CACHE_MISS_TTL', "30"))
+    # Кэш пользователей: размер и время жизни записи в секундах
+    USER_CACHE_SIZE = int(os.getenv('USER_CACHE_SIZE', "10000"))
+    USER_CACHE_TTL = int(os.getenv('USER_CACHE_TTL', "60"))
+    # Окно свежести auth_date из Telegram init data и размер кэша проверенных подписей
+    TELEGRAM_AUTH_MAX_AGE = int(os.getenv('TELEGRAM_AUTH_MAX_AGE', "86400"))
+    TELEGRAM_AUTH_CACHE_SIZE = int(
+        os.getenv('TELEGRAM_AUTH_CACHE_SIZE', "10000"))
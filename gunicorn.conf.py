@@ -1,14 +1,23 @@
 import os
+import tempfile
 from dotenv import load_dotenv
-from multiprocessing import cpu_count
+from config import Settings
 
 load_dotenv()
+
+# Метрики Prometheus из всех воркеров: общий каталог файлов (app/handlers/metrics_handlers.py).
+# Задаётся до загрузки приложения (preload_app) — prometheus_client читает его при импорте
+metrics_dir = os.environ.setdefault(
+    "PROMETHEUS_MULTIPROC_DIR", os.path.join(tempfile.gettempdir(), "prometheus_multiproc"))
+os.makedirs(metrics_dir, exist_ok=True)
+
 # Получаем порт из переменной окружения или 5015
 PORT = os.getenv("PORT", "5020")
 
 bind = f"0.0.0.0:{PORT}"  # Указываем динамический порт
 worker_class = "uvicorn.workers.UvicornWorker"
-workers = max(2, min(4, cpu_count() // 2))
+# Пул БД на воркер считается от того же числа (app/database/config.py)
+workers = Settings.WEB_CONCURRENCY
 threads = 4
 
 timeout = 120
@@ -22,3 +31,16 @@ preload_app = True
 worker_connections = 1000
 max_requests = 500
 max_requests_jitter = 50
+
+
+def on_starting(server):
+    # Значения прошлого запуска мастера не суммируем
+    for name in os.listdir(metrics_dir):
+        if name.endswith(".db"):
+            os.remove(os.path.join(metrics_dir, name))
+
+
+def child_exit(server, worker):
+    # Gauge запросов в обработке (livesum) не учитывает завершившиеся воркеры
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
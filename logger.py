@@ -1,35 +1,186 @@
+import asyncio
+import functools
+import random
 import sys
 from loguru import logger
 from app.database.models import UserActionLog
+from config import Settings
+
+
+def _parse_sample_rates(raw: str) -> dict[str, float]:
+    # "accept_task=0.1,submit_task=0.5" -> {"accept_task": 0.1, "submit_task": 0.5}
+    rates = {}
+    for item in filter(None, (part.strip() for part in raw.split(","))):
+        name, _, rate = item.partition("=")
+        rates[name.strip()] = float(rate)
+    return rates
+
+
+_sample_rates = _parse_sample_rates(Settings.LOG_SAMPLE_RATES)
+
+
+def _sample_decision(record):
+    # Один раз на запись, до раздачи по sink'ам: консоль и файл получают одно решение
+    rate = record["extra"]["sample"]
+    record["extra"]["sampled"] = rate >= 1 or record["level"].no >= 30 or random.random() < rate
+
+
+@functools.lru_cache(maxsize=None)
+def sampled(name: str):
+    """
+    Логгер для частых info-строк маршрута: пишется только доля записей
+    (LOG_SAMPLE_RATES, по умолчанию LOG_SAMPLE_RATE). WARNING и выше не сэмплируются.
+    Решение принимается на запись (patch), а не на каждый sink.
+    Логгер на имя создаётся один раз: имена — литералы маршрутов, кэш не растёт.
+    """
+    return logger.bind(sample=_sample_rates.get(name, Settings.LOG_SAMPLE_RATE)).patch(_sample_decision)
+
+
+def _sample_filter(record) -> bool:
+    return record["extra"].get("sampled", True)
 
 
 def setup_logger():
 
     # Конфигурация Loguru
     logger.remove()  # Удаляем стандартный обработчик
+    production = Settings.LOG_MODE == "prod"
+    # prod: JSON-записи, запись в фоне (enqueue), сэмплирование частых строк
+    common = {
+        "level": Settings.LOG_LEVEL,
+        "enqueue": production,
+        "serialize": production,
+        "filter": _sample_filter,
+        "backtrace": not production,
+        "diagnose": not production,
+    }
     logger.add(
         sys.stdout,  # Логи в консоль
         format="<green>{time:YYYY-MM-DD HH:mm:ss}</green> | <level>{level: <8}</level> | <cyan>{message}</cyan>",
-        level="DEBUG",
+        **common,
     )
     logger.add(
         "logs/app.log",  # Логи в файл
         rotation="10 MB",  # Ротация файла (каждые 10 MB)
         retention="7 days",  # Хранить логи 7 дней
-        level="DEBUG",
         compression="zip",  # Сжимать старые логи
+        **common,
     )
 
-# Если хотите, чтобы логгер вел себя как синглтон:
+# 📌 Буферизованная запись UserActionLog: очередь + фоновый bulk_create
+
+
+class ActionLogSink:
+    """
+    Обработчик запроса только кладёт запись в очередь.
+    Фоновая задача пишет пачками через bulk_create — по размеру пачки или по таймауту.
+    При переполнении очереди запись отбрасывается и учитывается в счётчике.
+    """
+
+    def __init__(self, maxsize: int, batch_size: int, flush_interval: float):
+        self.maxsize = maxsize
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.enqueued = 0
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+        self._queue: asyncio.Queue | None = None
+        self._task: asyncio.Task | None = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def start(self):
+        if self.running:
+            return
+        self._queue = asyncio.Queue(maxsize=self.maxsize)
+        self._task = asyncio.create_task(self._drain())
+
+    async def stop(self):
+        """
+        Останавливает фоновую задачу и дописывает всё, что осталось в очереди.
+        """
+        if not self.running:
+            return
+        await self._queue.put(None)
+        await self._task
+        self._task = None
+
+    def put(self, entry: UserActionLog) -> bool:
+        try:
+            self._queue.put_nowait(entry)
+        except asyncio.QueueFull:
+            self.dropped += 1
+            return False
+        self.enqueued += 1
+        return True
+
+    async def _write(self, batch: list[UserActionLog]):
+        try:
+            await UserActionLog.bulk_create(batch)
+            self.written += len(batch)
+        except Exception as e:
+            self.failed += len(batch)
+            logger.exception("❌ Не удалось записать {} логов действий: {}", len(batch), e)
+
+    async def _drain(self):
+        loop = asyncio.get_running_loop()
+        stopping = False
+        while not stopping:
+            entry = await self._queue.get()
+            if entry is None:
+                break
+            batch = [entry]
+            deadline = loop.time() + self.flush_interval
+            while len(batch) < self.batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    entry = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if entry is None:
+                    stopping = True
+                    break
+                batch.append(entry)
+            await self._write(batch)
+
+        # Дописываем остаток после сигнала остановки
+        rest = []
+        while not self._queue.empty():
+            entry = self._queue.get_nowait()
+            if entry is not None:
+                rest.append(entry)
+        for i in range(0, len(rest), self.batch_size):
+            await self._write(rest[i:i + self.batch_size])
+
+    def stats(self) -> dict:
+        return {
+            "queued": self._queue.qsize() if self._queue else 0,
+            "enqueued": self.enqueued,
+            "written": self.written,
+            "dropped": self.dropped,
+            "failed": self.failed,
+        }
+
+
+action_log_sink = ActionLogSink(
+    maxsize=Settings.ACTION_LOG_QUEUE_SIZE,
+    batch_size=Settings.ACTION_LOG_BATCH_SIZE,
+    flush_interval=Settings.ACTION_LOG_FLUSH_INTERVAL,
+)
 
 
 async def log_user_action(user_id: str, action: str, task_id: str = None):
     """
     Логирует действия пользователей в Telegram-приложении.
     """
-    log_entry = await UserActionLog.create(
-        user_id=user_id,
-        action=action,
-        task_id=task_id
-    )
-    print(f"✅ Лог добавлен: {log_entry}")
+    entry = UserActionLog(user_id=user_id, action=action, task_id=task_id)
+    if action_log_sink.running:
+        action_log_sink.put(entry)
+    else:
+        # Вне приложения (скрипты) — пишем сразу
+        await entry.save()
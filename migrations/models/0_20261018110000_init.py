@@ -0,0 +1,111 @@
+from tortoise import BaseDBAsyncClient
+
+
+# 📌 Базовая схема (как её создаёт aerich init-db) и таблица истории aerich.
+#    IF NOT EXISTS: на базе, созданной generate_schemas до миграций, добавится только "aerich".
+
+
+async def upgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        CREATE TABLE IF NOT EXISTS "admin_users" (
+            "admin_id" UUID NOT NULL PRIMARY KEY,
+            "username" VARCHAR(50) NOT NULL UNIQUE,
+            "password_hash" VARCHAR(255) NOT NULL,
+            "created_at" TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP
+        );
+        CREATE TABLE IF NOT EXISTS "task_platforms" (
+            "platform_id" UUID NOT NULL PRIMARY KEY,
+            "platform_name" VARCHAR(100) NOT NULL UNIQUE,
+            "created_at" TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP
+        );
+        CREATE TABLE IF NOT EXISTS "task_requirement_types" (
+            "req_type_id" VARCHAR(50) NOT NULL PRIMARY KEY,
+            "req_name" VARCHAR(255) NOT NULL UNIQUE,
+            "created_at" TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP
+        );
+        CREATE TABLE IF NOT EXISTS "task_statuses" (
+            "status_id" VARCHAR(50) NOT NULL PRIMARY KEY,
+            "status_name" VARCHAR(255) NOT NULL UNIQUE,
+            "created_at" TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP
+        );
+        CREATE TABLE IF NOT EXISTS "task_types" (
+            "task_type_id" VARCHAR(50) NOT NULL PRIMARY KEY,
+            "task_type_name" VARCHAR(255) NOT NULL UNIQUE,
+            "created_at" TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP
+        );
+        CREATE TABLE IF NOT EXISTS "tasks" (
+            "task_id" UUID NOT NULL PRIMARY KEY,
+            "task_name" VARCHAR(255) NOT NULL,
+            "description" TEXT NOT NULL,
+            "reward" DECIMAL(10,2) NOT NULL,
+            "verification_type" VARCHAR(50) NOT NULL,
+            "created_at" TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            "creator_id" UUID NOT NULL REFERENCES "admin_users" ("admin_id") ON DELETE CASCADE,
+            "platform_id" UUID NOT NULL REFERENCES "task_platforms" ("platform_id") ON DELETE CASCADE,
+            "status_id" VARCHAR(50) NOT NULL REFERENCES "task_statuses" ("status_id") ON DELETE CASCADE,
+            "task_type_id" VARCHAR(50) NOT NULL REFERENCES "task_types" ("task_type_id") ON DELETE CASCADE
+        );
+        CREATE TABLE IF NOT EXISTS "user_roles" (
+            "role_id" VARCHAR(50) NOT NULL PRIMARY KEY,
+            "role_name" VARCHAR(50) NOT NULL UNIQUE,
+            "created_at" TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP
+        );
+        CREATE TABLE IF NOT EXISTS "users" (
+            "user_id" UUID NOT NULL PRIMARY KEY,
+            "telegram_id" BIGINT NOT NULL UNIQUE,
+            "username" VARCHAR(255),
+            "balance" DECIMAL(10,2) NOT NULL DEFAULT 0,
+            "created_at" TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            "referrer_id" UUID REFERENCES "users" ("user_id") ON DELETE CASCADE,
+            "role_id" VARCHAR(50) NOT NULL REFERENCES "user_roles" ("role_id") ON DELETE CASCADE
+        );
+        CREATE TABLE IF NOT EXISTS "transactions" (
+            "transaction_id" UUID NOT NULL PRIMARY KEY,
+            "amount" DECIMAL(10,2) NOT NULL,
+            "transaction_type" VARCHAR(50) NOT NULL,
+            "created_at" TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            "task_id" UUID REFERENCES "tasks" ("task_id") ON DELETE CASCADE,
+            "user_id" UUID NOT NULL REFERENCES "users" ("user_id") ON DELETE CASCADE
+        );
+        CREATE TABLE IF NOT EXISTS "user_accounts" (
+            "account_id" UUID NOT NULL PRIMARY KEY,
+            "account_name" VARCHAR(255) NOT NULL,
+            "account_platform_id" VARCHAR(255) NOT NULL UNIQUE,
+            "created_at" TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            "platform_id" UUID NOT NULL REFERENCES "task_platforms" ("platform_id") ON DELETE CASCADE,
+            "user_id" UUID NOT NULL REFERENCES "users" ("user_id") ON DELETE CASCADE
+        );
+        CREATE TABLE IF NOT EXISTS "task_assignments" (
+            "assignment_id" UUID NOT NULL PRIMARY KEY,
+            "submitted_at" TIMESTAMPTZ,
+            "status" VARCHAR(50) NOT NULL DEFAULT 'in_progress',
+            "assigned_profile_id" UUID NOT NULL REFERENCES "user_accounts" ("account_id") ON DELETE CASCADE,
+            "task_id" UUID NOT NULL REFERENCES "tasks" ("task_id") ON DELETE CASCADE,
+            "user_id" UUID NOT NULL REFERENCES "users" ("user_id") ON DELETE CASCADE
+        );
+        CREATE TABLE IF NOT EXISTS "task_verifications" (
+            "verification_id" UUID NOT NULL PRIMARY KEY,
+            "check_date" TIMESTAMPTZ,
+            "status" VARCHAR(50) NOT NULL DEFAULT 'pending',
+            "details" TEXT,
+            "s3_name" VARCHAR(255) NOT NULL,
+            "task_assignment_id" UUID NOT NULL REFERENCES "task_assignments" ("assignment_id") ON DELETE CASCADE
+        );
+        CREATE TABLE IF NOT EXISTS "useractionlog" (
+            "log_id" UUID NOT NULL PRIMARY KEY,
+            "action" VARCHAR(255) NOT NULL,
+            "timestamp" TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            "task_id" UUID REFERENCES "tasks" ("task_id") ON DELETE CASCADE,
+            "user_id" UUID NOT NULL REFERENCES "users" ("user_id") ON DELETE CASCADE
+        );
+        CREATE TABLE IF NOT EXISTS "aerich" (
+            "id" SERIAL NOT NULL PRIMARY KEY,
+            "version" VARCHAR(255) NOT NULL,
+            "app" VARCHAR(100) NOT NULL,
+            "content" JSONB NOT NULL
+        );"""
+
+
+async def downgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        """
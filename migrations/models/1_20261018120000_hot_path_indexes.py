@@ -0,0 +1,122 @@
+from tortoise import BaseDBAsyncClient
+
+
+# 📌 Индексы горячих запросов, уникальность (user, task), поля журнала проводок,
+#    очереди проверки и лимита мест. Базовая схема — 0_*_init (aerich init-db).
+
+
+async def upgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        -- Статусы, которые выставляет бэкенд
+        INSERT INTO "task_statuses" ("status_id", "status_name")
+            VALUES ('active', 'Активно'), ('full', 'Набор закрыт')
+            ON CONFLICT DO NOTHING;
+
+        -- Задания: лимит мест и счётчик занятых
+        ALTER TABLE "tasks" ADD COLUMN IF NOT EXISTS "max_assignments" INT;
+        ALTER TABLE "tasks" ADD COLUMN IF NOT EXISTS "assignments_count" INT NOT NULL DEFAULT 0;
+
+        -- Назначения: дата создания и ключ идемпотентности принятия
+        ALTER TABLE "task_assignments" ADD COLUMN IF NOT EXISTS "idempotency_key" VARCHAR(128);
+        ALTER TABLE "task_assignments" ADD COLUMN IF NOT EXISTS "created_at" TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP;
+
+        -- Верификации: хеш скриншота, аренда в очереди, дата поступления
+        ALTER TABLE "task_verifications" ADD COLUMN IF NOT EXISTS "content_hash" VARCHAR(64);
+        ALTER TABLE "task_verifications" ADD COLUMN IF NOT EXISTS "reviewer_id" UUID
+            REFERENCES "users" ("user_id") ON DELETE CASCADE;
+        ALTER TABLE "task_verifications" ADD COLUMN IF NOT EXISTS "lease_expires_at" TIMESTAMPTZ;
+        ALTER TABLE "task_verifications" ADD COLUMN IF NOT EXISTS "created_at" TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP;
+        UPDATE "task_verifications" AS tv SET "created_at" = ta."submitted_at"
+            FROM "task_assignments" AS ta
+            WHERE ta."assignment_id" = tv."task_assignment_id" AND ta."submitted_at" IS NOT NULL;
+
+        -- Транзакции: ключ идемпотентности проводки
+        ALTER TABLE "transactions" ADD COLUMN IF NOT EXISTS "idempotency_key" VARCHAR(128) UNIQUE;
+
+        -- Сверка баланса
+        CREATE TABLE IF NOT EXISTS "ledger_watermarks" (
+            "name" VARCHAR(50) NOT NULL PRIMARY KEY,
+            "watermark" TIMESTAMPTZ NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS "ledger_checkpoints" (
+            "ledger_total" DECIMAL(12,2) NOT NULL DEFAULT 0,
+            "updated_at" TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            "user_id" UUID NOT NULL PRIMARY KEY REFERENCES "users" ("user_id") ON DELETE CASCADE
+        );
+
+        -- Дубли (user, task): верификации переносим на оставшееся назначение
+        -- (в приоритете completed, затем pending_review, затем самое раннее)
+        CREATE TEMPORARY TABLE "_assignment_dups" ON COMMIT DROP AS
+            SELECT "assignment_id", "keep_id" FROM (
+                SELECT "assignment_id",
+                       FIRST_VALUE("assignment_id") OVER w AS "keep_id"
+                FROM "task_assignments"
+                WINDOW w AS (
+                    PARTITION BY "user_id", "task_id"
+                    ORDER BY ("status" = 'completed') DESC, ("status" = 'pending_review') DESC,
+                             "created_at", "assignment_id"
+                )
+            ) AS ranked
+            WHERE "assignment_id" <> "keep_id";
+        UPDATE "task_verifications" AS tv SET "task_assignment_id" = d."keep_id"
+            FROM "_assignment_dups" AS d WHERE tv."task_assignment_id" = d."assignment_id";
+        DELETE FROM "task_assignments"
+            WHERE "assignment_id" IN (SELECT "assignment_id" FROM "_assignment_dups");
+        -- Повторный запуск (ограничение уже есть) не падает
+        DO $$
+        BEGIN
+            IF NOT EXISTS (
+                SELECT 1 FROM pg_constraint WHERE conname = 'uid_task_assign_user_id_4ebae0'
+            ) THEN
+                ALTER TABLE "task_assignments"
+                    ADD CONSTRAINT "uid_task_assign_user_id_4ebae0" UNIQUE ("user_id", "task_id");
+            END IF;
+        END
+        $$;
+
+        -- Счётчик занятых мест по существующим назначениям
+        UPDATE "tasks" AS t SET "assignments_count" = c."taken"
+            FROM (
+                SELECT "task_id", COUNT(*) AS "taken" FROM "task_assignments"
+                WHERE "status" NOT IN ('rejected', 'expired')
+                GROUP BY "task_id"
+            ) AS c
+            WHERE c."task_id" = t."task_id";
+
+        -- Индексы горячих запросов
+        CREATE INDEX IF NOT EXISTS "idx_tasks_status__4f2596" ON "tasks" ("status_id", "created_at", "task_id");
+        CREATE INDEX IF NOT EXISTS "idx_task_assign_user_id_24aaa2" ON "task_assignments" ("user_id", "status", "created_at");
+        CREATE INDEX IF NOT EXISTS "idx_task_assign_status_cbab3c" ON "task_assignments" ("status", "created_at");
+        CREATE INDEX IF NOT EXISTS "idx_transaction_created_3f576f" ON "transactions" ("created_at");
+        CREATE INDEX IF NOT EXISTS "idx_transaction_user_id_201551" ON "transactions" ("user_id", "created_at", "transaction_id");
+        CREATE INDEX IF NOT EXISTS "idx_task_verifi_content_0964b3" ON "task_verifications" ("content_hash");
+        CREATE INDEX IF NOT EXISTS "idx_task_verifi_status_33c9ce" ON "task_verifications" ("status", "created_at");
+        CREATE INDEX IF NOT EXISTS "idx_task_verifi_task_as_0a6f31" ON "task_verifications" ("task_assignment_id");
+        CREATE INDEX IF NOT EXISTS "idx_user_accoun_user_id_e33e78" ON "user_accounts" ("user_id");
+        CREATE INDEX IF NOT EXISTS "idx_useractionl_user_id_031474" ON "useractionlog" ("user_id", "timestamp");"""
+
+
+async def downgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        DROP INDEX IF EXISTS "idx_useractionl_user_id_031474";
+        DROP INDEX IF EXISTS "idx_user_accoun_user_id_e33e78";
+        DROP INDEX IF EXISTS "idx_task_verifi_task_as_0a6f31";
+        DROP INDEX IF EXISTS "idx_task_verifi_status_33c9ce";
+        DROP INDEX IF EXISTS "idx_task_verifi_content_0964b3";
+        DROP INDEX IF EXISTS "idx_transaction_user_id_201551";
+        DROP INDEX IF EXISTS "idx_transaction_created_3f576f";
+        DROP INDEX IF EXISTS "idx_task_assign_status_cbab3c";
+        DROP INDEX IF EXISTS "idx_task_assign_user_id_24aaa2";
+        DROP INDEX IF EXISTS "idx_tasks_status__4f2596";
+        ALTER TABLE "task_assignments" DROP CONSTRAINT IF EXISTS "uid_task_assign_user_id_4ebae0";
+        DROP TABLE IF EXISTS "ledger_checkpoints";
+        DROP TABLE IF EXISTS "ledger_watermarks";
+        ALTER TABLE "transactions" DROP COLUMN IF EXISTS "idempotency_key";
+        ALTER TABLE "task_verifications" DROP COLUMN IF EXISTS "created_at";
+        ALTER TABLE "task_verifications" DROP COLUMN IF EXISTS "lease_expires_at";
+        ALTER TABLE "task_verifications" DROP COLUMN IF EXISTS "reviewer_id";
+        ALTER TABLE "task_verifications" DROP COLUMN IF EXISTS "content_hash";
+        ALTER TABLE "task_assignments" DROP COLUMN IF EXISTS "created_at";
+        ALTER TABLE "task_assignments" DROP COLUMN IF EXISTS "idempotency_key";
+        ALTER TABLE "tasks" DROP COLUMN IF EXISTS "assignments_count";
+        ALTER TABLE "tasks" DROP COLUMN IF EXISTS "max_assignments";"""
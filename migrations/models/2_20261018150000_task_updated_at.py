@@ -0,0 +1,28 @@
+from tortoise import BaseDBAsyncClient
+
+
+# 📌 Версия строки задания для ETag ленты и карточки задания
+
+
+async def upgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        -- Заполняем только что добавленную колонку; при повторном запуске
+        -- уже накопленные updated_at не затираются
+        DO $$
+        BEGIN
+            IF NOT EXISTS (
+                SELECT 1 FROM information_schema.columns
+                WHERE table_schema = current_schema() AND table_name = 'tasks' AND column_name = 'updated_at'
+            ) THEN
+                ALTER TABLE "tasks" ADD COLUMN "updated_at" TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP;
+                UPDATE "tasks" SET "updated_at" = "created_at";
+            END IF;
+        END
+        $$;
+        CREATE INDEX IF NOT EXISTS "idx_tasks_status__15f133" ON "tasks" ("status_id", "updated_at");"""
+
+
+async def downgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        DROP INDEX IF EXISTS "idx_tasks_status__15f133";
+        ALTER TABLE "tasks" DROP COLUMN IF EXISTS "updated_at";"""
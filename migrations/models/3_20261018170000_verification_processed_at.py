@@ -0,0 +1,14 @@
+from tortoise import BaseDBAsyncClient
+
+
+# 📌 Отметка о готовности сжатой копии и превью скриншота
+
+
+async def upgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        ALTER TABLE "task_verifications" ADD COLUMN IF NOT EXISTS "processed_at" TIMESTAMPTZ;"""
+
+
+async def downgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        ALTER TABLE "task_verifications" DROP COLUMN IF EXISTS "processed_at";"""
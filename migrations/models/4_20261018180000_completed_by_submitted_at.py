@@ -0,0 +1,21 @@
+from tortoise import BaseDBAsyncClient
+
+
+# 📌 Выполненные задания по дате сдачи: индекс (user, status, submitted_at)
+
+
+async def upgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        -- Назначения, выполненные до того, как сдача стала записывать submitted_at:
+        -- дата одобрения — ближайшая известная дата сдачи
+        UPDATE "task_assignments" AS ta SET "submitted_at" = COALESCE(
+                (SELECT MIN(tv."check_date") FROM "task_verifications" AS tv
+                    WHERE tv."task_assignment_id" = ta."assignment_id" AND tv."status" = 'approved'),
+                ta."created_at")
+            WHERE ta."status" = 'completed' AND ta."submitted_at" IS NULL;
+        CREATE INDEX IF NOT EXISTS "idx_task_assign_user_id_86d736" ON "task_assignments" ("user_id", "status", "submitted_at");"""
+
+
+async def downgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        DROP INDEX IF EXISTS "idx_task_assign_user_id_86d736";"""
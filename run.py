@@ -1,6 +1,7 @@
 import os
 from dotenv import load_dotenv
 from app import create_app
+from app.database.managers.reference_cache import reference_cache
 
 load_dotenv()
 
@@ -11,12 +12,15 @@ PORT = os.getenv('ADMIN_PORT', "8001")
 
 
 async def create_test_data():
-    from app.database.models import UserRole
+    from app.database.models import UserRole, TaskStatus
     try:
         await UserRole.create(role_id="executor", role_name="Исполнитель")
         await UserRole.create(role_id="manager", role_name="Проверяющий")
     except Exception as e:
         print(f"Exception: {e}")
+    # Статусы, которые выставляет сам бэкенд
+    await TaskStatus.get_or_create(status_id="active", defaults={"status_name": "Активно"})
+    await TaskStatus.get_or_create(status_id="full", defaults={"status_name": "Набор закрыт"})
 
 app = create_app()
 
@@ -27,6 +31,7 @@ ORIGIN = os.getenv('ORIGIN')
 async def startup_event():
     # Создаем администратора при запуске
     await create_test_data()
+    reference_cache.invalidate()
 
 # 📌 Запуск Uvicorn
 if __name__ == "__main__":
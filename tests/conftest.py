@@ -0,0 +1,256 @@
+import asyncio
+import importlib.util
+import os
+import shutil
+import socket
+import uuid
+from dataclasses import dataclass
+from decimal import Decimal
+from pathlib import Path
+
+import pytest
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+# Окружение до импорта приложения: Settings читает его при импорте config
+S3_PORT = _free_port()
+os.environ.update({
+    "TELEGRAM_BOT_TOKEN": "123456:test-token",
+    "JWT_SECRET": "test-jwt-secret",
+    "ENDPOINT_URL": f"http://127.0.0.1:{S3_PORT}",
+    "REGION_NAME": "us-east-1",
+    "AWS_ACCESS_KEY_ID": "test",
+    "AWS_SECRET_ACCESS_KEY": "test",
+    "BUCKET_NAME": "test-bucket",
+})
+
+from fastapi.testclient import TestClient  # noqa: E402
+from tortoise import Tortoise  # noqa: E402
+from tortoise.backends.base.executor import EXECUTOR_CACHE  # noqa: E402
+from app.database.config import MODELS  # noqa: E402
+from app.database.managers.reference_cache import reference_cache  # noqa: E402
+from app.database.managers.user_cache import user_cache  # noqa: E402
+from app.database.models import (  # noqa: E402
+    AdminUser, Task, TaskPlatform, TaskStatus, TaskType, User, UserAccount, UserRole,
+)
+from app.handlers.auth_handlers import create_access_token  # noqa: E402
+from config import Settings  # noqa: E402
+
+# Сервер PostgreSQL для тестов (URL служебной БД, например postgres://postgres@127.0.0.1:5432/postgres).
+# Без него тесты идут только на SQLite
+TEST_POSTGRES_URL = os.getenv("TEST_POSTGRES_URL")
+
+
+# 📌 Базы данных: SQLite всегда, PostgreSQL — если задан TEST_POSTGRES_URL
+
+
+async def _postgres_admin(query: str):
+    import asyncpg
+    connection = await asyncpg.connect(TEST_POSTGRES_URL)
+    try:
+        await connection.execute(query)
+    finally:
+        await connection.close()
+
+
+def _postgres_database(name: str) -> str:
+    base, _, _ = TEST_POSTGRES_URL.rpartition("/")
+    return f"{base}/{name}"
+
+
+@pytest.fixture
+def make_database(tmp_path, request):
+    """
+    Фабрика баз на время теста: make_database(backend, template=None) -> URL.
+    С template — копия существующей базы того же движка.
+    """
+    created = []
+
+    def make(backend: str, template: str | None = None) -> str:
+        name = f"test_{uuid.uuid4().hex[:12]}"
+        if backend == "sqlite":
+            path = tmp_path / f"{name}.sqlite3"
+            if template:
+                shutil.copyfile(template.removeprefix("sqlite://"), path)
+            return f"sqlite://{path}"
+        if not TEST_POSTGRES_URL:
+            pytest.skip("TEST_POSTGRES_URL не задан")
+        query = f'CREATE DATABASE "{name}"'
+        if template:
+            query += f' TEMPLATE "{template.rpartition("/")[2]}"'
+        asyncio.run(_postgres_admin(query))
+        created.append(name)
+        return _postgres_database(name)
+
+    yield make
+    for name in created:
+        asyncio.run(_postgres_admin(f'DROP DATABASE IF EXISTS "{name}" WITH (FORCE)'))
+
+
+# Миграции aerich (PostgreSQL): схема тестовой базы та же, что на проде
+MIGRATIONS_DIR = Path(__file__).resolve().parent.parent / "migrations" / "models"
+
+
+def _migrations() -> list:
+    files = sorted(MIGRATIONS_DIR.glob("[0-9]*_*.py"), key=lambda path: int(path.name.split("_", 1)[0]))
+    modules = []
+    for path in files:
+        spec = importlib.util.spec_from_file_location(f"migration_{path.stem}", path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        modules.append(module)
+    return modules
+
+
+async def _apply_migrations(db_url: str):
+    import asyncpg
+    connection = await asyncpg.connect(db_url)
+    try:
+        # Как aerich upgrade: каждая миграция в своей транзакции
+        for migration in _migrations():
+            async with connection.transaction():
+                await connection.execute(await migration.upgrade(None))
+    finally:
+        await connection.close()
+
+
+async def _generate_schema(db_url: str):
+    await Tortoise.init(db_url=db_url, modules={"models": MODELS})
+    try:
+        await Tortoise.generate_schemas()
+    finally:
+        await Tortoise.close_connections()
+
+
+def create_schema(db_url: str):
+    """
+    PostgreSQL — миграциями из migrations/models, SQLite (их SQL не поддерживает) — generate_schemas.
+    """
+    if db_url.startswith("sqlite"):
+        asyncio.run(_generate_schema(db_url))
+    else:
+        asyncio.run(_apply_migrations(db_url))
+
+
+def run_on(db_url: str, func, *args):
+    """
+    Выполняет корутину func(*args) на базе вне приложения (до его запуска).
+    """
+    async def run():
+        EXECUTOR_CACHE.clear()
+        await Tortoise.init(db_url=db_url, modules={"models": MODELS})
+        try:
+            return await func(*args)
+        finally:
+            await Tortoise.close_connections()
+
+    return asyncio.run(run())
+
+
+@pytest.fixture(params=["sqlite", "postgres"])
+def database_url(request, make_database) -> str:
+    url = make_database(request.param)
+    create_schema(url)
+    return url
+
+
+# 📌 S3: сервер moto на свободном порту (ENDPOINT_URL выше)
+
+
+@pytest.fixture(scope="session", autouse=True)
+def s3_server():
+    from moto.server import ThreadedMotoServer
+    server = ThreadedMotoServer(ip_address="127.0.0.1", port=S3_PORT, verbose=False)
+    server.start()
+    yield
+    server.stop()
+
+
+@pytest.fixture(scope="session")
+def s3_bucket(s3_server):
+    import boto3
+    boto3.client(
+        "s3", endpoint_url=os.environ["ENDPOINT_URL"], region_name=os.environ["REGION_NAME"],
+    ).create_bucket(Bucket=os.environ["BUCKET_NAME"])
+    return os.environ["BUCKET_NAME"]
+
+
+# 📌 Приложение
+
+
+def start_client(monkeypatch, tmp_path, database_url: str, replica_url: str | None = None) -> TestClient:
+    monkeypatch.setattr(Settings, "DATABASE_URL", database_url)
+    monkeypatch.setattr(Settings, "DATABASE_REPLICA_URL", replica_url)
+    # logs/app.log пишется относительно рабочего каталога
+    monkeypatch.chdir(tmp_path)
+    # Готовые INSERT кэшируются по имени соединения на весь процесс — между SQLite и PostgreSQL их сбрасываем
+    EXECUTOR_CACHE.clear()
+    reference_cache.invalidate()
+    user_cache.clear()
+    from app import create_app
+    return TestClient(create_app())
+
+
+@pytest.fixture
+def client(monkeypatch, tmp_path, database_url):
+    with start_client(monkeypatch, tmp_path, database_url) as test_client:
+        yield test_client
+
+
+# 📌 Данные
+
+
+@dataclass
+class World:
+    executor: User
+    other: User
+    manager: User
+    account: UserAccount
+    other_account: UserAccount
+    platform: TaskPlatform
+    tasks: list[Task]
+
+    def params(self, user: User | None = None) -> dict:
+        return {"telegram_id": (user or self.executor).telegram_id}
+
+
+async def seed_world(tasks: int = 3, max_assignments: int | None = None) -> World:
+    await UserRole.create(role_id="executor", role_name="Исполнитель")
+    await UserRole.create(role_id="manager", role_name="Проверяющий")
+    # Статусы бэкенда на PostgreSQL уже добавлены миграцией
+    await TaskStatus.get_or_create(status_id="active", defaults={"status_name": "Активно"})
+    await TaskStatus.get_or_create(status_id="full", defaults={"status_name": "Набор закрыт"})
+    await TaskType.create(task_type_id="like", task_type_name="Лайк")
+    platform = await TaskPlatform.create(platform_name="YouTube")
+    admin = await AdminUser.create(username="admin", password_hash="x")
+    executor = await User.create(telegram_id=1001, username="executor", role_id="executor")
+    other = await User.create(telegram_id=1002, username="other", role_id="executor")
+    manager = await User.create(telegram_id=2001, username="manager", role_id="manager")
+    account = await UserAccount.create(
+        user=executor, platform=platform, account_name="exec", account_platform_id="yt-exec")
+    other_account = await UserAccount.create(
+        user=other, platform=platform, account_name="other", account_platform_id="yt-other")
+    created = [
+        await Task.create(
+            task_name=f"Задание {i}", creator=admin, platform=platform, task_type_id="like",
+            description=f"Описание {i}", reward=Decimal("1.50"), verification_type="screenshot",
+            status_id="active", max_assignments=max_assignments)
+        for i in range(tasks)
+    ]
+    reference_cache.invalidate()
+    return World(executor, other, manager, account, other_account, platform, created)
+
+
+@pytest.fixture
+def world(client) -> World:
+    return client.portal.call(seed_world)
+
+
+def bearer(user: User) -> dict:
+    token, _ = create_access_token(user)
+    return {"Authorization": f"Bearer {token}"}
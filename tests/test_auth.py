@@ -0,0 +1,88 @@
+import hashlib
+import hmac
+import json
+import os
+import time
+from types import SimpleNamespace
+from urllib.parse import urlencode
+
+import pytest
+from fastapi import HTTPException
+
+from app.handlers import auth_handlers
+from app.handlers.auth_handlers import clear_verified_cache, verify_telegram_auth
+
+
+def _init_data(auth_date: int = None, **extra) -> str:
+    """
+    Init data так, как её подписывает Telegram: все поля, кроме hash, включая signature.
+    """
+    user = {"id": 42, "first_name": "Test", "photo_url": "https://t.me/i/userpic/320/test.jpg"}
+    fields = {
+        "auth_date": str(auth_date or int(time.time())),
+        "query_id": "AAHdF6IQAAAAAN0XohDhrOrc",
+        "signature": "6fbdaab833d39f54518bd5c3eb3f511d035e68cb",
+        "user": json.dumps(user, separators=(',', ':')).replace("/", "\\/"),
+        **extra,
+    }
+    data_check_string = "\n".join(f"{k}={v}" for k, v in sorted(fields.items()))
+    secret_key = hmac.new(b"WebAppData", os.environ["TELEGRAM_BOT_TOKEN"].encode(), hashlib.sha256).digest()
+    fields["hash"] = hmac.new(secret_key, data_check_string.encode(), hashlib.sha256).hexdigest()
+    return urlencode(fields)
+
+
+@pytest.fixture(autouse=True)
+def _empty_cache():
+    clear_verified_cache()
+    yield
+    clear_verified_cache()
+
+
+def test_valid_init_data_with_signature():
+    fields = verify_telegram_auth({"init_data": _init_data()})
+
+    assert "hash" not in fields
+    assert fields["signature"] == "6fbdaab833d39f54518bd5c3eb3f511d035e68cb"
+    assert json.loads(fields["user"])["id"] == 42
+
+
+def test_tampered_hash_is_rejected():
+    init_data = _init_data()
+    tampered = init_data[:-1] + ("0" if init_data[-1] != "0" else "1")
+
+    with pytest.raises(HTTPException) as exc:
+        verify_telegram_auth({"init_data": tampered})
+    assert exc.value.status_code == 403
+
+
+def test_tampered_field_is_rejected():
+    init_data = _init_data().replace("query_id=AAH", "query_id=BBH")
+
+    with pytest.raises(HTTPException) as exc:
+        verify_telegram_auth({"init_data": init_data})
+    assert exc.value.status_code == 403
+
+
+def test_stale_auth_date_is_rejected():
+    stale = int(time.time()) - auth_handlers.TELEGRAM_AUTH_MAX_AGE - 10
+
+    with pytest.raises(HTTPException) as exc:
+        verify_telegram_auth({"init_data": _init_data(auth_date=stale)})
+    assert exc.value.status_code == 403
+    assert exc.value.detail == "Telegram auth data expired"
+
+
+def test_repeat_is_served_from_cache(monkeypatch):
+    init_data = _init_data()
+    first = verify_telegram_auth({"init_data": init_data})
+
+    # Повтор не должен доходить до HMAC: подменяем модуль, который упадёт при вызове
+    def fail(*args, **kwargs):
+        raise AssertionError("HMAC recomputed on cache hit")
+
+    monkeypatch.setattr(auth_handlers, "hmac", SimpleNamespace(new=fail, compare_digest=fail))
+    assert verify_telegram_auth({"init_data": init_data}) == first
+
+    # Тот же hash с другими полями кэшем не принимается
+    with pytest.raises(AssertionError):
+        verify_telegram_auth({"init_data": init_data.replace("query_id=AAH", "query_id=BBH")})
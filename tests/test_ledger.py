@@ -0,0 +1,118 @@
+from datetime import timedelta
+from decimal import Decimal
+
+import pytest
+from tortoise.expressions import F
+
+from app.database.managers.ledger_manager import (
+    IdempotencyKeyReusedError, InsufficientFundsError, post_entry, reconcile_ledger,
+)
+from app.database.models import LedgerCheckpoint, Transaction, User
+from config import Settings
+
+
+async def _balance(user_id) -> Decimal:
+    return (await User.get(user_id=user_id)).balance
+
+
+async def _checkpoint(user_id) -> Decimal:
+    return (await LedgerCheckpoint.get(user_id=user_id)).ledger_total
+
+
+async def _set_balance(user_id, balance: Decimal):
+    await User.filter(user_id=user_id).update(balance=balance)
+
+
+def test_post_entry_is_idempotent(client, world):
+    user_id = world.executor.user_id
+    call = client.portal.call
+
+    transaction, created = call(post_entry, user_id, Decimal("10.00"), "credit", None, "reward:1")
+    assert created
+    assert call(_balance, user_id) == Decimal("10.00")
+
+    replay, created = call(post_entry, user_id, Decimal("10.00"), "credit", None, "reward:1")
+    assert not created
+    assert replay.transaction_id == transaction.transaction_id
+    assert call(_balance, user_id) == Decimal("10.00")
+
+    with pytest.raises(IdempotencyKeyReusedError):
+        call(post_entry, user_id, Decimal("5.00"), "credit", None, "reward:1")
+
+
+def test_debit_requires_funds(client, world):
+    user_id = world.executor.user_id
+    call = client.portal.call
+    call(post_entry, user_id, Decimal("10.00"), "credit")
+
+    with pytest.raises(InsufficientFundsError):
+        call(post_entry, user_id, Decimal("20.00"), "withdraw")
+    # Проводка откатывается вместе с балансом
+    assert call(Transaction.filter(user_id=user_id).count) == 1
+    assert call(_balance, user_id) == Decimal("10.00")
+
+    # В SQLite DecimalField хранится строкой и balance >= amount сравнивается как текст
+    if not Settings.DATABASE_URL.startswith("sqlite"):
+        call(post_entry, user_id, Decimal("4.00"), "withdraw")
+        assert call(_balance, user_id) == Decimal("6.00")
+
+
+def test_reconcile_detects_balance_drift(client, world):
+    user_id = world.executor.user_id
+    call = client.portal.call
+    call(post_entry, user_id, Decimal("5.00"), "credit")
+    call(post_entry, user_id, Decimal("3.00"), "debit")
+
+    result = call(reconcile_ledger, False, 0)
+    assert (result["users_with_entries"], result["checked"], result["mismatches"]) == (1, 1, [])
+
+    # Проводка после сверки учитывается как свежая поверх чекпоинта
+    call(post_entry, user_id, Decimal("1.00"), "credit")
+    assert call(reconcile_ledger, True, 0)["mismatches"] == []
+
+    # Баланс, изменённый мимо журнала
+    call(_set_balance, user_id, Decimal("100.00"))
+    mismatches = call(reconcile_ledger, True, 0)["mismatches"]
+    assert [(m["user_id"], m["balance"], m["ledger"]) for m in mismatches] == [
+        (user_id, Decimal("100.00"), Decimal("3.00"))]
+
+
+async def _post_late_entry(user_id, amount: Decimal, created_at):
+    # Проводка, закоммиченная уже после того, как watermark прошёл её created_at
+    await Transaction.create(user_id=user_id, amount=amount, transaction_type="credit", created_at=created_at)
+    await User.filter(user_id=user_id).update(balance=F("balance") + amount)
+
+
+def test_reconcile_recounts_late_committed_entries(client, world):
+    user_id = world.executor.user_id
+    call = client.portal.call
+    call(post_entry, user_id, Decimal("5.00"), "credit")
+    watermark = call(reconcile_ledger, False, 0)["watermark"]
+
+    call(_post_late_entry, user_id, Decimal("2.00"), watermark - timedelta(seconds=30))
+    assert call(reconcile_ledger, True, 0)["mismatches"] == []
+    assert call(_checkpoint, user_id) == Decimal("7.00")
+    assert call(reconcile_ledger, True, 0)["mismatches"] == []
+
+
+def test_history_filters_and_pages(client, world):
+    user_id = world.executor.user_id
+    call = client.portal.call
+    call(post_entry, user_id, Decimal("5.00"), "credit")
+    call(post_entry, user_id, Decimal("2.00"), "credit")
+    call(post_entry, user_id, Decimal("1.00"), "debit")
+
+    def history(**params):
+        return client.get("/tasks/history", params={**world.params(), **params})
+
+    response = history(transaction_type=["credit"], limit=1)
+    assert response.status_code == 200, response.text
+    page = response.json()
+    assert [item["transaction_type"] for item in page["items"]] == ["credit"]
+    assert page["has_more"]
+
+    page = history(transaction_type=["credit"], limit=1, cursor=page["next_cursor"]).json()
+    assert len(page["items"]) == 1 and not page["has_more"]
+
+    assert len(history(transaction_type=["credit", "debit"]).json()["items"]) == 3
+    assert history(limit=0).status_code == 422
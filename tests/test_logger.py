@@ -0,0 +1,29 @@
+import io
+
+from loguru import logger
+
+from logger import _sample_filter, _sample_rates, sampled
+
+
+def test_sampling_decided_once_per_record(monkeypatch):
+    monkeypatch.setitem(_sample_rates, "sampling_test", 0.5)
+    console, file = io.StringIO(), io.StringIO()
+    handlers = [logger.add(sink, filter=_sample_filter, format="{message}") for sink in (console, file)]
+    try:
+        log = sampled("sampling_test")
+        for i in range(200):
+            log.info("line {}", i)
+        log.warning("warning")
+    finally:
+        for handler in handlers:
+            logger.remove(handler)
+
+    # Оба sink'а получают одни и те же записи, WARNING — всегда
+    lines = console.getvalue().split("\n")
+    assert console.getvalue() == file.getvalue()
+    assert "warning" in lines
+    assert 0 < len(lines) - 2 < 200
+
+
+def test_sampled_logger_is_reused():
+    assert sampled("accept_task") is sampled("accept_task")
@@ -0,0 +1,40 @@
+import time
+
+from fastapi import BackgroundTasks, FastAPI
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY
+
+from app.handlers.metrics_handlers import MetricsMiddleware, record_db_query
+
+
+def _sample(name: str, route: str) -> float:
+    return REGISTRY.get_sample_value(name, {"route": route}) or 0.0
+
+
+def test_background_tasks_are_not_measured():
+    app = FastAPI()
+    app.add_middleware(MetricsMiddleware)
+
+    def slow_job():
+        record_db_query(0.5)
+        time.sleep(0.3)
+
+    @app.get("/metrics-test/{item_id}")
+    async def endpoint(item_id: int, background_tasks: BackgroundTasks):
+        record_db_query(0.01)
+        background_tasks.add_task(slow_job)
+        return {"item_id": item_id}
+
+    route = "/metrics-test/{item_id}"
+    seconds = REGISTRY.get_sample_value(
+        "http_request_duration_seconds_sum", {"method": "GET", "route": route}) or 0.0
+    queries = _sample("http_request_db_queries_sum", route)
+
+    with TestClient(app) as client:
+        assert client.get("/metrics-test/1").status_code == 200
+
+    # Ответ уже ушёл: ни время, ни запрос фоновой задачи не засчитаны
+    assert REGISTRY.get_sample_value(
+        "http_request_duration_seconds_sum", {"method": "GET", "route": route}) - seconds < 0.3
+    assert _sample("http_request_db_queries_sum", route) - queries == 1
+    assert _sample("http_request_db_seconds_sum", route) < 0.5
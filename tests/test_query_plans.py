@@ -0,0 +1,208 @@
+"""
+Планы запросов горячих маршрутов на большом наборе данных (только PostgreSQL, TEST_POSTGRES_URL).
+
+Схема создаётся миграциями, данные генерируются SQL. Маршруты вызываются через приложение,
+SQL каждого запроса перехватывается и прогоняется через EXPLAIN: ответ не 2xx
+или Seq Scan по большой таблице — падение теста. Объём: PLAN_CHECK_USERS (по умолчанию 20000).
+"""
+import asyncio
+import json
+import os
+
+import asyncpg
+import pytest
+from tortoise import connections
+from tortoise.backends.asyncpg.client import AsyncpgDBClient
+
+from app.database.managers.ledger_manager import reconcile_ledger
+from app.database.managers.task_manager import expire_assignments
+from app.handlers.auth_handlers import SessionUser
+from tests.conftest import bearer, create_schema, start_client
+
+# Таблицы, по которым полный просмотр недопустим
+BIG_TABLES = {
+    "users", "user_accounts", "tasks", "task_assignments",
+    "task_verifications", "transactions", "useractionlog",
+}
+USERS = int(os.getenv("PLAN_CHECK_USERS", "20000"))
+PER_USER = 10
+MANAGERS = 10
+EXECUTOR = MANAGERS + 1
+
+SEED_SQL = """
+CREATE OR REPLACE FUNCTION plan_uuid(seed text) RETURNS uuid IMMUTABLE LANGUAGE sql AS
+    $$ SELECT overlay(overlay(md5(seed) placing '4' from 13) placing '8' from 17)::uuid $$;
+INSERT INTO "user_roles" ("role_id", "role_name")
+    VALUES ('executor', 'Исполнитель'), ('manager', 'Проверяющий') ON CONFLICT DO NOTHING;
+INSERT INTO "task_statuses" ("status_id", "status_name")
+    VALUES ('active', 'Активно'), ('full', 'Набор закрыт'), ('closed', 'Закрыто') ON CONFLICT DO NOTHING;
+INSERT INTO "task_types" ("task_type_id", "task_type_name") VALUES ('like', 'Лайк') ON CONFLICT DO NOTHING;
+INSERT INTO "admin_users" ("admin_id", "username", "password_hash")
+    VALUES (plan_uuid('admin'), 'plan-admin', 'x');
+INSERT INTO "task_platforms" ("platform_id", "platform_name")
+    SELECT plan_uuid('platform' || g), 'platform-' || g FROM generate_series(0, 4) g;
+INSERT INTO "users" ("user_id", "telegram_id", "username", "role_id", "balance")
+    SELECT plan_uuid('user' || g), g, 'user' || g,
+           CASE WHEN g <= {managers} THEN 'manager' ELSE 'executor' END, 0
+    FROM generate_series(1, {users}) g;
+INSERT INTO "user_accounts" ("account_id", "user_id", "platform_id", "account_name", "account_platform_id")
+    SELECT plan_uuid('account' || g), plan_uuid('user' || g), plan_uuid('platform' || (g % 5)),
+           'acc' || g, 'acc' || g
+    FROM generate_series(1, {users}) g;
+INSERT INTO "tasks" ("task_id", "task_name", "creator_id", "platform_id", "task_type_id", "description",
+                     "reward", "verification_type", "status_id", "created_at")
+    SELECT plan_uuid('task' || g), 'task' || g, plan_uuid('admin'), plan_uuid('platform' || (g / 10 % 5)),
+           'like', 'description', 1.50, 'screenshot',
+           CASE WHEN g % 10 = 0 THEN 'active' ELSE 'closed' END, now() - g * interval '1 minute'
+    FROM generate_series(0, {tasks} - 1) g;
+INSERT INTO "task_assignments" ("assignment_id", "user_id", "task_id", "assigned_profile_id", "status",
+                                "created_at", "submitted_at")
+    SELECT plan_uuid('assignment' || u || '-' || k), plan_uuid('user' || u),
+           plan_uuid('task' || ((u * {per_user} + k) % {tasks})), plan_uuid('account' || u),
+           (ARRAY['in_progress', 'pending_review', 'completed', 'rejected'])[1 + (u + k) % 4],
+           now() - (u + k) * interval '1 minute',
+           CASE WHEN (u + k) % 4 <> 0 THEN now() - (u + k) * interval '1 minute' END
+    FROM generate_series(1, {users}) u, generate_series(0, {per_user} - 1) k;
+INSERT INTO "task_verifications" ("verification_id", "task_assignment_id", "status", "s3_name", "created_at")
+    SELECT plan_uuid('verification' || u || '-' || k), plan_uuid('assignment' || u || '-' || k),
+           CASE (u + k) % 4 WHEN 1 THEN 'pending' WHEN 2 THEN 'approved' ELSE 'rejected' END,
+           'web_app/plan/' || u || '-' || k || '.png', now() - (u + k) * interval '1 minute'
+    FROM generate_series(1, {users}) u, generate_series(0, {per_user} - 1) k
+    WHERE (u + k) % 4 <> 0;
+INSERT INTO "transactions" ("transaction_id", "user_id", "amount", "transaction_type", "created_at")
+    SELECT plan_uuid('transaction' || u || '-' || k), plan_uuid('user' || u), 1.50,
+           CASE WHEN k % 5 = 4 THEN 'withdraw' ELSE 'credit' END, now() - (u + k) * interval '1 minute'
+    FROM generate_series(1, {users}) u, generate_series(0, {per_user} - 1) k;
+INSERT INTO "useractionlog" ("log_id", "user_id", "action", "timestamp")
+    SELECT plan_uuid('log' || u || '-' || k), plan_uuid('user' || u), 'action',
+           now() - (u + k) * interval '1 minute'
+    FROM generate_series(1, {users}) u, generate_series(0, {per_user} - 1) k;
+UPDATE "users" SET "balance" = "ledger"."total"
+    FROM (SELECT "user_id", SUM(CASE WHEN "transaction_type" = 'credit' THEN "amount" ELSE -"amount" END) "total"
+          FROM "transactions" GROUP BY "user_id") "ledger"
+    WHERE "users"."user_id" = "ledger"."user_id";
+ANALYZE;
+"""
+
+
+class QueryRecorder:
+    """
+    Перехватывает SQL клиента asyncpg (включая транзакции) с меткой текущего маршрута.
+    """
+
+    def __init__(self):
+        self.label = None
+        self.queries: list[tuple[str, str, list]] = []
+
+    def install(self, patch: pytest.MonkeyPatch):
+        recorder = self
+        for name in ("execute_query", "execute_query_dict"):
+            original = getattr(AsyncpgDBClient, name)
+
+            async def wrapper(client, query, values=None, _original=original):
+                if recorder.label is not None:
+                    recorder.queries.append((recorder.label, query, list(values or [])))
+                return await _original(client, query, values)
+
+            patch.setattr(AsyncpgDBClient, name, wrapper)
+
+
+def _seq_scans(plan: dict) -> list[str]:
+    found = []
+    if plan.get("Node Type") == "Seq Scan" and plan.get("Relation Name") in BIG_TABLES:
+        found.append(plan["Relation Name"])
+    for child in plan.get("Plans", []):
+        found.extend(_seq_scans(child))
+    return found
+
+
+async def _seed(db_url: str):
+    # До старта приложения: на старте оно уже читает справочники
+    connection = await asyncpg.connect(db_url)
+    try:
+        await connection.execute(SEED_SQL.format(
+            users=USERS, tasks=USERS, per_user=PER_USER, managers=MANAGERS))
+    finally:
+        await connection.close()
+
+
+async def _explain(queries) -> list[str]:
+    db = connections.get("default")
+    failures = []
+    for label, query, values in queries:
+        if not query.lstrip().upper().startswith(("SELECT", "UPDATE", "DELETE", "WITH")):
+            continue
+        rows = await db.execute_query_dict(f"EXPLAIN (FORMAT JSON) {query}", values)
+        plan = rows[0]["QUERY PLAN"]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        scans = _seq_scans(plan[0]["Plan"])
+        if scans:
+            failures.append(f"{label}: Seq Scan {', '.join(scans)}: {query}")
+    return failures
+
+
+def test_hot_paths_avoid_seq_scans(make_database, monkeypatch, tmp_path):
+    db_url = make_database("postgres")
+    create_schema(db_url)
+    asyncio.run(_seed(db_url))
+
+    recorder = QueryRecorder()
+    with start_client(monkeypatch, tmp_path, db_url) as client:
+        with pytest.MonkeyPatch.context() as patch:
+            recorder.install(patch)
+
+            ids = client.portal.call(connections.get("default").execute_query_dict, f"""
+                SELECT plan_uuid('user1') AS "manager_id",
+                       plan_uuid('account{EXECUTOR}') AS "account_id",
+                       plan_uuid('assignment{EXECUTOR}-0') AS "assignment_id",
+                       (SELECT "task_id" FROM "tasks" WHERE "status_id" = 'active'
+                            AND "platform_id" = plan_uuid('platform{EXECUTOR % 5}')
+                            AND "max_assignments" IS NULL LIMIT 1) AS "task_id"
+            """)[0]
+            executor = {"telegram_id": EXECUTOR}
+            manager = bearer(SessionUser(user_id=ids["manager_id"], telegram_id=1, role_id="manager"))
+            task_id, account_id, assignment_id = ids["task_id"], ids["account_id"], ids["assignment_id"]
+
+            def call(label, method, path, **kwargs):
+                recorder.label = label
+                try:
+                    response = client.request(method, path, **kwargs)
+                finally:
+                    recorder.label = None
+                assert response.is_success, f"{label}: HTTP {response.status_code} {response.text}"
+                return response
+
+            feed = call("GET /tasks/", "GET", "/tasks/", params=executor).json()
+            call("GET /tasks/ (cursor)", "GET", "/tasks/",
+                 params={**executor, "cursor": feed["next_cursor"]})
+            call("GET /tasks/my", "GET", "/tasks/my", params=executor)
+            call("GET /tasks/my?status", "GET", "/tasks/my", params={**executor, "status": "completed"})
+            call("GET /tasks/completed", "GET", "/tasks/completed", params=executor)
+            call("GET /tasks/history", "GET", "/tasks/history", params=executor)
+            call("GET /tasks/{task_id}", "GET", f"/tasks/{task_id}", params=executor)
+            call("GET /assignments/{id}", "GET", f"/assignments/{assignment_id}", params=executor)
+            call("GET /accounts", "GET", "/accounts", params=executor)
+            call("GET /accounts/me", "GET", "/accounts/me", params=executor)
+            call("POST /tasks/{id}/accept", "POST", f"/tasks/{task_id}/accept",
+                 params=executor, json={"account_id": str(account_id)})
+            claimed = call("POST /reviews/claim", "POST", "/reviews/claim",
+                           params={"limit": 20}, headers=manager).json()
+            assert claimed["items"]
+            call("POST /reviews/batch", "POST", "/reviews/batch", headers=manager, json={"decisions": [
+                {"verification_id": item["verification_id"], "status": "approved"}
+                for item in claimed["items"]
+            ]})
+
+            # Фоновые задания: первая сверка читает весь журнал, проверяется повторная
+            client.portal.call(reconcile_ledger, False, 0)
+            recorder.label = "reconcile_ledger"
+            client.portal.call(reconcile_ledger, False, 0)
+            recorder.label = "expire_assignments"
+            client.portal.call(expire_assignments, 24 * 365 * 10, 100)
+            recorder.label = None
+
+        failures = client.portal.call(_explain, recorder.queries)
+
+    assert recorder.queries
+    assert not failures, "\n".join(failures)
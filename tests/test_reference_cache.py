@@ -0,0 +1,23 @@
+import uuid
+
+from app.database.managers.reference_cache import reference_cache
+from app.database.models import TaskPlatform
+
+
+async def _create_platform(platform_id):
+    await TaskPlatform.create(platform_id=platform_id, platform_name="Новая")
+
+
+def test_unknown_key_is_cached_briefly(client):
+    call = client.portal.call
+    platform_id = uuid.uuid4()
+
+    assert call(reference_cache.get, "platforms", platform_id) is None
+    misses = reference_cache.misses
+    # Повтор неизвестного ключа не идёт в БД, даже если запись уже появилась
+    call(_create_platform, platform_id)
+    assert call(reference_cache.get, "platforms", platform_id) is None
+    assert reference_cache.misses == misses
+
+    reference_cache.invalidate()
+    assert call(reference_cache.get, "platforms", platform_id)["platform_name"] == "Новая"
@@ -0,0 +1,63 @@
+import pytest
+from tortoise import connections
+
+from app.database.models import Task, TaskAssignment
+from app.database.routing import REPLICA_CONNECTION
+from tests.conftest import create_schema, run_on, seed_world, start_client
+
+REPLICA_SUFFIX = " (реплика)"
+
+
+async def _mark_replica():
+    # Отличаем реплику по описаниям заданий
+    for task in await Task.all():
+        task.description += REPLICA_SUFFIX
+        await task.save(update_fields=["description"])
+
+
+@pytest.fixture(params=["sqlite", "postgres"])
+def replica(request, make_database, monkeypatch, tmp_path):
+    primary_url = make_database(request.param)
+    create_schema(primary_url)
+    world = run_on(primary_url, seed_world)
+    replica_url = make_database(request.param, template=primary_url)
+    run_on(replica_url, _mark_replica)
+    with start_client(monkeypatch, tmp_path, primary_url, replica_url) as client:
+        yield client, world
+
+
+def test_marked_routes_read_from_replica(replica):
+    client, world = replica
+    task_id = world.tasks[0].task_id
+
+    response = client.get(f"/tasks/{task_id}", params=world.params())
+    assert response.status_code == 200, response.text
+    assert response.json()["description"].endswith(REPLICA_SUFFIX)
+
+    response = client.get("/tasks/", params=world.params())
+    assert response.status_code == 200, response.text
+    assert all(item["description"].endswith(REPLICA_SUFFIX) for item in response.json()["items"])
+
+
+def test_writes_and_unmarked_reads_use_primary(replica):
+    client, world = replica
+    task_id = world.tasks[0].task_id
+
+    response = client.post(
+        f"/tasks/{task_id}/accept", params=world.params(),
+        json={"account_id": str(world.account.account_id)})
+    assert response.status_code == 200, response.text
+
+    async def count(connection_name: str) -> int:
+        return await TaskAssignment.filter(task_id=task_id).using_db(connections.get(connection_name)).count()
+
+    assert client.portal.call(count, "default") == 1
+    assert client.portal.call(count, REPLICA_CONNECTION) == 0
+
+    # Маршрут без read_from_replica видит запись сразу
+    response = client.get("/tasks/completed", params=world.params())
+    assert response.status_code == 200, response.text
+    # Маршрут с read_from_replica читает реплику, где назначения ещё нет
+    response = client.get("/tasks/my", params=world.params())
+    assert response.status_code == 200, response.text
+    assert response.json()["items"] == []
@@ -0,0 +1,103 @@
+import io
+from decimal import Decimal
+
+import pytest
+from PIL import Image
+
+from app.database.managers.ledger_manager import post_entry
+from app.database.managers.task_manager import submit_assignment
+from app.database.models import Task, TaskAssignment, TaskVerification, Transaction, User
+from app.handlers.image_handlers import process_screenshot
+from app.s3.s3_manager import s3_manager
+from tests.conftest import bearer, seed_world
+
+
+@pytest.fixture
+def submitted(client):
+    """
+    Задание на одного исполнителя, принятое и сданное на проверку: (world, assignment_id, verification_id).
+    """
+    world = client.portal.call(seed_world, 1, 1)
+    response = client.post(
+        f"/tasks/{world.tasks[0].task_id}/accept", params=world.params(),
+        json={"account_id": str(world.account.account_id)})
+    assignment_id = response.json()["assignment_id"]
+
+    async def submit():
+        await submit_assignment(await TaskAssignment.get(assignment_id=assignment_id), "web_app/1/a.png")
+        return (await TaskVerification.get(task_assignment_id=assignment_id)).verification_id
+
+    return world, assignment_id, client.portal.call(submit)
+
+
+def _review(client, world, verification_id, status):
+    return client.post("/reviews/batch", headers=bearer(world.manager), json={
+        "decisions": [{"verification_id": str(verification_id), "status": status}]})
+
+
+async def _state(user_id, task_id, assignment_id):
+    return (
+        (await User.get(user_id=user_id)).balance,
+        await Transaction.filter(user_id=user_id).count(),
+        (await Task.get(task_id=task_id)).assignments_count,
+        (await TaskAssignment.get(assignment_id=assignment_id)).status,
+    )
+
+
+def test_approve_skips_already_posted_credit(client, submitted):
+    world, assignment_id, verification_id = submitted
+    # Награда уже проведена с тем же ключом (например, прошлой попыткой)
+    client.portal.call(post_entry, world.executor.user_id, Decimal("1.50"), "credit",
+                       world.tasks[0].task_id, f"assignment:{assignment_id}")
+
+    response = _review(client, world, verification_id, "approved")
+    assert response.status_code == 200, response.text
+    assert (response.json()["approved"], response.json()["credited"]) == (1, 0)
+
+    state = client.portal.call(_state, world.executor.user_id, world.tasks[0].task_id, assignment_id)
+    assert state == (Decimal("1.50"), 1, 1, "completed")
+
+
+def test_reject_releases_slot_once(client, submitted):
+    world, assignment_id, verification_id = submitted
+
+    response = _review(client, world, verification_id, "rejected")
+    assert response.status_code == 200, response.text
+    # Повтор той же пачки: верификация уже проверена и пропускается
+    response = _review(client, world, verification_id, "rejected")
+    assert response.json()["skipped"] == [str(verification_id)]
+
+    state = client.portal.call(_state, world.executor.user_id, world.tasks[0].task_id, assignment_id)
+    assert state == (Decimal("0"), 0, 0, "rejected")
+
+
+def _png() -> bytes:
+    buffer = io.BytesIO()
+    Image.new("RGB", (64, 48), "red").save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+async def _upload_and_process(s3_name):
+    await s3_manager.upload_to_key(s3_name, _png(), "image/png")
+    await process_screenshot(s3_name)
+
+
+def test_claim_links_previews_once_processed(client, submitted, s3_bucket):
+    world, _, verification_id = submitted
+
+    def claim():
+        response = client.post("/reviews/claim", headers=bearer(world.manager))
+        assert response.status_code == 200, response.text
+        [item] = response.json()["items"]
+        assert item["verification_id"] == str(verification_id)
+        return item
+
+    # Пока скриншот не обработан — обе ссылки на оригинал
+    item = claim()
+    assert "/web_app/1/a.png?" in item["screenshot_url"]
+    assert "/web_app/1/a.png?" in item["thumbnail_url"]
+
+    client.portal.call(_upload_and_process, "web_app/1/a.png")
+    item = claim()
+    assert "/web_app/1/a.view.webp?" in item["screenshot_url"]
+    assert "/web_app/1/a.thumb.webp?" in item["thumbnail_url"]
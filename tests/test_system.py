@@ -0,0 +1,58 @@
+from logger import action_log_sink, log_user_action
+from tests.conftest import bearer
+
+
+def _worker_stats(client, world) -> dict:
+    response = client.get("/system/db-pool", headers=bearer(world.manager))
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def test_worker_stats_require_manager(client, world):
+    assert client.get("/system/db-pool", headers=bearer(world.executor)).status_code == 403
+
+
+def test_reference_cache_stats(client, world):
+    before = _worker_stats(client, world)["reference_cache"]
+    for _ in range(2):
+        assert client.get("/platforms").status_code == 200
+    after = _worker_stats(client, world)["reference_cache"]
+
+    # Каждый запрос справочника — версия для ETag и сами записи
+    assert after["hits"] + after["misses"] - before["hits"] - before["misses"] == 4
+    assert after["hits"] > before["hits"]
+    assert after["age"] is not None
+
+
+def test_user_cache_stats(client, world):
+    before = _worker_stats(client, world)["user_cache"]
+    # Старые клиенты без токена: пользователь по telegram_id через кэш
+    for _ in range(3):
+        assert client.get("/tasks/", params=world.params()).status_code == 200
+    after = _worker_stats(client, world)["user_cache"]
+
+    assert after["misses"] - before["misses"] == 1
+    assert after["hits"] - before["hits"] == 2
+    assert after["size"] == before["size"] + 1
+
+
+async def _overflow_action_log(user_id, entries: int):
+    # Очередь на одну запись: все put до первого await, остальные отбрасываются
+    await action_log_sink.stop()
+    await action_log_sink.start()
+    for _ in range(entries):
+        await log_user_action(user_id, "open_app")
+    await action_log_sink.stop()
+    await action_log_sink.start()
+
+
+def test_action_log_stats(client, world, monkeypatch):
+    before = _worker_stats(client, world)["action_log"]
+    monkeypatch.setattr(action_log_sink, "maxsize", 1)
+    client.portal.call(_overflow_action_log, world.executor.user_id, 3)
+    after = _worker_stats(client, world)["action_log"]
+
+    assert after["enqueued"] - before["enqueued"] == 1
+    assert after["written"] - before["written"] == 1
+    assert after["dropped"] - before["dropped"] == 2
+    assert (after["failed"], after["queued"]) == (before["failed"], 0)
@@ -0,0 +1,173 @@
+import asyncio
+from datetime import datetime, timezone
+
+import pytest
+from fastapi import HTTPException
+
+from app.database.managers.task_manager import expire_assignments, submit_assignment
+from app.database.models import Task, TaskAssignment, TaskVerification
+from tests.conftest import seed_world
+
+
+@pytest.fixture
+def limited_world(client):
+    # Задания на одного исполнителя
+    return client.portal.call(seed_world, 1, 1)
+
+
+def _accept(client, world, user=None, account=None, key=None):
+    headers = {"Idempotency-Key": key} if key else {}
+    return client.post(
+        f"/tasks/{world.tasks[0].task_id}/accept", params=world.params(user), headers=headers,
+        json={"account_id": str((account or world.account).account_id)})
+
+
+async def _get_task(task_id) -> Task:
+    return await Task.get(task_id=task_id)
+
+
+async def _get_assignment(assignment_id) -> TaskAssignment:
+    return await TaskAssignment.get(assignment_id=assignment_id)
+
+
+def _task(client, world) -> Task:
+    return client.portal.call(_get_task, world.tasks[0].task_id)
+
+
+def test_last_slot_fills_task(client, limited_world):
+    world = limited_world
+    assert _accept(client, world).status_code == 200
+
+    task = _task(client, world)
+    assert (task.assignments_count, task.status_id) == (1, "full")
+
+    response = _accept(client, world, world.other, world.other_account)
+    assert response.status_code == 409
+    assert _task(client, world).assignments_count == 1
+
+
+def test_expired_assignment_releases_slot(client, limited_world):
+    world = limited_world
+    assert _accept(client, world).status_code == 200
+
+    assert client.portal.call(expire_assignments, 0) == 1
+    task = _task(client, world)
+    assert (task.assignments_count, task.status_id) == (0, "active")
+
+    assert _accept(client, world, world.other, world.other_account).status_code == 200
+    task = _task(client, world)
+    assert (task.assignments_count, task.status_id) == (1, "full")
+
+
+def test_accept_is_idempotent(client, world):
+    first = _accept(client, world, key="accept-1")
+    assert first.status_code == 200, first.text
+    retry = _accept(client, world, key="accept-1")
+    assert retry.status_code == 200, retry.text
+    assert retry.json()["assignment_id"] == first.json()["assignment_id"]
+
+    # Повтор без ключа или с другим ключом — ошибка, а не второе назначение
+    assert _accept(client, world).status_code == 400
+    assert _accept(client, world, key="accept-2").status_code == 400
+
+    assert _task(client, world).assignments_count == 1
+    assert client.portal.call(TaskAssignment.filter(task_id=world.tasks[0].task_id).count) == 1
+
+
+async def _submit_twice(assignment_id):
+    assignment = await TaskAssignment.get(assignment_id=assignment_id)
+    return await asyncio.gather(
+        submit_assignment(assignment, "web_app/1/a.png"),
+        submit_assignment(assignment, "web_app/1/b.png"),
+        return_exceptions=True)
+
+
+def test_concurrent_submit_creates_one_verification(client, world):
+    assignment_id = _accept(client, world).json()["assignment_id"]
+
+    results = client.portal.call(_submit_twice, assignment_id)
+    errors = [result for result in results if isinstance(result, HTTPException)]
+    assert len(errors) == 1 and errors[0].status_code == 409
+    assert client.portal.call(TaskVerification.filter(task_assignment_id=assignment_id).count) == 1
+    assert client.portal.call(_get_assignment, assignment_id).status == "pending_review"
+
+
+def test_expired_assignment_retakes_slot_on_submit(client, limited_world):
+    world = limited_world
+    assignment_id = _accept(client, world).json()["assignment_id"]
+    client.portal.call(expire_assignments, 0)
+    assert _accept(client, world, world.other, world.other_account).status_code == 200
+
+    # Место занято другим исполнителем — просроченное назначение сдать нельзя
+    assignment = client.portal.call(_get_assignment, assignment_id)
+    with pytest.raises(HTTPException) as error:
+        client.portal.call(submit_assignment, assignment, "web_app/1/a.png")
+    assert error.value.status_code == 409
+    assert client.portal.call(_get_assignment, assignment_id).status == "expired"
+
+
+async def _complete(assignment_id, created_at, submitted_at):
+    await TaskAssignment.filter(assignment_id=assignment_id).update(
+        status="completed", created_at=created_at, submitted_at=submitted_at)
+
+
+def test_completed_filters_by_submission_date(client, world):
+    assignment_id = _accept(client, world).json()["assignment_id"]
+    # Принято 1 января, сдано 10 января
+    client.portal.call(_complete, assignment_id,
+                       datetime(2026, 1, 1, tzinfo=timezone.utc), datetime(2026, 1, 10, tzinfo=timezone.utc))
+
+    def completed(date_from, date_to):
+        response = client.get("/tasks/completed", params={
+            **world.params(), "date_from": date_from, "date_to": date_to})
+        assert response.status_code == 200, response.text
+        return response.json()["summary"]["count"]
+
+    assert completed("2026-01-05T00:00:00Z", "2026-01-15T00:00:00Z") == 1
+    assert completed("2026-01-01T00:00:00Z", "2026-01-05T00:00:00Z") == 0
+
+
+async def _edit(task_id):
+    task = await Task.get(task_id=task_id)
+    task.description = "Новое описание"
+    await task.save()
+
+
+def test_task_revalidates_by_etag(client, world):
+    url = f"/tasks/{world.tasks[0].task_id}"
+    first = client.get(url, params=world.params())
+    assert first.status_code == 200, first.text
+    etag = first.headers["ETag"]
+
+    unchanged = client.get(url, params=world.params(), headers={"If-None-Match": etag})
+    assert unchanged.status_code == 304
+    assert unchanged.headers["ETag"] == etag
+
+    client.portal.call(_edit, world.tasks[0].task_id)
+    changed = client.get(url, params=world.params(), headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != etag
+    assert changed.json()["description"] == "Новое описание"
+
+
+def test_feed_pages_by_cursor(client, world):
+    def page(cursor=None):
+        params = {**world.params(), "limit": 2, **({"cursor": cursor} if cursor else {})}
+        response = client.get("/tasks/", params=params)
+        assert response.status_code == 200, response.text
+        return response.json()
+
+    first = page()
+    assert (len(first["items"]), first["has_more"]) == (2, True)
+    second = page(first["next_cursor"])
+    assert (len(second["items"]), second["has_more"], second["next_cursor"]) == (1, False, None)
+
+    # Страницы не пересекаются и вместе покрывают всю ленту
+    seen = [item["task_id"] for item in first["items"] + second["items"]]
+    assert sorted(seen) == sorted(str(task.task_id) for task in world.tasks)
+
+    # Принятое задание из ленты пропадает
+    assert _accept(client, world).status_code == 200
+    feed = page()
+    assert str(world.tasks[0].task_id) not in [item["task_id"] for item in feed["items"]]
+    assert feed["has_more"] is False
@@ -0,0 +1,179 @@
+import hashlib
+import io
+
+import httpx
+import pytest
+from fastapi import FastAPI, File, UploadFile
+from fastapi.testclient import TestClient
+from PIL import Image
+
+from app.database.managers.task_manager import expire_assignments
+from app.database.models import TaskAssignment, TaskVerification
+from app.handlers.upload_handlers import FORM_OVERHEAD, UploadLimitMiddleware
+from app.s3.s3_manager import s3_manager
+from tests.conftest import seed_world
+
+
+@pytest.fixture
+def assignment(client, world, s3_bucket):
+    response = client.post(
+        f"/tasks/{world.tasks[0].task_id}/accept", params=world.params(),
+        json={"account_id": str(world.account.account_id)})
+    assert response.status_code == 200, response.text
+    return response.json()["assignment_id"]
+
+
+def _png() -> bytes:
+    buffer = io.BytesIO()
+    Image.new("RGB", (64, 48), "red").save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+async def _reopen(assignment_id):
+    # Назначение снова можно сдать (как после отклонения)
+    await TaskAssignment.filter(assignment_id=assignment_id).update(status="in_progress")
+
+
+async def _verification_keys(assignment_id) -> list[str]:
+    return await TaskVerification.filter(task_assignment_id=assignment_id) \
+        .order_by("created_at").values_list("s3_name", flat=True)
+
+
+def _upload_url(client, world, assignment, content_type="image/png"):
+    return client.post(
+        f"/tasks/{world.tasks[0].task_id}/upload-url", params=world.params(),
+        json={"assignment_id": assignment, "content_type": content_type})
+
+
+def test_presign_upload_confirm(client, world, assignment):
+    response = _upload_url(client, world, assignment)
+    assert response.status_code == 200, response.text
+    presigned = response.json()
+    assert presigned["key"].startswith(s3_manager.upload_key_prefix(world.executor.telegram_id, assignment))
+
+    uploaded = httpx.post(presigned["url"], data=presigned["fields"], files={"file": ("shot.png", _png())})
+    assert uploaded.status_code in (200, 204), uploaded.text
+
+    confirm = {"assignment_id": assignment, "key": presigned["key"], "details": "готово"}
+    response = client.post(f"/tasks/{world.tasks[0].task_id}/confirm", params=world.params(), json=confirm)
+    assert response.status_code == 200, response.text
+    # Повтор подтверждения того же ключа не создаёт вторую верификацию
+    response = client.post(f"/tasks/{world.tasks[0].task_id}/confirm", params=world.params(), json=confirm)
+    assert response.status_code == 200, response.text
+
+    async def check():
+        assert (await TaskAssignment.get(assignment_id=assignment)).status == "pending_review"
+        assert await TaskVerification.filter(task_assignment_id=assignment).count() == 1
+
+    client.portal.call(check)
+
+
+def test_presign_rejects_unsupported_content_type(client, world, assignment):
+    assert _upload_url(client, world, assignment, "application/pdf").status_code == 415
+
+
+def test_confirm_rejects_foreign_key(client, world, assignment):
+    response = client.post(
+        f"/tasks/{world.tasks[0].task_id}/confirm", params=world.params(),
+        json={"assignment_id": assignment, "key": "web_app/1/other.png"})
+    assert response.status_code == 400
+
+
+def test_confirm_requires_uploaded_object(client, world, assignment):
+    presigned = _upload_url(client, world, assignment).json()
+    response = client.post(
+        f"/tasks/{world.tasks[0].task_id}/confirm", params=world.params(),
+        json={"assignment_id": assignment, "key": presigned["key"]})
+    assert response.status_code == 400
+    assert client.portal.call(TaskVerification.filter(task_assignment_id=assignment).count) == 0
+
+
+def test_submit_keys_screenshot_by_hash_only(client, world, assignment):
+    image = _png()
+    # Те же байты под другим именем и расширением — тот же ключ
+    for name, content_type in (("shot.jpg", "application/octet-stream"), ("shot.png", "image/png")):
+        response = client.post(
+            f"/tasks/{world.tasks[0].task_id}/submit", params=world.params(),
+            data={"assignment_id": assignment},
+            files={"screenshot": (name, image, content_type)})
+        assert response.status_code == 200, response.text
+        client.portal.call(_reopen, assignment)
+
+    keys = client.portal.call(_verification_keys, assignment)
+    digest = hashlib.sha256(image).hexdigest()
+    assert keys == [f"web_app/sha256/{digest[:2]}/{digest}"] * 2
+    head = client.portal.call(s3_manager.head_object, keys[0])
+    assert head["ContentType"] == "image/jpeg"
+
+
+def test_submit_rejects_foreign_assignment(client, world, assignment):
+    response = client.post(
+        f"/tasks/{world.tasks[0].task_id}/submit", params=world.params(world.other),
+        data={"assignment_id": assignment}, files={"screenshot": ("shot.png", _png(), "image/png")})
+    assert response.status_code == 404, response.text
+    assert client.portal.call(_verification_keys, assignment) == []
+
+
+def _limited_app(calls: list):
+    app = FastAPI()
+    app.add_middleware(UploadLimitMiddleware, max_size=1024)
+
+    @app.post("/tasks/{task_id}/submit")
+    async def submit(screenshot: UploadFile = File(...)):
+        calls.append(screenshot.size)
+        return {"size": screenshot.size}
+
+    return app
+
+
+def test_upload_limit_rejects_before_form_parsing():
+    calls = []
+    with TestClient(_limited_app(calls)) as limited:
+        body = b"x" * (1024 + FORM_OVERHEAD + 1)
+        # Content-Length больше лимита — 413 без разбора формы
+        response = limited.post("/tasks/1/submit", files={"screenshot": ("a.png", body, "image/png")})
+        assert response.status_code == 413
+        # Без Content-Length (chunked) — обрыв при чтении
+        response = limited.post("/tasks/1/submit", content=iter([body]),
+                                headers={"Content-Type": "multipart/form-data; boundary=x"})
+        assert response.status_code == 413
+        assert calls == []
+
+        response = limited.post("/tasks/1/submit", files={"screenshot": ("a.png", b"x" * 100, "image/png")})
+        assert response.json() == {"size": 100}
+
+
+def _submit(client, world, assignment, image, user=None):
+    return client.post(
+        f"/tasks/{world.tasks[0].task_id}/submit", params=world.params(user),
+        data={"assignment_id": assignment}, files={"screenshot": ("shot.png", image, "image/png")})
+
+
+def _content_key(image: bytes) -> str:
+    digest = hashlib.sha256(image).hexdigest()
+    return f"web_app/sha256/{digest[:2]}/{digest}"
+
+
+def test_rejected_submit_leaves_no_object(client, world, assignment):
+    assert _submit(client, world, assignment, _png()).status_code == 200
+
+    # Уже на проверке — 409 до загрузки
+    image = _png() + b"\0"
+    assert _submit(client, world, assignment, image).status_code == 409
+    assert client.portal.call(s3_manager.head_object, _content_key(image)) is None
+
+
+def test_submit_failing_after_upload_deletes_object(client, s3_bucket):
+    world = client.portal.call(seed_world, 1, 1)
+    accept = {"account_id": str(world.account.account_id)}
+    assignment = client.post(
+        f"/tasks/{world.tasks[0].task_id}/accept", params=world.params(), json=accept).json()["assignment_id"]
+    client.portal.call(expire_assignments, 0)
+    response = client.post(f"/tasks/{world.tasks[0].task_id}/accept", params=world.params(world.other),
+                           json={"account_id": str(world.other_account.account_id)})
+    assert response.status_code == 200, response.text
+
+    # Просроченное назначение проходит проверку статуса, но место уже занято — 409 после загрузки
+    image = _png() + b"\1"
+    assert _submit(client, world, assignment, image).status_code == 409
+    assert client.portal.call(s3_manager.head_object, _content_key(image)) is None